@@ -0,0 +1,72 @@
+import argparse
+import json
+import statistics
+import time
+import numpy as np
+from PIL import Image
+from macro_ai_agent.vision.color_search import find_color_blobs
+
+HIGHLIGHT_RGB = (255, 192, 47)
+
+def legacy_find_color(screenshot, target_rgb, tolerance=20):
+    """The original find_color_on_screen loop (stride 5 + local refine), minus the capture."""
+    width, height = screenshot.size
+    for x in range(0, width, 5):
+        for y in range(0, height, 5):
+            r, g, b = screenshot.getpixel((x, y))
+            if all(abs(c1 - c2) < tolerance for c1, c2 in zip((r, g, b), target_rgb)):
+                for sub_x in range(max(0, x-5), min(width, x+5)):
+                    for sub_y in range(max(0, y-5), min(height, y+5)):
+                        sr, sg, sb = screenshot.getpixel((sub_x, sub_y))
+                        if all(abs(c1 - c2) < tolerance for c1, c2 in zip((sr, sg, sb), target_rgb)):
+                            return sub_x, sub_y
+    return None
+
+def make_screen(width: int, height: int, position: str) -> Image.Image:
+    """Noisy grey desktop with one highlight box near the given corner."""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(30, 90, size=(height, width, 3), dtype=np.uint8)
+    box_w, box_h = 120, 24
+    x, y = {"start": (40, 40), "middle": (width // 2, height // 2), "end": (width - 200, height - 80)}[position]
+    frame[y:y + box_h, x:x + box_w] = HIGHLIGHT_RGB
+    return Image.fromarray(frame)
+
+def time_call(func, repeat: int) -> dict:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples), "result": result}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized color search against the getpixel loop')
+    parser.add_argument('--width', type=int, default=2560)
+    parser.add_argument('--height', type=int, default=1440)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-legacy', action='store_true', help='Only time the vectorized search')
+    args = parser.parse_args()
+
+    report = {"screen": [args.width, args.height]}
+    for position in ("start", "middle", "end", "missing"):
+        if position == "missing":
+            screen = Image.fromarray(np.full((args.height, args.width, 3), 60, dtype=np.uint8))
+        else:
+            screen = make_screen(args.width, args.height, position)
+        entry = {
+            "vectorized": time_call(lambda: find_color_blobs(screen, HIGHLIGHT_RGB, 30, max_blobs=1), args.repeat),
+            "vectorized_region": time_call(
+                lambda: find_color_blobs(screen, HIGHLIGHT_RGB, 30, region=(0, 0, args.width // 2, args.height), max_blobs=1),
+                args.repeat
+            )
+        }
+        if not args.skip_legacy:
+            entry["legacy"] = time_call(lambda: legacy_find_color(screen, HIGHLIGHT_RGB, 30), 1)
+            entry["speedup"] = entry["legacy"]["median_ms"] / entry["vectorized"]["median_ms"]
+        report[position] = entry
+
+    print(json.dumps(report, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
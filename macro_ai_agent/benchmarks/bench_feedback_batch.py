@@ -0,0 +1,77 @@
+import argparse
+import glob
+import json
+import time
+from macro_ai_agent.llm_client import LLMClient
+from macro_ai_agent.token_budget import estimate_tokens
+
+def load_items(pattern: str):
+    """(feedback, step description) pairs from recorded task-runner results."""
+    items = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r", encoding="utf-8") as f:
+            run = json.load(f)
+        for step in run.get("steps", []):
+            items.append((step.get("feedback", {}), step["description"]))
+    return items
+
+def run_per_step(llm: LLMClient, items):
+    """Current path: one analyze_feedback call per step."""
+    prompt_tokens = sum(
+        estimate_tokens(llm._build_prompt(llm._analyze_feedback_prompt(feedback, task)))
+        for feedback, task in items
+    )
+    before = llm.connection_stats()["requests"]
+    start = time.perf_counter()
+    results = [llm.analyze_feedback(feedback, task) for feedback, task in items]
+    return {
+        "seconds": time.perf_counter() - start,
+        "requests": llm.connection_stats()["requests"] - before,
+        "estimated_prompt_tokens": prompt_tokens,
+        "successes": sum(1 for result in results if result["success"])
+    }
+
+def run_batched(llm: LLMClient, items):
+    """Batched path: one structured call per context-sized batch."""
+    batches = llm._feedback_batches(items)
+    prompt_tokens = sum(estimate_tokens(llm._batch_prompt(batch)) for batch in batches)
+    before = llm.connection_stats()["requests"]
+    start = time.perf_counter()
+    results = llm.analyze_feedback_batch(items)
+    return {
+        "seconds": time.perf_counter() - start,
+        "requests": llm.connection_stats()["requests"] - before,
+        "batches": len(batches),
+        "estimated_prompt_tokens": prompt_tokens,
+        "successes": sum(1 for result in results if result["success"])
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-step vs batched feedback analysis')
+    parser.add_argument('--config', default='macro_ai_agent/config.json')
+    parser.add_argument('--results', default='output/results/task_*.json', help='Recorded runs to take steps from')
+    parser.add_argument('--api-url', help='Override config["llm"]["api_url"]')
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    if args.api_url:
+        config["llm"]["api_url"] = args.api_url
+    # Measure the model, not the response cache
+    config["llm"].setdefault("cache", {})["enabled"] = False
+
+    items = load_items(args.results)
+    if not items:
+        print("No recorded steps found.")
+        return
+
+    llm = LLMClient(config)
+    report = {
+        "steps": len(items),
+        "per_step": run_per_step(llm, items),
+        "batched": run_batched(llm, items)
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import itertools
+import json
+import time
+import cv2
+import numpy as np
+from macro_ai_agent.vision.palette import classify_scheme, extract_palette
+
+def make_mock(width: int, height: int) -> np.ndarray:
+    """Synthetic RGB design mock: background, header, sidebar, cards and buttons with noise."""
+    rng = np.random.default_rng(0)
+    mock = np.empty((height, width, 3), dtype=np.uint8)
+    mock[:] = (245, 246, 250)
+    mock[:height // 10] = (33, 56, 120)
+    mock[height // 10:, :width // 6] = (52, 58, 64)
+    for i in range(6):
+        x = width // 5 + (i % 3) * width // 4
+        y = height // 5 + (i // 3) * height // 3
+        mock[y:y + height // 4, x:x + width // 5] = (255, 255, 255)
+        mock[y + height // 5:y + height // 5 + height // 30, x + 20:x + width // 10] = (240, 120, 40)
+    noise = rng.normal(0, 6, size=mock.shape)
+    return np.clip(mock + noise, 0, 255).astype(np.uint8)
+
+def legacy_palette(rgb: np.ndarray, n_colors: int) -> np.ndarray:
+    """The original extract_colors: KMeans over every pixel."""
+    from sklearn.cluster import KMeans
+    kmeans = KMeans(n_clusters=n_colors, random_state=0, n_init=1)
+    kmeans.fit(rgb.reshape(-1, 3))
+    return kmeans.cluster_centers_
+
+def palette_error(fast: np.ndarray, reference: np.ndarray) -> dict:
+    """Mean and max CIELAB distance between palettes under the best one-to-one pairing."""
+    def lab(colors):
+        return cv2.cvtColor(np.asarray(colors, dtype=np.uint8).reshape(1, -1, 3), cv2.COLOR_RGB2LAB).reshape(-1, 3).astype(float)
+    fast_lab, reference_lab = lab(np.clip(fast, 0, 255)), lab(np.clip(reference, 0, 255))
+    best = None
+    for order in itertools.permutations(range(len(reference_lab)), len(fast_lab)):
+        distances = np.linalg.norm(fast_lab - reference_lab[list(order)], axis=1)
+        if best is None or distances.mean() < best.mean():
+            best = distances
+    return {"mean_delta_e": float(best.mean()), "max_delta_e": float(best.max())}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the palette engine against full-image KMeans')
+    parser.add_argument('--width', type=int, default=3840)
+    parser.add_argument('--height', type=int, default=2160)
+    parser.add_argument('--colors', type=int, default=5)
+    parser.add_argument('--pixel-budget', type=int, default=50000)
+    parser.add_argument('--tolerance', type=float, default=10.0, help='Max mean delta E to count as matching')
+    args = parser.parse_args()
+
+    rgb = make_mock(args.width, args.height)
+    # Keep the one-off sklearn import out of both timings
+    import sklearn.cluster
+
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        palette = extract_palette(rgb, n_colors=args.colors, pixel_budget=args.pixel_budget)
+        samples.append(time.perf_counter() - start)
+    fast_seconds = sorted(samples)[len(samples) // 2]
+
+    start = time.perf_counter()
+    reference = legacy_palette(rgb, args.colors)
+    legacy_seconds = time.perf_counter() - start
+
+    error = palette_error(palette["colors"], reference)
+    report = {
+        "image": [args.width, args.height],
+        "pixel_budget": args.pixel_budget,
+        "fast_seconds": fast_seconds,
+        "legacy_seconds": legacy_seconds,
+        "speedup": legacy_seconds / fast_seconds,
+        "fast_palette": palette["colors"].tolist(),
+        "legacy_palette": np.rint(reference).astype(int).tolist(),
+        "color_scheme": classify_scheme(palette["colors"], palette["proportions"]),
+        **error,
+        "within_tolerance": error["mean_delta_e"] <= args.tolerance
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
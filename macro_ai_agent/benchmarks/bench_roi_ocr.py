@@ -0,0 +1,84 @@
+import argparse
+import json
+import statistics
+import time
+import cv2
+import numpy as np
+from macro_ai_agent.vision.ocr_engine import get_ocr_engine
+
+# Named regions on a 3840x2160 desktop, as (left, top, width, height)
+REGIONS_4K = {
+    "cursor_chat": (2560, 0, 1280, 2160),
+    "terminal": (0, 1560, 2560, 600)
+}
+
+def make_frame() -> np.ndarray:
+    """Synthetic 4K desktop: an editor, a chat pane and a terminal, all with text."""
+    frame = np.full((2160, 3840, 3), 250, dtype=np.uint8)
+    for row in range(40):
+        cv2.putText(frame, f"def function_{row}(value): return value * {row}", (40, 60 + row * 36),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (30, 30, 30), 2)
+    cv2.rectangle(frame, (2560, 0), (3840, 2160), (40, 40, 48), -1)
+    for row in range(30):
+        cv2.putText(frame, f"Assistant: step {row} complete", (2600, 80 + row * 64),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (230, 230, 230), 2)
+    cv2.rectangle(frame, (0, 1560), (2560, 2160), (10, 10, 10), -1)
+    for row in range(12):
+        cv2.putText(frame, f"$ pytest -q  test_{row} passed", (40, 1610 + row * 46),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (200, 255, 200), 2)
+    return frame
+
+def time_call(func, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark full-screen vs region-of-interest OCR on a 4K frame')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--live', action='store_true', help='Also time real full-screen vs region captures')
+    args = parser.parse_args()
+
+    try:
+        engine = get_ocr_engine()
+        engine.warm_up(background=False)
+    except ImportError:
+        print("easyocr is not installed; install it to run this benchmark.")
+        return
+
+    frame = make_frame()
+    crops = {name: frame[top:top + height, left:left + width] for name, (left, top, width, height) in REGIONS_4K.items()}
+    report = {
+        "frame": list(frame.shape),
+        "ocr_load_seconds": engine.load_seconds,
+        "full_frame": time_call(lambda: engine.readtext(frame), args.repeat),
+        "regions": {name: time_call(lambda crop=crop: engine.readtext(crop), args.repeat) for name, crop in crops.items()},
+        "pixels": {
+            "full_frame": frame.shape[0] * frame.shape[1],
+            "regions": sum(crop.shape[0] * crop.shape[1] for crop in crops.values())
+        }
+    }
+    report["roi_total_median_ms"] = sum(result["median_ms"] for result in report["regions"].values())
+    report["speedup"] = report["full_frame"]["median_ms"] / report["roi_total_median_ms"]
+
+    if args.live:
+        import pyautogui
+        report["capture"] = {
+            "full_screen": time_call(lambda: np.array(pyautogui.screenshot()), args.repeat),
+            "regions": {
+                name: time_call(lambda box=box: np.array(pyautogui.screenshot(region=box)), args.repeat)
+                for name, box in REGIONS_4K.items()
+            }
+        }
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+PERCENTILES = (50, 90, 95, 99)
+
+def percentile(sorted_samples: Sequence[float], q: float) -> float:
+    """q-th percentile (0-100) of already sorted samples, linearly interpolated."""
+    if not sorted_samples:
+        return float("nan")
+    rank = (len(sorted_samples) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (rank - low)
+
+def summarize(samples_ms: Sequence[float]) -> Dict[str, float]:
+    """Count, mean, spread and percentiles of millisecond samples."""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"n": 0}
+    summary = {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "stdev_ms": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1]
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}_ms"] = percentile(ordered, q)
+    return summary
+
+def measure(func: Callable[[], Any], repeat: int = 20, warmup: int = 1,
+            setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Time func() repeat times after warmup calls; setup() runs untimed before each call.
+
+    When func returns a dict of numbers (e.g. per-stage seconds or a
+    throughput), each key is summarized too, under "metrics".
+    """
+    samples: List[float] = []
+    metrics: Dict[str, List[float]] = {}
+    for i in range(warmup + repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        extra = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        if i < warmup:
+            continue
+        samples.append(elapsed)
+        if isinstance(extra, dict):
+            for key, value in extra.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metrics.setdefault(key, []).append(float(value))
+    result: Dict[str, Any] = {"unit": "ms", "summary": summarize(samples)}
+    if metrics:
+        result["metrics"] = {
+            key: {
+                "mean": statistics.fmean(values),
+                **{f"p{q}": percentile(sorted(values), q) for q in PERCENTILES}
+            }
+            for key, values in metrics.items()
+        }
+    return result
+
+class StageTimer:
+    """Times named stages by wrapping methods on live objects.
+
+    wrap(obj, "method", "stage") replaces the bound method on that one
+    instance, so the code under test runs unchanged and each call adds
+    its wall time to the stage. take() returns the stages (in ms) since
+    the last take().
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def wrap(self, obj: Any, attribute: str, stage: Optional[str] = None):
+        stage = stage or attribute
+        original = getattr(obj, attribute)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.stages[stage] = self.stages.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+        setattr(obj, attribute, timed)
+        return obj
+
+    def take(self) -> Dict[str, float]:
+        stages, self.stages = self.stages, {}
+        return stages
+
+def stage_summaries(result: Dict[str, Any], prefix: str = "stage:") -> Dict[str, Any]:
+    """Move "stage:<name>" metrics of a measure() result under "stages"."""
+    metrics = result.get("metrics", {})
+    stages = {key[len(prefix):]: metrics.pop(key) for key in list(metrics) if key.startswith(prefix)}
+    if stages:
+        result["stages"] = stages
+    if not metrics:
+        result.pop("metrics", None)
+    return result
+
+def environment_info() -> Dict[str, Any]:
+    """Where and when a run happened, so reports from different machines are not mixed up."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+def write_report(path: str, report: Dict[str, Any]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any], statistic: str = "p50_ms") -> Dict[str, Dict[str, Any]]:
+    """Per-case change of one statistic between two reports (positive = slower)."""
+    changes = {}
+    for name, case in current.get("cases", {}).items():
+        before = previous.get("cases", {}).get(name, {}).get("summary", {}).get(statistic)
+        after = case.get("summary", {}).get(statistic)
+        if before is None or after is None:
+            continue
+        changes[name] = {
+            "before": before,
+            "after": after,
+            "change_pct": (after - before) / before * 100 if before else None
+        }
+    return changes
@@ -0,0 +1,296 @@
+import argparse
+import copy
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+import cv2
+
+from macro_ai_agent.benchmarks.bench_palette import make_mock
+from macro_ai_agent.benchmarks.harness import (
+    StageTimer,
+    compare,
+    environment_info,
+    measure,
+    stage_summaries,
+    write_report
+)
+from macro_ai_agent.sim.environment import get_simulation, reset_simulations
+
+SAMPLE_TEXT = (
+    "Create a responsive landing page with a fixed header, a hero section and three feature cards. "
+    "Use CSS grid for the cards and keep the primary colour for buttons. "
+)
+
+def bench_config(config_path: str, workdir: str, ocr: str) -> Dict[str, Any]:
+    """The repo config pointed at the simulated desktop and stub Ollama, with caches off and files in workdir."""
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    config = copy.deepcopy(config)
+    config["simulation"]["enabled"] = True
+    # Every call should reach the stand-ins, not a cache
+    config["llm"]["cache"]["enabled"] = False
+    config["vision"]["feature_cache"]["enabled"] = False
+    config["feedback"]["capture"]["enabled"] = False
+    if ocr == "easyocr":
+        config["simulation"].setdefault("ocr", {})["enabled"] = False
+        config["feedback"]["ocr_engine"] = "easyocr"
+    config["paths"]["input"] = {
+        "designs": os.path.join(workdir, "input", "designs"),
+        "specs": os.path.join(workdir, "input", "specs")
+    }
+    config["paths"]["results_dir"] = os.path.join(workdir, "results")
+    config["paths"]["rules_file"] = os.path.abspath(config["paths"]["rules_file"])
+    return config
+
+def bench_llm(config: Dict[str, Any], args, workdir: str) -> Dict[str, Any]:
+    """Round trip and streaming through LLMClient to the stub server."""
+    from macro_ai_agent.llm_client import LLMClient
+
+    client = LLMClient(config)
+    prompt = "Summarize the current implementation state in one sentence."
+
+    def stream():
+        chunks = list(client.stream_response(prompt))
+        stats = client.last_stream_stats
+        return {
+            "time_to_first_token_ms": (stats.get("time_to_first_token") or 0.0) * 1000,
+            "tokens_per_second": stats.get("tokens_per_second", 0.0),
+            "chunks": len(chunks)
+        }
+
+    return {
+        "llm_round_trip": measure(lambda: client.generate_response(prompt), args.repeat),
+        "llm_stream": measure(stream, args.repeat)
+    }
+
+def bench_ocr(config: Dict[str, Any], args, workdir: str) -> Dict[str, Any]:
+    """Capture plus OCR of the whole desktop while text is being typed into it."""
+    from macro_ai_agent.observer import Observer
+
+    reset_simulations()
+    observer = Observer(config)
+    desktop = get_simulation(config).desktop
+    desktop.focus("cursor")
+    region = observer.screen
+    counter = [0]
+
+    def change():
+        counter[0] += 1
+        desktop.type(f"frame {counter[0]} ")
+
+    def read():
+        start = time.perf_counter()
+        frame = region.capture()
+        captured = time.perf_counter()
+        region.read(observer.reader, frame)
+        return {
+            "stage:capture": (captured - start) * 1000,
+            "stage:ocr": (time.perf_counter() - captured) * 1000
+        }
+
+    result = stage_summaries(measure(read, args.repeat, setup=change))
+    result["engine"] = type(observer.reader).__name__
+    result["frame_diff"] = dict(region.stats)
+    return {"ocr_frame": result}
+
+def bench_colors(config: Dict[str, Any], args, workdir: str) -> Dict[str, Any]:
+    """VisionProcessor.extract_colors on a 1080p design mock."""
+    from macro_ai_agent.vision.processor import VisionProcessor
+
+    processor = VisionProcessor(config)
+    image = cv2.cvtColor(make_mock(1920, 1080), cv2.COLOR_RGB2BGR)
+    return {"extract_colors": measure(lambda: processor.extract_colors(image), args.repeat)}
+
+def bench_find_color(config: Dict[str, Any], args, workdir: str) -> Dict[str, Any]:
+    """find_color_on_screen for the find-in-page highlight on the virtual desktop."""
+    from macro_ai_agent.executor.send_whatsapp_ai import find_color_on_screen
+    from macro_ai_agent.sim.desktop import FIND_ACTIVE
+
+    reset_simulations()
+    desktop = get_simulation(config).desktop
+    desktop.focus("whatsapp")
+    desktop.key("ctrl+f")
+    desktop.type("Mohamed")
+
+    def find():
+        found = find_color_on_screen(FIND_ACTIVE, tolerance=30, config=config)
+        return {"found": float(found is not None)}
+
+    return {"find_color_on_screen": measure(find, args.repeat)}
+
+def bench_typing(config: Dict[str, Any], args, workdir: str) -> Dict[str, Any]:
+    """CursorTyper.enter_text throughput, human-like keystrokes and clipboard paste, in chars per second.
+
+    The human-like path runs on the recorder backend, so its random
+    per-key delays are recorded instead of slept; its throughput is over
+    the wall time plus those scheduled delays. Paste runs on the
+    simulated keyboard and clipboard with its real paste delays.
+    """
+    from macro_ai_agent.typer import CursorTyper
+
+    reset_simulations()
+    text = (SAMPLE_TEXT * (args.typing_chars // len(SAMPLE_TEXT) + 1))[:args.typing_chars]
+    recorder_config = copy.deepcopy(config)
+    recorder_config["macro_driver"].setdefault("input", {})["backend"] = "recorder"
+    recorder_config["macro_driver"]["input"]["recorder"] = {"realtime": False}
+    human = CursorTyper(recorder_config)
+    paster = CursorTyper(config)
+    desktop = get_simulation(config).desktop
+
+    def type_human():
+        human.backend.clear()
+        report = human.enter_text(text, human_like=True, mode="type")
+        delays = sum(value for kind, value in human.backend.events if kind == "sleep")
+        seconds = report["seconds"] + delays
+        return {
+            "chars_per_second": report["chars"] / seconds if seconds else 0.0,
+            "scheduled_delay_s": delays,
+            "effective_s": seconds
+        }
+
+    def clear():
+        desktop.focus("notes")
+        desktop.windows["notes"].input = ""
+
+    def paste():
+        report = paster.enter_text(text, human_like=False, mode="paste")
+        return {"chars_per_second": report["chars"] / report["seconds"] if report["seconds"] else 0.0}
+
+    results = {
+        "typing_human_like": measure(type_human, args.repeat),
+        "typing_paste": measure(paste, args.repeat, setup=clear)
+    }
+    for result in results.values():
+        result["chars"] = len(text)
+    # The timed part of the human-like case is only the planning and recording; throughput is in the metrics
+    results["typing_human_like"]["timed"] = "wall time without the scheduled delays"
+    return results
+
+def bench_memory(config: Dict[str, Any], args, workdir: str) -> Dict[str, Any]:
+    """MemoryManager: saving attempts as the task file grows, and reading the history back."""
+    from macro_ai_agent.memory import MemoryManager
+
+    memory = MemoryManager(config)
+    evaluation = {
+        "visual_match_score": 80, "technical_score": 75, "rule_compliance_score": 90, "overall_score": 80,
+        "success": False, "feedback": "Spacing differs from the design.", "improvements_needed": ["padding", "font size"]
+    }
+    save = measure(
+        lambda: memory.save_attempt("design.png", "Build the landing page", SAMPLE_TEXT * 4, SAMPLE_TEXT, evaluation),
+        args.repeat
+    )
+    save["attempts_at_end"] = len(memory.attempts)
+    return {
+        "memory_save_attempt": save,
+        "memory_task_history": measure(memory.get_task_history, args.repeat)
+    }
+
+def bench_run_image_task(config: Dict[str, Any], args, workdir: str) -> Dict[str, Any]:
+    """One full MacroAgent.run_image_task against the stand-ins, with a per-stage breakdown."""
+    from macro_ai_agent.main import MacroAgent
+
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+    design = os.path.join(workdir, "design.png")
+    cv2.imwrite(design, cv2.cvtColor(make_mock(1280, 720), cv2.COLOR_RGB2BGR))
+    state = {}
+
+    def setup():
+        # A fresh desktop each time, so the previous run's chat reply cannot satisfy the wait
+        reset_simulations()
+        agent = MacroAgent(config_path)
+        timer = StageTimer()
+        timer.wrap(agent.llm_client, "analyze_image_and_goal", "analyze")
+        timer.wrap(agent.typer, "type_to_cursor", "prompt_and_type")
+        timer.wrap(agent, "wait_for_result", "wait_for_result")
+        timer.wrap(agent.llm_client, "evaluate_result", "evaluate")
+        timer.wrap(agent.memory, "save_attempt", "memory")
+        timer.wrap(agent, "save_task_result", "save_result")
+        state.update(agent=agent, timer=timer)
+
+    def run():
+        start = time.perf_counter()
+        result = state["agent"].run_image_task(design, "Build the landing page")
+        total = (time.perf_counter() - start) * 1000
+        stages = state["timer"].take()
+        metrics = {f"stage:{name}": ms for name, ms in stages.items()}
+        metrics["stage:other"] = max(0.0, total - sum(stages.values()))
+        metrics["success"] = float(result["success"])
+        metrics["attempts"] = float(len(state["agent"].memory.attempts))
+        return metrics
+
+    return {"run_image_task": stage_summaries(measure(run, args.task_repeat, warmup=0, setup=setup))}
+
+CASES: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "llm": bench_llm,
+    "ocr": bench_ocr,
+    "colors": bench_colors,
+    "find_color": bench_find_color,
+    "typing": bench_typing,
+    "memory": bench_memory,
+    "run_image_task": bench_run_image_task
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite against the simulated desktop and stub Ollama')
+    parser.add_argument('--config', default='macro_ai_agent/config.json')
+    parser.add_argument('--output', help='Report path (default output/benchmarks/bench_<timestamp>.json)')
+    parser.add_argument('--only', nargs='+', choices=sorted(CASES), help='Run only these cases')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed calls per micro-benchmark')
+    parser.add_argument('--task-repeat', type=int, default=3, help='Timed run_image_task attempts')
+    parser.add_argument('--typing-chars', type=int, default=2000)
+    parser.add_argument('--ocr', choices=['sim', 'easyocr'], default='sim',
+                        help='OCR engine for the ocr case: the simulated one or real easyocr on simulated frames')
+    parser.add_argument('--compare', help='Earlier report to compare p50 latencies against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="macro-bench-")
+    config = bench_config(args.config, workdir, args.ocr)
+    report = {
+        "meta": environment_info(),
+        "settings": {
+            "repeat": args.repeat,
+            "task_repeat": args.task_repeat,
+            "ocr": args.ocr,
+            "llm_latency": config["simulation"].get("ollama", {}).get("latency", {})
+        },
+        "cases": {}
+    }
+    try:
+        for name in args.only or list(CASES):
+            start = time.perf_counter()
+            try:
+                report["cases"].update(CASES[name](config, args, workdir))
+            except Exception as e:
+                report["cases"][name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"{name}: done in {time.perf_counter() - start:.1f}s")
+    finally:
+        reset_simulations()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join("output", "benchmarks", f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    write_report(output, report)
+    for name, case in report["cases"].items():
+        summary = case.get("summary")
+        if summary:
+            throughput = case.get("metrics", {}).get("chars_per_second")
+            print(f"{name:24} p50 {summary['p50_ms']:9.2f} ms   p95 {summary['p95_ms']:9.2f} ms   n={summary['n']}"
+                  + (f"   {throughput['p50']:.1f} chars/s" if throughput else ""))
+        else:
+            print(f"{name:24} {case.get('error')}")
+    if args.compare:
+        with open(args.compare, "r") as f:
+            previous = json.load(f)
+        for name, change in compare(previous, report).items():
+            pct = change["change_pct"]
+            print(f"{name:24} p50 {change['before']:9.2f} -> {change['after']:9.2f} ms"
+                  + (f" ({pct:+.1f}%)" if pct is not None else ""))
+    print(f"Report written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+class FrameRing:
+    """Fixed number of preallocated frame slots, overwritten oldest first.
+
+    Slots are allocated on the first write (the frame shape is not known
+    before that) and reused afterwards, so steady-state capture does not
+    allocate. A slot can be pinned while a reader works on it; the writer
+    skips pinned slots instead of overwriting them.
+    """
+
+    def __init__(self, slots: int = 4):
+        self.size = max(3, slots)
+        self._frames: Optional[np.ndarray] = None
+        self._seq = np.full(self.size, -1, dtype=np.int64)
+        self._times = np.zeros(self.size, dtype=np.float64)
+        self._pinned = [0] * self.size
+        self._next = 0
+        self._latest = -1  # slot index of the newest frame
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def _allocate(self, frame: np.ndarray):
+        self._frames = np.empty((self.size,) + frame.shape, dtype=frame.dtype)
+        self._seq[:] = -1
+        self._latest = -1
+
+    def write(self, frame: np.ndarray, timestamp: float) -> Optional[int]:
+        """Copy a frame into the next free slot; returns its sequence number, or None if all slots are pinned."""
+        with self._lock:
+            if self._frames is None or self._frames.shape[1:] != frame.shape or self._frames.dtype != frame.dtype:
+                if any(self._pinned):
+                    return None
+                self._allocate(frame)
+            for _ in range(self.size):
+                slot = self._next
+                self._next = (self._next + 1) % self.size
+                if not self._pinned[slot] and slot != self._latest:
+                    break
+            else:
+                return None
+            seq = self.written
+            np.copyto(self._frames[slot], frame)
+            self._seq[slot] = seq
+            self._times[slot] = timestamp
+            self._latest = slot
+            self.written += 1
+            return seq
+
+    def latest_seq(self) -> int:
+        with self._lock:
+            return int(self._seq[self._latest]) if self._latest >= 0 else -1
+
+    def acquire_latest(self) -> Optional[Tuple[int, int, float, np.ndarray]]:
+        """Pin the newest slot: (slot, seq, timestamp, frame view). Call release(slot) when done."""
+        with self._lock:
+            if self._latest < 0:
+                return None
+            slot = self._latest
+            self._pinned[slot] += 1
+            return slot, int(self._seq[slot]), float(self._times[slot]), self._frames[slot]
+
+    def release(self, slot: int):
+        with self._lock:
+            self._pinned[slot] -= 1
+
+    def latest(self) -> Optional[Tuple[int, float, np.ndarray]]:
+        """Copy of the newest frame: (seq, timestamp, frame)."""
+        with self._lock:
+            if self._latest < 0:
+                return None
+            slot = self._latest
+            return int(self._seq[slot]), float(self._times[slot]), self._frames[slot].copy()
+
+class CaptureWorker:
+    """Grabs frames on a background thread and OCRs the newest one on another.
+
+    The capture thread writes into a FrameRing at a fixed FPS. The OCR
+    thread always takes the newest frame, so frames that arrive while it
+    is busy are dropped (and counted) rather than queued. When the ring
+    holds max_backlog frames OCR has not reached yet, capture pauses
+    until OCR catches up (back-pressure) instead of burning CPU on frames
+    that would be dropped anyway.
+    """
+
+    def __init__(self, capture_config: Optional[dict], grab: Callable[[], np.ndarray],
+                 ocr: Optional[Callable[[np.ndarray], str]] = None):
+        capture_config = capture_config or {}
+        self.logger = logging.getLogger('CaptureWorker')
+        self.fps = max(0.1, capture_config.get("fps", 2.0))
+        self.max_backlog = max(1, capture_config.get("max_backlog", capture_config.get("buffer_size", 4) - 1))
+        self.ring = FrameRing(capture_config.get("buffer_size", 4))
+        self.grab = grab
+        self.ocr = ocr
+
+        self._stop = threading.Event()
+        self._frame_ready = threading.Condition()
+        self._threads = []
+        self._ocr_seq = -1
+        self._text = ""
+        self._text_seq = -1
+        self._text_time = 0.0
+        self._text_lock = threading.Lock()
+        # Bumped whenever the screen content or its OCR text changes
+        self.version = 0
+        self._last_hash: Optional[bytes] = None
+        self.stats_counters = {
+            "captured": 0,
+            "capture_errors": 0,
+            "throttled": 0,
+            "ocred": 0,
+            "dropped": 0,
+            "ocr_errors": 0,
+            "changes": 0,
+            "capture_seconds": 0.0,
+            "ocr_seconds": 0.0
+        }
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> "CaptureWorker":
+        if self.running:
+            return self
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        if self.ocr:
+            self._threads.append(threading.Thread(target=self._ocr_loop, name="capture-ocr", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _backlog(self) -> int:
+        return self.ring.latest_seq() - self._ocr_seq
+
+    def _capture_loop(self):
+        period = 1.0 / self.fps
+        next_time = time.monotonic()
+        while not self._stop.is_set():
+            if self.ocr and self._backlog() >= self.max_backlog:
+                self.stats_counters["throttled"] += 1
+            else:
+                start = time.perf_counter()
+                try:
+                    frame = self.grab()
+                except Exception as e:
+                    self.stats_counters["capture_errors"] += 1
+                    self.logger.warning(f"Screen capture failed: {str(e)}")
+                else:
+                    if self.ring.write(frame, time.time()) is not None:
+                        self.stats_counters["captured"] += 1
+                        frame_hash = hashlib.blake2b(frame[::8, ::8].tobytes(), digest_size=16).digest()
+                        with self._frame_ready:
+                            if frame_hash != self._last_hash:
+                                self._last_hash = frame_hash
+                                self._changed()
+                            self._frame_ready.notify_all()
+                    else:
+                        self.stats_counters["throttled"] += 1
+                self.stats_counters["capture_seconds"] += time.perf_counter() - start
+
+            # Fixed-rate schedule; if a grab overran, skip ahead rather than burst
+            next_time += period
+            now = time.monotonic()
+            if next_time < now:
+                next_time = now
+            self._stop.wait(next_time - now)
+
+    def _ocr_loop(self):
+        while not self._stop.is_set():
+            with self._frame_ready:
+                while not self._stop.is_set() and self.ring.latest_seq() <= self._ocr_seq:
+                    self._frame_ready.wait(0.5)
+            if self._stop.is_set():
+                return
+            acquired = self.ring.acquire_latest()
+            if acquired is None:
+                continue
+            slot, seq, timestamp, frame = acquired
+            try:
+                # Everything between the last OCR'd frame and this one was never read
+                self.stats_counters["dropped"] += max(0, seq - self._ocr_seq - 1)
+                start = time.perf_counter()
+                text = self.ocr(frame)
+                self.stats_counters["ocr_seconds"] += time.perf_counter() - start
+                self.stats_counters["ocred"] += 1
+                with self._text_lock:
+                    text_changed = text != self._text
+                    self._text, self._text_seq, self._text_time = text, seq, timestamp
+                if text_changed:
+                    with self._frame_ready:
+                        self._changed()
+            except Exception as e:
+                self.stats_counters["ocr_errors"] += 1
+                self.logger.warning(f"Background OCR failed: {str(e)}")
+            finally:
+                self._ocr_seq = seq
+                self.ring.release(slot)
+            with self._frame_ready:
+                self._frame_ready.notify_all()
+
+    def latest_frame(self) -> Optional[Tuple[int, float, np.ndarray]]:
+        """(seq, capture time, frame copy) for the newest captured frame, or None before the first."""
+        return self.ring.latest()
+
+    def latest_text(self) -> Tuple[str, int, float]:
+        """(text, frame seq, capture time) from the newest OCR'd frame."""
+        with self._text_lock:
+            return self._text, self._text_seq, self._text_time
+
+    def _changed(self):
+        # Caller holds _frame_ready
+        self.version += 1
+        self.stats_counters["changes"] += 1
+
+    def wait_for_change(self, after_version: int, timeout: Optional[float] = None) -> int:
+        """Block until the screen or its OCR text changes past after_version; returns the current version."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._frame_ready:
+            while self.version <= after_version and not self._stop.is_set():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._frame_ready.wait(remaining)
+            return self.version
+
+    def wait_for_frame(self, after_seq: int = -1, timeout: Optional[float] = None) -> int:
+        """Block until a frame newer than after_seq is captured; returns the newest seq."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._frame_ready:
+            while self.ring.latest_seq() <= after_seq and not self._stop.is_set():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._frame_ready.wait(remaining)
+        return self.ring.latest_seq()
+
+    def stats(self) -> Dict[str, Any]:
+        """Capture/OCR counters, including frames dropped because OCR fell behind."""
+        stats = dict(self.stats_counters)
+        stats["fps"] = self.fps
+        stats["buffer_size"] = self.ring.size
+        stats["backlog"] = max(0, self._backlog()) if self.ocr else 0
+        return stats
@@ -0,0 +1,296 @@
+import difflib
+import logging
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+class Condition(ABC):
+    """A predicate over what the Observer can see.
+
+    check() returns evidence (a dict describing what matched) when the
+    condition holds, otherwise None. It is abstract, so a condition
+    without one fails when it is built rather than during a wait.
+    """
+
+    name = "condition"
+
+    @abstractmethod
+    def check(self, observer) -> Optional[Dict[str, Any]]:
+        """Evidence that the condition holds now, or None."""
+
+    def arm(self, observer):
+        """Snapshot what is on screen now, so only later changes can satisfy the condition.
+
+        Called right after the action whose result is awaited (e.g. sending
+        a prompt); conditions that were never armed look at the screen as a whole.
+        """
+
+    def reset(self):
+        """Forget any state from a previous wait (the armed snapshot is kept)."""
+
+class CallableCondition(Condition):
+    """Wraps a plain zero-argument callable (the old wait_for_condition API)."""
+
+    name = "callable"
+
+    def __init__(self, func: Callable[[], Any]):
+        self.func = func
+
+    def check(self, observer) -> Optional[Dict[str, Any]]:
+        value = self.func()
+        return {"value": value} if value else None
+
+class ScreenTextCondition(Condition):
+    """Matches a regex against the OCR text of the screen or of a named region.
+
+    Once armed, only text that appeared after the snapshot is searched, so
+    a reply from an earlier attempt that is still on screen does not match.
+    """
+
+    name = "screen_text"
+
+    def __init__(self, pattern: str, region: Optional[str] = None, ignore_case: bool = True):
+        self.pattern = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        self.region = region
+        self._baseline: Optional[List[str]] = None
+
+    def _read(self, observer, fresh: bool = False) -> str:
+        if self.region:
+            return observer.get_region_text(self.region, fresh=fresh) or ""
+        return observer.get_screen_text(fresh=fresh) or ""
+
+    def arm(self, observer):
+        self._baseline = self._read(observer, fresh=True).split()
+
+    def _new_text(self, text: str) -> List[str]:
+        """Runs of words that were inserted or replaced since the armed snapshot."""
+        words = text.split()
+        matcher = difflib.SequenceMatcher(None, self._baseline, words, autojunk=False)
+        return [" ".join(words[j1:j2]) for tag, _, _, j1, j2 in matcher.get_opcodes() if tag in ("insert", "replace")]
+
+    def check(self, observer) -> Optional[Dict[str, Any]]:
+        text = self._read(observer)
+        candidates = [text] if self._baseline is None else self._new_text(text)
+        for candidate in candidates:
+            match = self.pattern.search(candidate)
+            if match:
+                return {
+                    "region": self.region or "screen",
+                    "match": match.group(0),
+                    "new_text": self._baseline is not None,
+                    "context": candidate[max(0, match.start() - 80):match.end() + 80]
+                }
+        return None
+
+class TerminalPatternCondition(Condition):
+    """Matches a regex against the captured terminal output."""
+
+    name = "terminal_pattern"
+
+    def __init__(self, pattern: str, ignore_case: bool = True):
+        self.pattern = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+    def check(self, observer) -> Optional[Dict[str, Any]]:
+        output = observer.get_terminal_output()
+        match = self.pattern.search(output or "")
+        if not match:
+            return None
+        line_start = output.rfind("\n", 0, match.start()) + 1
+        line_end = output.find("\n", match.end())
+        return {
+            "match": match.group(0),
+            "line": output[line_start:line_end if line_end >= 0 else None]
+        }
+
+class PixelRegionCondition(Condition):
+    """Watches the pixels of a screen rectangle.
+
+    With color, holds when at least min_ratio of the pixels are within
+    tolerance of that RGB color (e.g. a green "done" badge). With
+    stable_for, holds once the region has not changed for that many
+    seconds (e.g. the chat pane stopped streaming). With require_change
+    (the default), an armed condition first waits for the region to differ
+    from the armed snapshot, so a pane that is still waiting for the reply
+    to start does not count as finished.
+    """
+
+    name = "pixel_region"
+
+    def __init__(self, box: Optional[Sequence[int]] = None, region: Optional[str] = None,
+                 color: Optional[Sequence[int]] = None, tolerance: int = 20, min_ratio: float = 0.01,
+                 stable_for: Optional[float] = None, change_threshold: int = 12, require_change: bool = True):
+        if box is None and region is None:
+            raise ValueError("PixelRegionCondition needs a box or a region name")
+        if color is None and stable_for is None:
+            raise ValueError("PixelRegionCondition needs a color or stable_for")
+        self.box = tuple(box) if box is not None else None
+        self.region = region
+        self.color = np.array(color, dtype=np.int16) if color is not None else None
+        self.tolerance = tolerance
+        self.min_ratio = min_ratio
+        self.stable_for = stable_for
+        self.change_threshold = change_threshold
+        self.require_change = require_change
+        self._armed: Optional[np.ndarray] = None
+        self._changed = False
+        self.reset()
+
+    def _sample(self, observer, box) -> np.ndarray:
+        return observer.get_region_pixels(box)[::4, ::4].astype(np.int16)
+
+    def _differs(self, a: Optional[np.ndarray], b: np.ndarray) -> bool:
+        return a is None or a.shape != b.shape or int(np.abs(b - a).max()) > self.change_threshold
+
+    def arm(self, observer):
+        self._armed = self._sample(observer, self.box or observer.regions[self.region].box)
+        self._changed = False
+
+    def reset(self):
+        self._previous: Optional[np.ndarray] = None
+        self._stable_since: Optional[float] = None
+
+    def check(self, observer) -> Optional[Dict[str, Any]]:
+        box = self.box or observer.regions[self.region].box
+        pixels = observer.get_region_pixels(box)
+        evidence = {"region": self.region or "box", "box": list(box)}
+        small = pixels[::4, ::4].astype(np.int16)
+        if self.require_change and self._armed is not None and not self._changed:
+            # Nothing has happened since the action yet: a badge or a still pane is left over from before
+            if not self._differs(self._armed, small):
+                return None
+            self._changed = True
+
+        if self.color is not None:
+            close = (np.abs(pixels[..., :3].astype(np.int16) - self.color) <= self.tolerance).all(axis=-1)
+            ratio = float(close.mean())
+            if ratio < self.min_ratio:
+                return None
+            ys, xs = np.nonzero(close)
+            evidence.update({
+                "color_ratio": ratio,
+                "centroid": [int(box[0] + xs.mean()), int(box[1] + ys.mean())]
+            })
+            if self.stable_for is None:
+                return evidence
+
+        now = time.monotonic()
+        if self._differs(self._previous, small):
+            self._stable_since = now
+        self._previous = small
+        stable = now - self._stable_since
+        if stable < self.stable_for:
+            return None
+        evidence["stable_seconds"] = stable
+        return evidence
+
+def build_condition(spec: Dict[str, Any]) -> Condition:
+    """Condition from a config dict such as {"type": "screen_text", "pattern": "Done"}."""
+    spec = dict(spec)
+    kind = spec.pop("type")
+    if kind == "screen_text":
+        return ScreenTextCondition(**spec)
+    if kind == "terminal_pattern":
+        return TerminalPatternCondition(**spec)
+    if kind == "pixel_region":
+        return PixelRegionCondition(**spec)
+    raise ValueError(f"Unknown condition type: {kind}")
+
+class ConditionEngine:
+    """Waits for any of a set of conditions with back-off polling.
+
+    The poll interval starts at initial_interval and grows by multiplier
+    up to max_interval, with +/- jitter so several waiters do not poll in
+    lockstep. When the Observer's capture worker is running, the engine
+    sleeps on its change event instead, so it re-checks as soon as the
+    screen or its OCR text changes and falls back to the interval only as
+    a timeout; a change also resets the interval.
+    """
+
+    def __init__(self, observer, poll_config: Optional[dict] = None):
+        poll_config = poll_config or {}
+        self.observer = observer
+        self.logger = logging.getLogger('ConditionEngine')
+        self.initial_interval = poll_config.get("initial_interval", 0.1)
+        self.max_interval = poll_config.get("max_interval", 2.0)
+        self.multiplier = poll_config.get("multiplier", 2.0)
+        self.jitter = poll_config.get("jitter", 0.2)
+        self._random = random.Random()
+
+    def arm(self, conditions: Union[Condition, List[Condition]]):
+        """Snapshot the screen for each condition; call right after the action being waited on."""
+        if isinstance(conditions, Condition):
+            conditions = [conditions]
+        for condition in conditions:
+            try:
+                condition.arm(self.observer)
+            except Exception as e:
+                self.logger.warning(f"Could not arm condition {condition.name}: {str(e)}")
+
+    def _sleep_interval(self, interval: float, remaining: float) -> float:
+        jittered = interval * (1 + self._random.uniform(-self.jitter, self.jitter))
+        return max(0.0, min(jittered, remaining))
+
+    def wait(self, conditions: Union[Condition, List[Condition]], timeout: float = 30,
+             initial_interval: Optional[float] = None) -> Dict[str, Any]:
+        """Poll until one condition holds or timeout passes.
+
+        Returns {"met", "condition", "evidence", "elapsed", "checks", "wakeups"};
+        "condition" and "evidence" are None when the wait timed out.
+        """
+        if isinstance(conditions, Condition):
+            conditions = [conditions]
+        for condition in conditions:
+            condition.reset()
+
+        worker = getattr(self.observer, "capture_worker", None)
+        if worker is not None and not worker.running:
+            worker = None
+        version = worker.version if worker else 0
+
+        start = time.monotonic()
+        interval = initial_interval or self.initial_interval
+        checks = wakeups = 0
+        while True:
+            for condition in conditions:
+                checks += 1
+                try:
+                    evidence = condition.check(self.observer)
+                except Exception as e:
+                    self.logger.warning(f"Condition {condition.name} failed: {str(e)}")
+                    evidence = None
+                if evidence is not None:
+                    return {
+                        "met": True,
+                        "condition": condition.name,
+                        "evidence": evidence,
+                        "elapsed": time.monotonic() - start,
+                        "checks": checks,
+                        "wakeups": wakeups
+                    }
+
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                return {
+                    "met": False,
+                    "condition": None,
+                    "evidence": None,
+                    "elapsed": time.monotonic() - start,
+                    "checks": checks,
+                    "wakeups": wakeups
+                }
+
+            sleep = self._sleep_interval(interval, remaining)
+            if worker:
+                new_version = worker.wait_for_change(version, sleep)
+                if new_version != version:
+                    version = new_version
+                    wakeups += 1
+                    interval = initial_interval or self.initial_interval
+                    continue
+            else:
+                time.sleep(sleep)
+            interval = min(self.max_interval, interval * self.multiplier)
@@ -1,41 +1,46 @@
-import pyautogui
+import logging
 import time
-import keyboard
 from PIL import Image
+from macro_ai_agent.vision.color_search import find_color_blobs
+from macro_ai_agent.sim.environment import get_gui, get_keyboard
 
-def find_color_on_screen(target_rgb, tolerance=20):
+logger = logging.getLogger('WhatsAppSender')
+
+def find_color_on_screen(target_rgb, tolerance=20, region=None, min_area=4, config=None):
     """
-    Captures the screen and searches for a pixel matching the target RGB color
-    within a given tolerance. Returns the (x, y) coordinates if found, otherwise None.
+    Captures the screen and searches for an area matching the target RGB color
+    within a given tolerance. Returns the (x, y) centre of the largest matching
+    area if found, otherwise None. region is an optional (left, top, width, height).
+    With config["simulation"] enabled, the virtual desktop is searched instead.
     """
     try:
-        screenshot = pyautogui.screenshot()
+        pyautogui = get_gui(config)
+        screenshot = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
         width, height = screenshot.size
-        print(f"Captured screenshot with size: {width}x{height}") # Debugging print
-        for x in range(0, width, 5): # Step by 5 pixels for faster scanning
-            for y in range(0, height, 5): # Step by 5 pixels for faster scanning
-                r, g, b = screenshot.getpixel((x, y))
-                if all(abs(c1 - c2) < tolerance for c1, c2 in zip((r, g, b), target_rgb)):
-                    # Refine search around the found coordinate
-                    for sub_x in range(max(0, x-5), min(width, x+5)):
-                        for sub_y in range(max(0, y-5), min(height, y+5)):
-                             sr, sg, sb = screenshot.getpixel((sub_x, sub_y))
-                             if all(abs(c1 - c2) < tolerance for c1, c2 in zip((sr, sg, sb), target_rgb)):
-                                print(f"Found color at: {sub_x},{sub_y}") # Debugging print
-                                return sub_x, sub_y
-        print("Color not found on screen.") # Debugging print
+        logger.debug(f"Captured screenshot with size: {width}x{height}")
+        blobs = find_color_blobs(screenshot, target_rgb, tolerance, min_area=min_area, max_blobs=1)
+        if blobs:
+            x, y = blobs[0]["centroid"]
+            if region:
+                x, y = x + region[0], y + region[1]
+            logger.debug(f"Found color at: {x},{y} (area {blobs[0]['area']}px)")
+            return x, y
+        logger.debug("Color not found on screen.")
         return None
     except Exception as e:
-        print(f"Error during screen color search: {e}")
+        logger.warning(f"Error during screen color search: {e}")
         return None
 
 
-def send_message_to_contact(contact_name, message):
+def send_message_to_contact(contact_name, message, config=None):
     """
     Automates opening browser search, typing contact name, clicking highlight,
     typing message, and sending it via keyboard simulation.
+    config with "simulation" enabled runs it against the virtual desktop.
     """
     print(f"Attempting to send message to '{contact_name}'...") # Debugging print
+    pyautogui = get_gui(config)
+    keyboard = get_keyboard(config)
 
     # Make sure the target application (WhatsApp Web) is open and focused!
     # You might need a mechanism here to switch focus if it's not already focused.
@@ -57,7 +62,7 @@ def send_message_to_contact(contact_name, message):
     # Use a color picker tool on a screenshot of the highlight to get the exact RGB.
     orange_rgb = (255, 192, 47) # Common Chrome highlight color
     print(f"Searching for highlight color {orange_rgb}...") # Debugging print
-    coords = find_color_on_screen(orange_rgb, tolerance=30) # Increased tolerance slightly
+    coords = find_color_on_screen(orange_rgb, tolerance=30, config=config) # Increased tolerance slightly
 
     if coords:
         print(f"Found highlight at coordinates: {coords}") # Debugging print
@@ -0,0 +1,304 @@
+import logging
+import re
+from abc import ABC, abstractmethod
+import shutil
+import subprocess
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# One plan step: ("text", literal), ("chord", "ctrl+f") or ("delay", seconds)
+Action = Tuple[str, Any]
+
+MODIFIERS = {"ctrl", "shift", "alt", "win", "command", "super"}
+NAMED_KEYS = {
+    "enter", "tab", "escape", "backspace", "delete", "insert", "space",
+    "up", "down", "left", "right", "home", "end", "pageup", "pagedown",
+    *(f"f{i}" for i in range(1, 13))
+}
+KEY_ALIASES = {"return": "enter", "esc": "escape", "cmd": "command", "control": "ctrl", "del": "delete"}
+
+# {enter}, {ctrl+shift+l}, {sleep:0.5}; anything else in braces is typed literally
+MARKUP = re.compile(r"\{([^{}\n]{1,40})\}")
+DELAY_MARKUP = re.compile(r"(?:sleep|delay|wait)\s*[: ]\s*(\d+(?:\.\d+)?)$", re.IGNORECASE)
+
+def normalize_chord(name: str) -> Optional[str]:
+    """Canonical "mod+key" form of a markup key name, or None if it is not a key."""
+    parts = [KEY_ALIASES.get(part, part) for part in name.strip().lower().replace(" ", "").split("+")]
+    *mods, key = parts
+    if not key or any(mod not in MODIFIERS for mod in mods):
+        return None
+    if key in NAMED_KEYS or key in MODIFIERS:
+        return "+".join(parts)
+    # A bare character is only a key when held with a modifier ({ctrl+f}); {x} alone is text
+    if len(key) == 1 and mods:
+        return "+".join(parts)
+    return None
+
+class KeyPlan:
+    """A compiled sequence of input actions for one piece of text with markup.
+
+    Adjacent literal text is merged into a single run so a backend can
+    send it in one call. Plans are plain data: to_list()/from_list()
+    round-trip them through JSON for replay.
+    """
+
+    def __init__(self, actions: Sequence[Action], source: str = ""):
+        self.actions: Tuple[Action, ...] = tuple(actions)
+        self.source = source
+
+    @property
+    def literal_chars(self) -> int:
+        return sum(len(value) for kind, value in self.actions if kind == "text")
+
+    @property
+    def text(self) -> str:
+        """Only the literal text the plan types, markup removed."""
+        return "".join(value for kind, value in self.actions if kind == "text")
+
+    def to_list(self) -> List[List[Any]]:
+        return [[kind, value] for kind, value in self.actions]
+
+    @classmethod
+    def from_list(cls, actions: Sequence[Sequence[Any]]) -> "KeyPlan":
+        return cls([(kind, value) for kind, value in actions])
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def __repr__(self) -> str:
+        return f"KeyPlan({list(self.actions)!r})"
+
+class KeyPlanCompiler:
+    """Turns text with {key} markup into KeyPlans, caching recent results.
+
+    Recognised markup is a key chord ({enter}, {ctrl+f}, {ctrl+shift+l})
+    or a pause ({sleep:0.5}). Each chord is followed by its configured
+    settle delay (key_delays, by chord name, else "default"). Braces that
+    do not hold a key, such as code in a prompt, are kept as text.
+    """
+
+    def __init__(self, input_config: Optional[dict] = None):
+        input_config = input_config or {}
+        self.key_delays = {"default": 0.1, "enter": 0.5, "ctrl+f": 0.5}
+        self.key_delays.update(input_config.get("key_delays", {}))
+        self.cache_size = input_config.get("plan_cache_size", 128)
+        self._cache: "OrderedDict[str, KeyPlan]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, text: str) -> KeyPlan:
+        """The plan for text, from the cache when it was compiled recently."""
+        plan = self._cache.get(text)
+        if plan is not None:
+            self._cache.move_to_end(text)
+            self.hits += 1
+            return plan
+        self.misses += 1
+        plan = KeyPlan(self._compile(text), text)
+        if self.cache_size:
+            self._cache[text] = plan
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return plan
+
+    def _compile(self, text: str) -> List[Action]:
+        actions: List[Action] = []
+        position = 0
+        for match in MARKUP.finditer(text):
+            body = match.group(1)
+            delay = DELAY_MARKUP.match(body.strip())
+            chord = None if delay else normalize_chord(body)
+            if delay is None and chord is None:
+                # Not markup: stays part of the surrounding literal run
+                continue
+            if match.start() > position:
+                actions.append(("text", text[position:match.start()]))
+            position = match.end()
+            if delay:
+                actions.append(("delay", float(delay.group(1))))
+            else:
+                actions.append(("chord", chord))
+                settle = self.key_delays.get(chord, self.key_delays["default"])
+                if settle:
+                    actions.append(("delay", settle))
+        if position < len(text):
+            actions.append(("text", text[position:]))
+        return actions
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._cache)
+        }
+
+class InputBackend(ABC):
+    """Where key presses go. Subclasses send them to the OS or record them.
+
+    write, send, press and release are abstract, so a backend missing one
+    fails when it is built rather than partway through a run.
+    """
+
+    name = "backend"
+    tracer = None  # set by build_backend; plan delays are then counted as "input.sleep"
+
+    @abstractmethod
+    def write(self, text: str):
+        """Type a run of literal text in as few OS calls as the backend allows."""
+
+    @abstractmethod
+    def send(self, chord: str):
+        """Press and release a chord such as "ctrl+f"."""
+
+    @abstractmethod
+    def press(self, key: str):
+        """Hold a key down."""
+
+    @abstractmethod
+    def release(self, key: str):
+        """Let go of a held key."""
+
+    def sleep(self, seconds: float):
+        if self.tracer:
+            self.tracer.sleep(seconds, "input.sleep")
+        else:
+            time.sleep(seconds)
+
+    def run(self, plan: KeyPlan):
+        """Replay a plan as fast as the plan's own delays allow."""
+        for kind, value in plan.actions:
+            if kind == "text":
+                self.write(value)
+            elif kind == "chord":
+                self.send(value)
+            elif kind == "delay":
+                self.sleep(value)
+
+class KeyboardBackend(InputBackend):
+    """The keyboard package (the default); each text run is one keyboard.write call.
+
+    keyboard_module replaces the package, e.g. with the simulated keyboard.
+    """
+
+    name = "keyboard"
+
+    def __init__(self, backend_config: Optional[dict] = None, keyboard_module=None):
+        if keyboard_module is None:
+            import keyboard as keyboard_module
+        self.keyboard = keyboard_module
+
+    def write(self, text: str):
+        self.keyboard.write(text)
+
+    def send(self, chord: str):
+        self.keyboard.press_and_release(chord)
+
+    def press(self, key: str):
+        self.keyboard.press(key)
+
+    def release(self, key: str):
+        self.keyboard.release(key)
+
+class XdotoolBackend(InputBackend):
+    """xdotool on X11; each text run is one `xdotool type` process."""
+
+    name = "xdotool"
+    KEYSYMS = {
+        "enter": "Return", "tab": "Tab", "escape": "Escape", "backspace": "BackSpace",
+        "delete": "Delete", "insert": "Insert", "space": "space", "up": "Up", "down": "Down",
+        "left": "Left", "right": "Right", "home": "Home", "end": "End",
+        "pageup": "Prior", "pagedown": "Next", "win": "super", "command": "super"
+    }
+
+    def __init__(self, backend_config: Optional[dict] = None):
+        backend_config = backend_config or {}
+        self.executable = backend_config.get("executable", "xdotool")
+        self.type_delay_ms = backend_config.get("type_delay_ms", 0)
+        if shutil.which(self.executable) is None:
+            raise RuntimeError(f"xdotool backend selected but {self.executable} is not installed")
+
+    def _keysym(self, chord: str) -> str:
+        return "+".join(self.KEYSYMS.get(part, part.upper() if part.startswith("f") and part[1:].isdigit() else part)
+                        for part in chord.split("+"))
+
+    def _run(self, *args: str):
+        subprocess.run([self.executable, *args], check=True)
+
+    def write(self, text: str):
+        if text:
+            self._run("type", "--delay", str(self.type_delay_ms), "--", text)
+
+    def send(self, chord: str):
+        self._run("key", self._keysym(chord))
+
+    def press(self, key: str):
+        self._run("keydown", self._keysym(key))
+
+    def release(self, key: str):
+        self._run("keyup", self._keysym(key))
+
+class RecorderBackend(InputBackend):
+    """Keeps every action in memory instead of pressing keys.
+
+    Delays are recorded, not slept, unless realtime is set, so plans can
+    be checked in tests and dry runs at full speed.
+    """
+
+    name = "recorder"
+
+    def __init__(self, backend_config: Optional[dict] = None):
+        backend_config = backend_config or {}
+        self.realtime = backend_config.get("realtime", False)
+        self.events: List[Tuple[str, Any]] = []
+
+    def write(self, text: str):
+        self.events.append(("write", text))
+
+    def send(self, chord: str):
+        self.events.append(("send", chord))
+
+    def press(self, key: str):
+        self.events.append(("press", key))
+
+    def release(self, key: str):
+        self.events.append(("release", key))
+
+    def sleep(self, seconds: float):
+        self.events.append(("sleep", seconds))
+        if self.realtime:
+            super().sleep(seconds)
+
+    @property
+    def text(self) -> str:
+        """Everything written, in order."""
+        return "".join(value for kind, value in self.events if kind == "write")
+
+    def clear(self):
+        self.events.clear()
+
+BACKENDS = {
+    "keyboard": KeyboardBackend,
+    "xdotool": XdotoolBackend,
+    "recorder": RecorderBackend
+}
+
+def build_backend(input_config: Optional[dict] = None, keyboard_module=None, tracer=None) -> InputBackend:
+    """Backend named by input_config["backend"] (default "keyboard"), given its own settings block.
+
+    A keyboard_module (the simulated keyboard) makes the keyboard backend type into it;
+    with a tracer, time spent in plan delays is counted.
+    """
+    input_config = input_config or {}
+    name = input_config.get("backend", "keyboard")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend: {name}")
+    logging.getLogger('KeyPlan').debug(f"Using {name} input backend")
+    if name == "keyboard":
+        backend = KeyboardBackend(input_config.get(name, {}), keyboard_module)
+    else:
+        backend = BACKENDS[name](input_config.get(name, {}))
+    backend.tracer = tracer
+    return backend
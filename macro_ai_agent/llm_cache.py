@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class ResponseCache:
+    """Content-addressed LLM response cache: in-memory LRU backed by a disk store.
+
+    Entries are keyed on (endpoint, model, prompt hash, temperature, max_tokens), expire
+    after ttl_seconds and the disk store is trimmed least-recently-used first
+    once it grows past max_disk_mb.
+    """
+
+    def __init__(self, cache_config: dict):
+        self.enabled = cache_config.get("enabled", True)
+        self.directory = cache_config.get("directory", "output/cache/llm")
+        self.max_memory_entries = cache_config.get("max_memory_entries", 256)
+        self.max_disk_bytes = int(cache_config.get("max_disk_mb", 64) * 1024 * 1024)
+        self.ttl_seconds = cache_config.get("ttl_seconds", 7 * 24 * 3600)
+        self.bypass_nonzero_temperature = cache_config.get("bypass_nonzero_temperature", False)
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._disk_index: Optional[Dict[str, list]] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('ResponseCache')
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, max_tokens: int, endpoint: str = "") -> str:
+        """Build the cache key for a completion request.
+
+        endpoint is the server URL, so replies from one server (e.g. the
+        simulation's stub) are never served for another.
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        raw = json.dumps([endpoint, model, prompt_hash, temperature, max_tokens])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def should_bypass(self, temperature: float) -> bool:
+        """Whether a call at this temperature skips the cache."""
+        return not self.enabled or (self.bypass_nonzero_temperature and temperature != 0)
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry["created"] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry["response"]
+            if entry is not None:
+                del self._memory[key]
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return entry["response"]
+
+    def put(self, key: str, response: str, model: str = ""):
+        """Store a response in memory and on disk."""
+        if not self.enabled or not response:
+            return
+        entry = {"created": time.time(), "model": model, "response": response}
+        with self._lock:
+            self._remember(key, entry)
+        try:
+            self._write_disk(key, entry)
+        except OSError as e:
+            # The response already reached the caller and the memory cache; only the disk copy is lost
+            self.logger.warning(f"Could not write cache entry {key[:12]}: {e}")
+
+    def record_bypass(self):
+        """Count a call that skipped the cache."""
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current cache sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": sum(size for size, _ in self._load_index().values())
+            }
+
+    def clear(self):
+        """Drop every cached entry from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+            index = self._load_index()
+            for key in list(index):
+                self._remove_disk(key)
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        """Insert into the in-memory LRU. Caller holds the lock."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self) -> Dict[str, list]:
+        """Scan the disk store once; afterwards the index is kept in sync. Caller holds the lock."""
+        if self._disk_index is None:
+            self._disk_index = {}
+            if os.path.isdir(self.directory):
+                for filename in os.listdir(self.directory):
+                    if filename.endswith(".json"):
+                        stat = os.stat(os.path.join(self.directory, filename))
+                        self._disk_index[filename[:-5]] = [stat.st_size, stat.st_mtime]
+        return self._disk_index
+
+    def _read_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            if now - entry.get("created", 0) > self.ttl_seconds:
+                self._remove_disk(key)
+                return None
+            # mtime doubles as the last-access time for LRU trimming
+            os.utime(path, (now, now))
+            index = self._load_index()
+            if key in index:
+                index[key][1] = now
+        return entry
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        # A unique temp file per write: concurrent puts of the same key must not share one
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.directory, prefix=f"{key}.",
+                                             suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            index = self._load_index()
+            index[key] = [os.path.getsize(path), time.time()]
+            self._trim_disk(index)
+
+    def _trim_disk(self, index: Dict[str, list]):
+        """Evict least-recently-used files until under max_disk_bytes. Caller holds the lock."""
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_disk_bytes:
+            return
+        for key in sorted(index, key=lambda k: index[k][1]):
+            if total <= self.max_disk_bytes:
+                break
+            total -= index[key][0]
+            self._remove_disk(key)
+            self.evictions += 1
+
+    def _remove_disk(self, key: str):
+        """Remove an entry's file and index record. Caller holds the lock."""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        if self._disk_index is not None:
+            self._disk_index.pop(key, None)
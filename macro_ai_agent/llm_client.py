@@ -1,52 +1,378 @@
-import requests
 import json
+import logging
 import base64
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import os
 from PIL import Image
 import io
 import time
+import glob
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from .llm_cache import ResponseCache
+from .llm_transport import get_transport
+from .prefix_cache import PrefixCache
+from .token_budget import TokenBudget, compact_json, estimate_tokens
+from .sim.environment import get_simulation
+from .tracing import get_tracer, traced
+from .structured_output import (
+    ANALYSIS_SCHEMA,
+    EVALUATION_SCHEMA,
+    FEEDBACK_BATCH_SCHEMA,
+    JSONObjectExtractor,
+    extract_json_object,
+    missing_fields,
+    subschema
+)
 
 class LLMClient:
     def __init__(self, config: dict):
         self.config = config
         self.api_url = config["llm"]["api_url"]
+        # Simulation swaps Ollama for the local stub server
+        simulation = get_simulation(config)
+        if simulation and simulation.api_url:
+            self.api_url = simulation.api_url
         self.model = config["llm"]["model"]
         self.temperature = config["llm"]["temperature"]
         self.max_tokens = config["llm"]["max_tokens"]
+        self.transport = get_transport(config["llm"])
+        # last_* reports are per thread: async calls run concurrently on the worker pool
+        self._reports = threading.local()
+        self.cache = ResponseCache(config["llm"].get("cache", {}))
+        self.max_concurrency = config["llm"].get("max_concurrency", 4)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphores = weakref.WeakKeyDictionary()
+        self.prefixes = PrefixCache(config["llm"], self._send_raw)
+        self.structured_output = config["llm"].get("structured_output", "schema")
+        self.structured_field_retries = config["llm"].get("structured_field_retries", 1)
+        self.context_window = config["llm"].get("context_window", 8192)
+        self.batch_verdict_tokens = config["llm"].get("batch_verdict_tokens", 150)
+        self.budget = TokenBudget(config["llm"])
+        self.tracer = get_tracer(config)
+        self.logger = logging.getLogger('LLMClient')
+
+    REPORTS = ("last_stream_stats", "last_structured_stats", "last_budget_report")
+
+    @property
+    def last_stream_stats(self) -> Dict[str, Any]:
+        """Time to first token, tokens and tokens/sec of the last stream on this thread."""
+        return getattr(self._reports, "last_stream_stats", {})
+
+    @last_stream_stats.setter
+    def last_stream_stats(self, stats: Dict[str, Any]):
+        self._reports.last_stream_stats = stats
+
+    @property
+    def last_structured_stats(self) -> Dict[str, Any]:
+        """Calls, missing fields and time of the last structured request on this thread."""
+        return getattr(self._reports, "last_structured_stats", {})
+
+    @last_structured_stats.setter
+    def last_structured_stats(self, stats: Dict[str, Any]):
+        self._reports.last_structured_stats = stats
+
+    @property
+    def last_budget_report(self) -> Dict[str, Any]:
+        """Token budget report of the last prompt built on this thread."""
+        return getattr(self._reports, "last_budget_report", {})
+
+    @last_budget_report.setter
+    def last_budget_report(self, report: Dict[str, Any]):
+        self._reports.last_budget_report = report
+
+    def _report_state(self) -> Dict[str, Dict[str, Any]]:
+        state = {name: getattr(self, name) for name in self.REPORTS}
+        state["budget"] = self.budget.last_report
+        return state
+
+    def _restore_reports(self, state: Dict[str, Dict[str, Any]]):
+        for name in self.REPORTS:
+            setattr(self, name, state[name])
+        self.budget.last_report = state["budget"]
 
     def _encode_image(self, image_path: str) -> str:
         """Encode image to base64 string."""
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode('utf-8')
 
+    def _build_payload(self, prompt: str) -> Dict[str, Any]:
+        """Build an Ollama generate payload for a single non-streamed completion."""
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": self.temperature,
+                "num_predict": self.max_tokens
+            }
+        }
+
+    def _cache_key(self, payload: Dict[str, Any]) -> str:
+        """Cache key for a payload and this client's server; non-default fields are folded into the prompt hash."""
+        options = payload.get("options", {})
+        extras = {k: v for k, v in payload.items() if k not in ("model", "prompt", "stream", "options")}
+        if self.prefixes.mode == "context":
+            # Context-mode replies answer prefix and delta as separate turns, not the full prompt
+            extras["prefix_cache"] = "context"
+        extra_options = {k: v for k, v in options.items() if k not in ("temperature", "num_predict")}
+        if extra_options:
+            extras["options"] = extra_options
+        prompt = payload["prompt"]
+        if extras:
+            prompt += json.dumps(extras, sort_keys=True)
+        return ResponseCache.make_key(
+            payload["model"], prompt, options.get("temperature"), options.get("num_predict"), self.api_url
+        )
+
+    def _use_cache(self, payload: Dict[str, Any], use_cache: bool) -> bool:
+        """Decide whether a payload goes through the response cache."""
+        if use_cache and not self.cache.should_bypass(payload.get("options", {}).get("temperature", 0)):
+            return True
+        self.cache.record_bypass()
+        return False
+
+    def _post(self, payload: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+        """Return the decoded body for a payload, from the cache when possible."""
+        with self.tracer.span("llm.generate", model=payload["model"]) as span:
+            if not self._use_cache(payload, use_cache):
+                return self._send(payload)
+            key = self._cache_key(payload)
+            cached = self.cache.get(key)
+            span.set(cached=cached is not None)
+            if cached is not None:
+                return {"response": cached, "done": True, "cached": True}
+            body = self._send(payload)
+            self.cache.put(key, body.get("response", ""), self.model)
+            return body
+
+    def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a payload, reusing the evaluated prompt prefix where possible."""
+        payload, prefix_info = self.prefixes.prepare(payload)
+        body = self._send_raw(payload)
+        self.prefixes.record(prefix_info, body)
+        return body
+
+    def _send_raw(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a payload over the shared transport and return the decoded body."""
+        with self.tracer.span("llm.http", prompt_chars=len(payload.get("prompt", ""))) as span:
+            response = self.transport.post(self.api_url, payload)
+            span.set(status=response.status_code)
+            response.raise_for_status()
+            body = response.json()
+            self._record_usage(span, body, self._request_bytes(response), len(response.content))
+            return body
+
+    def _request_bytes(self, response) -> Optional[int]:
+        """Size of the request body that produced a response, when the transport kept it."""
+        body = getattr(getattr(response, "request", None), "body", None)
+        return len(body) if body is not None else None
+
+    def _record_usage(self, span, body: Dict[str, Any], request_bytes: Optional[int], response_bytes: int):
+        """Token counts, bytes and Ollama's own timings for one request, on its span."""
+        if not self.tracer.enabled:
+            return
+        span.count(
+            prompt_tokens=body.get("prompt_eval_count"),
+            completion_tokens=body.get("eval_count"),
+            request_bytes=request_bytes,
+            response_bytes=response_bytes
+        )
+        span.set(**{
+            f"{name[:-len('_duration')]}_ms": body[name] / 1e6
+            for name in ("load_duration", "prompt_eval_duration", "eval_duration", "total_duration")
+            if body.get(name)
+        })
+
+    def _stream(self, payload: Dict[str, Any], use_cache: bool = True) -> Iterator[str]:
+        """Yield response chunks, replaying cached responses as a single chunk."""
+        if not self._use_cache(payload, use_cache):
+            yield from self._stream_live(payload)
+            return
+        key = self._cache_key(payload)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.last_stream_stats = {
+                "time_to_first_token": 0.0,
+                "total_time": 0.0,
+                "tokens": 0,
+                "tokens_per_second": 0.0,
+                "cancelled": False,
+                "cached": True
+            }
+            yield cached
+            return
+        chunks = []
+        live = self._stream_live(payload)
+        try:
+            for chunk in live:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            live.close()
+        if not self.last_stream_stats.get("cancelled"):
+            self.cache.put(key, "".join(chunks), self.model)
+
+    def _stream_live(self, payload: Dict[str, Any]) -> Iterator[str]:
+        """Yield response chunks from Ollama's NDJSON stream.
+
+        Closing the generator early closes the HTTP response, which drops the
+        connection and makes Ollama stop generating.
+        """
+        payload, prefix_info = self.prefixes.prepare(dict(payload, stream=True))
+        # Not made current: the consumer runs between yields and its spans are not part of this one
+        span = self.tracer.start_span("llm.stream", model=payload["model"], prompt_chars=len(payload["prompt"]))
+        start = time.perf_counter()
+        first_token_at = None
+        chunks = 0
+        received = 0
+        final: Dict[str, Any] = {}
+        completed = False
+        error = None
+        try:
+            response = self.transport.post(self.api_url, payload, stream=True)
+        except Exception as e:
+            span.end(e)
+            raise
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                received += len(line) + 1
+                data = json.loads(line)
+                token = data.get("response", "")
+                if token:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    chunks += 1
+                    yield token
+                if data.get("done"):
+                    final = data
+                    completed = True
+                    break
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            response.close()
+            self.prefixes.record(prefix_info, final)
+            self.last_stream_stats = self._stream_stats(start, first_token_at, chunks, final, completed)
+            ttft = self.last_stream_stats["time_to_first_token"]
+            span.set(cancelled=not completed, time_to_first_token_ms=None if ttft is None else ttft * 1000)
+            self._record_usage(span, dict(final, eval_count=self.last_stream_stats["tokens"]),
+                               self._request_bytes(response), received)
+            span.end(error)
+
+    def _stream_stats(self, start: float, first_token_at: Optional[float], chunks: int,
+                      final: Dict[str, Any], completed: bool) -> Dict[str, Any]:
+        """Summarise a stream: time to first token, tokens and tokens/sec."""
+        elapsed = time.perf_counter() - start
+        tokens = final.get("eval_count", chunks)
+        if final.get("eval_duration"):
+            tokens_per_second = tokens / (final["eval_duration"] / 1e9)
+        elif first_token_at is not None and elapsed > first_token_at - start:
+            tokens_per_second = chunks / (elapsed - (first_token_at - start))
+        else:
+            tokens_per_second = 0.0
+        return {
+            "time_to_first_token": None if first_token_at is None else first_token_at - start,
+            "total_time": elapsed,
+            "tokens": tokens,
+            "tokens_per_second": tokens_per_second,
+            "cancelled": not completed
+        }
+
+    def _stream_request(self, prompt: str) -> Iterator[str]:
+        """Stream a request to the LLM API, yielding chunks as they arrive."""
+        try:
+            yield from self._stream(self._build_payload(prompt))
+        except Exception as e:
+            print(f"Error streaming LLM request: {e}")
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Get request and connection reuse counters for the shared transport."""
+        return self.transport.stats()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit/miss counters."""
+        return self.cache.stats()
+
+    def prefix_stats(self) -> Dict[str, Any]:
+        """Get prompt-eval tokens saved by prefix reuse, in total and for the last call."""
+        return self.prefixes.stats()
+
+    def warm_cache_from_results(self, pattern: str = "output/results/task_*.json") -> int:
+        """Seed the response cache from recorded task-runner results.
+
+        Rebuilds the break_down_task and per-step analyze_feedback prompts of
+        each recorded run and stores the recorded answers, so replaying those
+        runs costs no model calls. Returns the number of entries seeded.
+        """
+        seeded = 0
+        for path in sorted(glob.glob(pattern)):
+            with open(path, "r", encoding="utf-8") as f:
+                run = json.load(f)
+            steps = run.get("steps", [])
+            if run.get("task") and steps:
+                # break_down_task keeps only the numbered lines, so the step
+                # descriptions alone reproduce the parsed plan
+                prompt = self._build_prompt(self._break_down_prompt(run["task"]))
+                response = "\n".join(step["description"] for step in steps)
+                self.cache.put(self._cache_key(self._build_payload(prompt)), response, self.model)
+                seeded += 1
+            for step in steps:
+                analysis = step.get("analysis") or {}
+                if "feedback" not in step or not analysis.get("analysis"):
+                    continue
+                prompt = self._build_prompt(self._analyze_feedback_prompt(step["feedback"], step["description"]))
+                self.cache.put(self._cache_key(self._build_payload(prompt)), analysis["analysis"], self.model)
+                seeded += 1
+        return seeded
+
     def _make_request(self, prompt: str) -> str:
         """Make a request to the LLM API."""
         try:
-            response = requests.post(
-                self.api_url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "temperature": self.temperature,
-                    "max_tokens": self.max_tokens
-                }
-            )
-            response.raise_for_status()
-            return response.json()["response"]
+            return self._post(self._build_payload(prompt))["response"]
         except Exception as e:
             print(f"Error making LLM request: {e}")
             return ""
 
+    def _rules_block(self, rules: str) -> str:
+        """Rules block that leads every design prompt, kept byte-stable so it can be reused."""
+        return f"Rules to follow:\n{rules}\n\n"
+
+    def _fit_prompt(self, name: str, render, fields: Dict[str, str], shrink_order: List[str],
+                    history: Optional[List[str]] = None) -> str:
+        """Render a prompt inside the token budget and report what it cost."""
+        prompt, fitted = self.budget.fit(render, fields, shrink_order, history)
+        if "rules" in fitted:
+            self.prefixes.register(self._rules_block(fitted["rules"]))
+        report = dict(self.budget.last_report, prompt=name)
+        self.last_budget_report = report
+        if report["truncated"] or report["history_dropped"] or report["history_summarized"]:
+            self.logger.info(f"Prompt budget for {name}: {report}")
+        else:
+            self.logger.debug(f"Prompt budget for {name}: {report}")
+        return prompt
+
+    @traced("llm.analyze_image_and_goal")
     def analyze_image_and_goal(self, image_path: str, goal: str, rules: str) -> Dict:
         """Analyze the image and goal to generate a plan."""
-        prompt = f"""As an AI assistant, analyze this image and goal to create a development plan.
+        return self._structured_request(
+            self._analysis_prompt(image_path, goal, rules), ANALYSIS_SCHEMA, self._empty_analysis()
+        )
 
-Image: {image_path}
-Goal: {goal}
+    def _analysis_prompt(self, image_path: str, goal: str, rules: str) -> str:
+        """Build the image and goal analysis prompt."""
+        return self._fit_prompt(
+            "analyze_image_and_goal",
+            lambda f: self._rules_block(f["rules"]) + f"""As an AI assistant, analyze this image and goal to create a development plan.
 
-Rules to follow:
-{rules}
+Image: {f["image_path"]}
+Goal: {f["goal"]}
 
 Please provide:
 1. Key visual elements to implement
@@ -60,28 +386,37 @@ Format your response as a JSON object with these keys:
     "technical_requirements": [],
     "implementation_steps": [],
     "challenges": []
-}}"""
+}}""",
+            {"image_path": image_path, "goal": goal, "rules": rules},
+            ["goal", "rules"]
+        )
 
-        response = self._make_request(prompt)
-        try:
-            return json.loads(response)
-        except:
-            return {
-                "visual_elements": [],
-                "technical_requirements": [],
-                "implementation_steps": [],
-                "challenges": []
-            }
+    def _empty_analysis(self) -> Dict:
+        """Fallback analysis when the model gives nothing usable."""
+        return {
+            "visual_elements": [],
+            "technical_requirements": [],
+            "implementation_steps": [],
+            "challenges": []
+        }
 
+    @traced("llm.generate_cursor_prompt")
     def generate_cursor_prompt(self, analysis: Dict, rules: str) -> str:
         """Generate a prompt for Cursor IDE."""
-        prompt = f"""As a developer, help me implement this design based on the analysis.
+        return self._make_request(self._cursor_prompt(analysis, rules))
 
-Analysis:
-{json.dumps(analysis, indent=2)}
+    def stream_cursor_prompt(self, analysis: Dict, rules: str) -> Iterator[str]:
+        """Stream the Cursor IDE prompt chunk by chunk."""
+        return self._stream_request(self._cursor_prompt(analysis, rules))
 
-Rules to follow:
-{rules}
+    def _cursor_prompt(self, analysis: Dict, rules: str) -> str:
+        """Build the prompt used to generate Cursor IDE instructions."""
+        return self._fit_prompt(
+            "generate_cursor_prompt",
+            lambda f: self._rules_block(f["rules"]) + f"""As a developer, help me implement this design based on the analysis.
+
+Analysis:
+{f["analysis"]}
 
 Please provide:
 1. Initial code structure
@@ -89,21 +424,37 @@ Please provide:
 3. Specific implementation details
 4. Any questions or clarifications needed
 
-Format your response as a clear, actionable prompt that I can use to guide the implementation."""
-
-        return self._make_request(prompt)
-
-    def generate_follow_up(self, goal: str, current_result: str, evaluation: Dict, rules: str) -> str:
-        """Generate a follow-up prompt based on the current result and evaluation."""
-        prompt = f"""Based on the current implementation and evaluation, help me improve the code.
-
-Goal: {goal}
-Current Result: {current_result}
-Evaluation: {json.dumps(evaluation, indent=2)}
+Format your response as a clear, actionable prompt that I can use to guide the implementation.""",
+            {"analysis": compact_json(analysis), "rules": rules},
+            ["analysis", "rules"]
+        )
 
-Rules to follow:
-{rules}
+    @traced("llm.generate_follow_up")
+    def generate_follow_up(self, goal: str, current_result: str, evaluation: Dict, rules: str,
+                           history: Optional[List[Dict]] = None) -> str:
+        """Generate a follow-up prompt based on the current result and evaluation.
 
+        history holds earlier evaluations, oldest first; it is summarized or
+        dropped first when the prompt would exceed the token budget.
+        """
+        return self._make_request(self._follow_up_prompt(goal, current_result, evaluation, rules, history))
+
+    def stream_follow_up(self, goal: str, current_result: str, evaluation: Dict, rules: str,
+                         history: Optional[List[Dict]] = None) -> Iterator[str]:
+        """Stream the follow-up prompt chunk by chunk."""
+        return self._stream_request(self._follow_up_prompt(goal, current_result, evaluation, rules, history))
+
+    def _follow_up_prompt(self, goal: str, current_result: str, evaluation: Dict, rules: str,
+                          history: Optional[List[Dict]] = None) -> str:
+        """Build the prompt used to generate follow-up instructions."""
+        def render(f: Dict[str, str]) -> str:
+            previous = f"\nPrevious evaluations (oldest first):\n{f['history']}\n" if f["history"] else ""
+            return self._rules_block(f["rules"]) + f"""Based on the current implementation and evaluation, help me improve the code.
+
+Goal: {f["goal"]}
+Current Result: {f["current_result"]}
+Evaluation: {f["evaluation"]}
+{previous}
 Please provide:
 1. What needs to be improved
 2. Specific code changes needed
@@ -112,17 +463,34 @@ Please provide:
 
 Format your response as a clear, actionable prompt that I can use to guide the improvements."""
 
-        return self._make_request(prompt)
+        return self._fit_prompt(
+            "generate_follow_up",
+            render,
+            {"goal": goal, "current_result": current_result, "evaluation": compact_json(evaluation), "rules": rules},
+            ["current_result", "evaluation", "goal", "rules"],
+            [compact_json(item) for item in history or []]
+        )
 
+    @traced("llm.evaluate_result")
     def evaluate_result(self, goal: str, result: str, rules: str) -> Dict:
-        """Evaluate the current result against the goal and rules."""
-        prompt = f"""Evaluate this implementation against the goal and rules.
+        """Evaluate the current result against the goal and rules.
+
+        Never cached: the verdict judges live state, so a replayed one would
+        repeat the first evaluation on every retry.
+        """
+        return self._structured_request(
+            self._evaluation_prompt(goal, result, rules), EVALUATION_SCHEMA, self._failed_evaluation(),
+            use_cache=False
+        )
 
-Goal: {goal}
-Current Result: {result}
+    def _evaluation_prompt(self, goal: str, result: str, rules: str) -> str:
+        """Build the result evaluation prompt."""
+        return self._fit_prompt(
+            "evaluate_result",
+            lambda f: self._rules_block(f["rules"]) + f"""Evaluate this implementation against the goal and rules.
 
-Rules to follow:
-{rules}
+Goal: {f["goal"]}
+Current Result: {f["result"]}
 
 Please evaluate:
 1. Visual match with design
@@ -139,21 +507,88 @@ Format your response as a JSON object with these keys:
     "success": true/false,
     "feedback": "",
     "improvements_needed": []
-}}"""
+}}""",
+            {"goal": goal, "result": result, "rules": rules},
+            ["result", "goal", "rules"]
+        )
+
+    def _failed_evaluation(self) -> Dict:
+        """Fallback evaluation when the model gives nothing usable."""
+        return {
+            "visual_match_score": 0,
+            "technical_score": 0,
+            "rule_compliance_score": 0,
+            "overall_score": 0,
+            "success": False,
+            "feedback": "Error evaluating result",
+            "improvements_needed": []
+        }
+
+    def _structured_request(self, prompt: str, schema: Dict[str, Any], fallback: Dict,
+                            use_cache: bool = True) -> Dict:
+        """Request a JSON object matching schema, re-asking only for fields that are missing."""
+        start = time.perf_counter()
+        result = self._request_object(prompt, schema, use_cache)
+        calls = 1
+        missing = missing_fields(result, schema)
+        retries = 0
+        while result and missing and retries < self.structured_field_retries:
+            retries += 1
+            follow_up = (
+                f"{prompt}\n\nYour previous answer was missing or had invalid values for: "
+                f"{', '.join(missing)}. Respond with a JSON object containing only these keys."
+            )
+            part = self._request_object(follow_up, subschema(schema, missing), use_cache)
+            calls += 1
+            for field in missing:
+                if field in part:
+                    result[field] = part[field]
+            missing = missing_fields(result, schema)
+
+        self.last_structured_stats = {
+            "calls": calls,
+            "missing_fields": missing,
+            "used_fallback": not result,
+            "time": time.perf_counter() - start
+        }
+        if not result:
+            return fallback
+        for field in missing:
+            result[field] = fallback[field]
+        return result
+
+    def _request_object(self, prompt: str, schema: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+        """Stream a completion and stop as soon as the first JSON object is complete."""
+        payload = self._build_payload(prompt)
+        if self.structured_output == "schema":
+            payload["format"] = schema
+        elif self.structured_output == "json":
+            payload["format"] = "json"
 
-        response = self._make_request(prompt)
         try:
-            return json.loads(response)
-        except:
-            return {
-                "visual_match_score": 0,
-                "technical_score": 0,
-                "rule_compliance_score": 0,
-                "overall_score": 0,
-                "success": False,
-                "feedback": "Error evaluating result",
-                "improvements_needed": []
-            }
+            key = self._cache_key(payload) if self._use_cache(payload, use_cache) else None
+            if key:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return extract_json_object(cached) or {}
+
+            extractor = JSONObjectExtractor()
+            stream = self._stream_live(payload)
+            try:
+                for chunk in stream:
+                    if extractor.feed(chunk) is not None:
+                        break
+            finally:
+                stream.close()
+        except Exception as e:
+            print(f"Error making structured LLM request: {e}")
+            return {}
+
+        if extractor.result is None:
+            return {}
+        if key:
+            self.cache.put(key, json.dumps(extractor.result), self.model)
+        return extractor.result
 
     def get_current_result(self) -> str:
         """Get the current result from the implementation."""
@@ -161,22 +596,15 @@ Format your response as a JSON object with these keys:
         # For now, returning a placeholder
         return "Current implementation state"
 
+    @traced("llm.generate_response")
     def generate_response(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
         """Generate a response from the LLM with optional context."""
         full_prompt = self._build_prompt(prompt, context)
-        
-        response = requests.post(
-            self.api_url,
-            json={
-                "model": self.model,
-                "prompt": full_prompt,
-                "stream": False,
-                "temperature": self.config["temperature"],
-                "max_tokens": self.config["max_tokens"]
-            }
-        )
-        response.raise_for_status()
-        return response.json()["response"]
+        return self._post(self._build_payload(full_prompt))["response"]
+
+    def stream_response(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Stream a response from the LLM with optional context, chunk by chunk."""
+        return self._stream(self._build_payload(self._build_prompt(prompt, context)))
 
     def _build_prompt(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
         """Build a prompt with context and system instructions."""
@@ -189,18 +617,30 @@ Format your response as a JSON object with these keys:
         4. Include verification steps
         """
         
-        if context:
-            context_str = f"\nContext:\n{json.dumps(context, indent=2)}"
-        else:
-            context_str = ""
-            
-        return f"{system_instructions}\n{context_str}\nTask: {prompt}\nResponse:"
+        prefix = self.prefixes.register(f"{system_instructions}\n")
+
+        def render(f: Dict[str, str]) -> str:
+            context_str = f"\nContext:\n{f['context']}" if f["context"] else ""
+            return f"{prefix}{context_str}\nTask: {f['task']}\nResponse:"
+
+        return self._fit_prompt(
+            "generate_response",
+            render,
+            {"context": compact_json(context) if context else "", "task": prompt},
+            ["context", "task"]
+        )
 
+    @traced("llm.break_down_task")
     def break_down_task(self, task: str, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Break down a task into executable steps."""
-        prompt = f"Break down this task into specific steps: {task}"
-        response = self.generate_response(prompt, context)
-        
+        return self._parse_steps(self.generate_response(self._break_down_prompt(task), context))
+
+    def _break_down_prompt(self, task: str) -> str:
+        """Build the task breakdown prompt."""
+        return f"Break down this task into specific steps: {task}"
+
+    def _parse_steps(self, response: str) -> List[Dict[str, Any]]:
+        """Parse numbered lines of a breakdown into pending steps."""
         # Parse the response into structured steps
         # This is a simple implementation - you might want to make it more robust
         steps = []
@@ -213,20 +653,105 @@ Format your response as a JSON object with these keys:
                 })
         return steps
 
+    @traced("llm.analyze_feedback")
     def analyze_feedback(self, feedback: Dict[str, Any], task: str) -> Dict[str, Any]:
         """Analyze feedback and determine next steps."""
-        prompt = f"""
-        Analyze this feedback and determine if the task was successful or needs adjustment.
-        Task: {task}
-        Feedback: {json.dumps(feedback, indent=2)}
-        """
-        response = self.generate_response(prompt)
+        return self._parse_feedback_analysis(self.generate_response(self._analyze_feedback_prompt(feedback, task)))
+
+    def _parse_feedback_analysis(self, response: str) -> Dict[str, Any]:
+        """Turn a free-text feedback analysis into a verdict."""
         return {
             "analysis": response,
             "success": "success" in response.lower(),
             "suggestions": self._extract_suggestions(response)
         }
 
+    def _analyze_feedback_prompt(self, feedback: Dict[str, Any], task: str) -> str:
+        """Build the feedback analysis prompt."""
+        return f"""
+        Analyze this feedback and determine if the task was successful or needs adjustment.
+        Task: {task}
+        Feedback: {compact_json(feedback)}
+        """
+
+    @traced("llm.analyze_feedback_batch")
+    def analyze_feedback_batch(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """Analyze many (feedback, task) pairs with one structured call per batch.
+
+        Batches are split so each prompt fits the prompt budget untruncated
+        and, with its expected verdicts, the context window. Results are in input order, shaped like analyze_feedback.
+        """
+        verdicts: Dict[int, Dict[str, Any]] = {}
+        for batch in self._feedback_batches(items):
+            verdicts.update(self._analyze_batch(batch))
+        return self._collect_verdicts(items, verdicts)
+
+    def _feedback_batches(self, items: List[Tuple[Dict[str, Any], str]]) -> List[List[Tuple[int, Dict[str, Any], str]]]:
+        """Split indexed items into batches whose estimated prompt fits the prompt budget
+        (so _fit_prompt never truncates it) and whose prompt plus verdicts fit the context window."""
+        overhead = estimate_tokens(self._batch_prompt([]))
+        batches = []
+        batch: List[Tuple[int, Dict[str, Any], str]] = []
+        used = overhead
+        for index, (feedback, task) in enumerate(items):
+            cost = estimate_tokens(self._batch_item(index, feedback, task))
+            output = (len(batch) + 1) * self.batch_verdict_tokens
+            over_budget = used + cost > self.budget.budget
+            over_context = used + cost + output > self.context_window
+            over_output = output > self.max_tokens
+            if batch and (over_budget or over_context or over_output):
+                batches.append(batch)
+                batch = []
+                used = overhead
+            batch.append((index, feedback, task))
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _batch_item(self, index: int, feedback: Dict[str, Any], task: str) -> str:
+        """One step of a batched feedback prompt."""
+        return f"[{index}] Task: {task}\nFeedback: {json.dumps(feedback, separators=(',', ':'))}\n"
+
+    def _batch_prompt(self, batch: List[Tuple[int, Dict[str, Any], str]]) -> str:
+        """Build the prompt for one batch of feedback analyses."""
+        steps = "".join(self._batch_item(index, feedback, task) for index, feedback, task in batch)
+        return self._build_prompt(f"""Analyze the feedback for each step below and decide whether that step was successful or needs adjustment.
+
+{steps}
+Respond with a JSON object {{"verdicts": [...]}} holding one entry per step with keys
+"index" (the number in brackets), "success" (true/false), "analysis" (a short explanation)
+and "suggestions" (a list of concrete next actions).""")
+
+    def _analyze_batch(self, batch: List[Tuple[int, Dict[str, Any], str]]) -> Dict[int, Dict[str, Any]]:
+        """Run one batch and return verdicts keyed by item index."""
+        response = self._request_object(self._batch_prompt(batch), FEEDBACK_BATCH_SCHEMA)
+        wanted = {index for index, _, _ in batch}
+        verdicts = {}
+        for verdict in response.get("verdicts", []):
+            if not isinstance(verdict, dict) or verdict.get("index") not in wanted:
+                continue
+            verdicts[verdict["index"]] = {
+                "analysis": str(verdict.get("analysis", "")),
+                "success": verdict.get("success") is True,
+                "suggestions": [str(item) for item in verdict.get("suggestions", []) if item]
+            }
+        return verdicts
+
+    def _collect_verdicts(self, items: List[Tuple[Dict[str, Any], str]],
+                          verdicts: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Order verdicts by input, analyzing any the batch call dropped one by one."""
+        results = []
+        for index, (feedback, task) in enumerate(items):
+            if index not in verdicts:
+                try:
+                    verdicts[index] = self.analyze_feedback(feedback, task)
+                except Exception as e:
+                    print(f"Error analyzing feedback: {e}")
+                    verdicts[index] = {"analysis": "", "success": False, "suggestions": []}
+            results.append(verdicts[index])
+        return results
+
     def _extract_suggestions(self, response: str) -> List[str]:
         """Extract specific suggestions from the LLM response."""
         suggestions = []
@@ -235,6 +760,102 @@ Format your response as a JSON object with these keys:
                 suggestions.append(line.strip()[1:].strip())
         return suggestions
 
+    # Async API. Requests run on a bounded thread pool over the shared keep-alive
+    # transport, so up to max_concurrency prompts are in flight at once; set
+    # OLLAMA_NUM_PARALLEL on the server to at least that to actually overlap them.
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limiter for the running event loop."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _arun(self, func, *args):
+        """Run a blocking LLM call on the worker pool, bounded by max_concurrency."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        # Prompts are built on the caller's thread before this point; carry its budget report
+        # (and nothing a pool thread kept from an earlier call) over to the worker
+        caller_reports = self._report_state()
+
+        def call():
+            self._restore_reports(caller_reports)
+            return func(*args), self._report_state()
+
+        async with self._semaphore():
+            loop = asyncio.get_running_loop()
+            result, reports = await loop.run_in_executor(self._executor, call)
+        # Hand this call's reports to the awaiting thread; nothing else runs on the loop before the caller resumes
+        self._restore_reports(reports)
+        return result
+
+    async def _apost(self, payload: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+        """Async counterpart of _post."""
+        return await self._arun(self._post, payload, use_cache)
+
+    async def _amake_request(self, prompt: str) -> str:
+        """Async counterpart of _make_request."""
+        try:
+            return (await self._apost(self._build_payload(prompt)))["response"]
+        except Exception as e:
+            print(f"Error making LLM request: {e}")
+            return ""
+
+    async def agenerate_response(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """Async generate_response."""
+        full_prompt = self._build_prompt(prompt, context)
+        return (await self._apost(self._build_payload(full_prompt)))["response"]
+
+    async def aanalyze_image_and_goal(self, image_path: str, goal: str, rules: str) -> Dict:
+        """Async analyze_image_and_goal."""
+        return await self._arun(self.analyze_image_and_goal, image_path, goal, rules)
+
+    async def agenerate_cursor_prompt(self, analysis: Dict, rules: str) -> str:
+        """Async generate_cursor_prompt."""
+        return await self._amake_request(self._cursor_prompt(analysis, rules))
+
+    async def agenerate_follow_up(self, goal: str, current_result: str, evaluation: Dict, rules: str,
+                                  history: Optional[List[Dict]] = None) -> str:
+        """Async generate_follow_up."""
+        return await self._amake_request(self._follow_up_prompt(goal, current_result, evaluation, rules, history))
+
+    async def aevaluate_result(self, goal: str, result: str, rules: str) -> Dict:
+        """Async evaluate_result."""
+        return await self._arun(self.evaluate_result, goal, result, rules)
+
+    async def abreak_down_task(self, task: str, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Async break_down_task."""
+        return self._parse_steps(await self.agenerate_response(self._break_down_prompt(task), context))
+
+    async def aanalyze_feedback(self, feedback: Dict[str, Any], task: str) -> Dict[str, Any]:
+        """Async analyze_feedback."""
+        return self._parse_feedback_analysis(await self.agenerate_response(self._analyze_feedback_prompt(feedback, task)))
+
+    async def aanalyze_feedback_many(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """Analyze independent (feedback, task) pairs concurrently, preserving order."""
+        return await asyncio.gather(*(self.aanalyze_feedback(feedback, task) for feedback, task in items))
+
+    async def aanalyze_feedback_batch(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """Async analyze_feedback_batch; independent batches run concurrently."""
+        verdicts: Dict[int, Dict[str, Any]] = {}
+        batches = self._feedback_batches(items)
+        for batch_verdicts in await asyncio.gather(*(self._arun(self._analyze_batch, batch) for batch in batches)):
+            verdicts.update(batch_verdicts)
+        return await self._arun(self._collect_verdicts, items, verdicts)
+
+    def analyze_feedback_many(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """Analyze independent (feedback, task) pairs concurrently from synchronous code."""
+        return asyncio.run(self.aanalyze_feedback_many(items))
+
+    def close(self):
+        """Shut down the async worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
 if __name__ == "__main__":
     # Example usage
     print(generate_response("Write a Python function that prints 'hi'")) 
\ No newline at end of file
@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+class LLMTransport:
+    """Pooled keep-alive HTTP transport shared by every LLMClient."""
+
+    def __init__(self, llm_config: dict):
+        self.connect_timeout = llm_config.get("connect_timeout", 3.05)
+        self.read_timeout = llm_config.get("read_timeout", 120.0)
+        self.pool_connections = llm_config.get("pool_connections", 4)
+        self.pool_maxsize = llm_config.get("pool_maxsize", 8)
+        self.pool_block = llm_config.get("pool_block", True)
+
+        # pool_connections is the number of hosts kept pooled, pool_maxsize the
+        # number of keep-alive sockets per host. pool_block makes the per-host
+        # limit hard instead of opening throwaway connections past it.
+        self.adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.headers["Connection"] = "keep-alive"
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self._lock = threading.Lock()
+        self.requests_made = 0
+        self.request_errors = 0
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """(connect, read) timeout tuple passed to every request."""
+        return (self.connect_timeout, self.read_timeout)
+
+    def post(self, url: str, payload: Dict[str, Any], stream: bool = False) -> requests.Response:
+        """POST a JSON payload over the pooled session."""
+        with self._lock:
+            self.requests_made += 1
+        try:
+            return self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+        except requests.RequestException:
+            with self._lock:
+                self.request_errors += 1
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        """Connection reuse counters, read from the underlying urllib3 pools."""
+        pools = self.adapter.poolmanager.pools
+        opened = 0
+        served = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            served += pool.num_requests
+        return {
+            "requests": self.requests_made,
+            "errors": self.request_errors,
+            "connections_opened": opened,
+            "connections_reused": max(0, served - opened)
+        }
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+_transports: Dict[tuple, LLMTransport] = {}
+_transports_lock = threading.Lock()
+
+def get_transport(llm_config: dict) -> LLMTransport:
+    """Return the process-wide transport for these pool/timeout settings."""
+    key = (
+        llm_config.get("connect_timeout", 3.05),
+        llm_config.get("read_timeout", 120.0),
+        llm_config.get("pool_connections", 4),
+        llm_config.get("pool_maxsize", 8),
+        llm_config.get("pool_block", True)
+    )
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = LLMTransport(llm_config)
+            _transports[key] = transport
+        return transport
@@ -5,6 +5,9 @@ from typing import List, Dict, Optional
 from .llm_client import LLMClient
 from .typer import CursorTyper
 from .memory import MemoryManager
+from .observer import Observer
+from .conditions import build_condition
+from .tracing import get_tracer, traced
 from datetime import datetime
 import time
 
@@ -33,6 +36,10 @@ class MacroAgent:
         self.llm_client = LLMClient(self.config)
         self.typer = CursorTyper(self.config)
         self.memory = MemoryManager(self.config)
+        self.observer = Observer(self.config)
+        self.tracer = get_tracer(self.config)
+        self.result_conditions = [build_condition(spec) for spec in self.config["task"].get("done_conditions", [])]
+        self.last_wait = None
         
         # Create necessary directories
         os.makedirs(self.config["paths"]["input"]["designs"], exist_ok=True)
@@ -42,8 +49,12 @@ class MacroAgent:
         # Load rules
         self.rules = load_rules(self.config["paths"]["rules_file"])
 
+    @traced("agent.run_image_task")
     def run_image_task(self, image_path: str, goal: str) -> Dict:
         """Run a task based on an image and goal."""
+        # Attempts (and the follow-up history built from them) belong to this task only
+        self.memory.start_task(image_path, goal)
+
         # Get example images for context
         example_images = get_example_images(self.config["paths"]["input"]["designs"])
         
@@ -54,60 +65,77 @@ class MacroAgent:
             rules=self.rules
         )
         
-        # Generate prompt for Cursor
-        cursor_prompt = self.llm_client.generate_cursor_prompt(
-            analysis=analysis,
-            rules=self.rules
-        )
-        
-        # Type the prompt to Cursor
-        self.typer.type_to_cursor(cursor_prompt)
+        # Generate prompt for Cursor and type it, streaming if enabled
+        stream = self.config["llm"].get("stream", False)
+        if stream:
+            cursor_prompt = self.send_to_cursor(
+                self.llm_client.stream_cursor_prompt(analysis=analysis, rules=self.rules)
+            )
+        else:
+            cursor_prompt = self.llm_client.generate_cursor_prompt(
+                analysis=analysis,
+                rules=self.rules
+            )
+            self.send_to_cursor(cursor_prompt)
         
         # Monitor and evaluate results
         max_attempts = self.config["task"]["max_attempts"]
         current_attempt = 0
         
         while current_attempt < max_attempts:
-            # Wait for result
-            time.sleep(self.config["task"]["result_wait_time"])
-            
-            # Get current result
-            result = self.llm_client.get_current_result()
-            
-            # Evaluate result
-            evaluation = self.llm_client.evaluate_result(
-                goal=goal,
-                result=result,
-                rules=self.rules
-            )
-            
-            # Save attempt to memory
-            self.memory.save_attempt(
-                image_path=image_path,
-                goal=goal,
-                prompt=cursor_prompt,
-                result=result,
-                evaluation=evaluation
-            )
+            with self.tracer.span("agent.attempt", attempt=current_attempt + 1) as attempt_span:
+                # Wait until Cursor looks finished, at most result_wait_time seconds
+                self.wait_for_result()
             
-            # Check if goal is achieved
-            if evaluation["success"]:
-                self.save_task_result(image_path, goal, result, evaluation)
-                return {
-                    "success": True,
-                    "result": result,
-                    "evaluation": evaluation
-                }
+                # Get current result
+                result = self.llm_client.get_current_result()
             
-            # Generate follow-up prompt if needed
-            if current_attempt < max_attempts - 1:
-                follow_up = self.llm_client.generate_follow_up(
+                # Evaluate result
+                evaluation = self.llm_client.evaluate_result(
                     goal=goal,
-                    current_result=result,
-                    evaluation=evaluation,
+                    result=result,
                     rules=self.rules
                 )
-                self.typer.type_to_cursor(follow_up)
+                attempt_span.set(success=evaluation["success"], overall_score=evaluation.get("overall_score"))
+            
+                # Save attempt to memory
+                self.memory.save_attempt(
+                    image_path=image_path,
+                    goal=goal,
+                    prompt=cursor_prompt,
+                    result=result,
+                    evaluation=evaluation
+                )
+            
+                # Check if goal is achieved
+                if evaluation["success"]:
+                    self.save_task_result(image_path, goal, result, evaluation)
+                    return {
+                        "success": True,
+                        "result": result,
+                        "evaluation": evaluation
+                    }
+            
+                # Generate follow-up prompt if needed
+                if current_attempt < max_attempts - 1:
+                    previous_evaluations = [attempt["evaluation"] for attempt in self.memory.attempts[:-1]]
+                    if stream:
+                        self.send_to_cursor(self.llm_client.stream_follow_up(
+                            goal=goal,
+                            current_result=result,
+                            evaluation=evaluation,
+                            rules=self.rules,
+                            history=previous_evaluations
+                        ))
+                    else:
+                        follow_up = self.llm_client.generate_follow_up(
+                            goal=goal,
+                            current_result=result,
+                            evaluation=evaluation,
+                            rules=self.rules,
+                            history=previous_evaluations
+                        )
+                        self.send_to_cursor(follow_up)
             
             current_attempt += 1
         
@@ -118,6 +146,24 @@ class MacroAgent:
             "evaluation": evaluation
         }
 
+    def send_to_cursor(self, text) -> str:
+        """Type and send a prompt, then snapshot the chat so only the reply to it can end the wait."""
+        typed = self.typer.type_to_cursor(text)
+        if self.result_conditions:
+            self.observer.arm_conditions(self.result_conditions)
+        return typed
+
+    @traced("agent.wait_for_result")
+    def wait_for_result(self) -> Optional[Dict]:
+        """Block until a done condition matches or result_wait_time passes."""
+        timeout = self.config["task"]["result_wait_time"]
+        if not self.result_conditions:
+            time.sleep(timeout)
+            return None
+        self.last_wait = self.observer.wait_for(self.result_conditions, timeout=timeout)
+        return self.last_wait
+
+    @traced("agent.save_task_result")
     def save_task_result(self, image_path: str, goal: str, result: str, evaluation: Dict):
         """Save the final task result."""
         result_data = {
@@ -162,6 +208,10 @@ def main():
                 
     except KeyboardInterrupt:
         print("\nExiting AI Macro Agent...")
+    finally:
+        # Per-span counters and latency histograms for the whole session (when tracing is enabled)
+        agent.tracer.dump_metrics()
+        agent.tracer.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
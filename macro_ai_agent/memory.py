@@ -3,12 +3,14 @@ import os
 import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional
+from .tracing import get_tracer
 
 class MemoryManager:
     def __init__(self, config: dict):
         self.config = config
         self.memory_dir = os.path.join(config["paths"]["results_dir"], "memory")
         os.makedirs(self.memory_dir, exist_ok=True)
+        self.tracer = get_tracer(config)
         self.current_task = None
         self.attempts = []
 
@@ -48,8 +50,11 @@ class MemoryManager:
         filename = f"task_{int(time.time())}.json"
         filepath = os.path.join(self.memory_dir, filename)
         
-        with open(filepath, 'w') as f:
-            json.dump(self.current_task, f, indent=2)
+        with self.tracer.span("memory.write", file=filename) as span:
+            data = json.dumps(self.current_task, indent=2)
+            with open(filepath, 'w') as f:
+                f.write(data)
+            span.count(bytes=len(data), attempts=len(self.attempts))
 
     def get_task_history(self) -> List[Dict]:
         """Get history of all tasks."""
@@ -84,6 +89,7 @@ class Memory:
         self.config = config
         self.history: List[Dict[str, Any]] = []
         self.current_state: Dict[str, Any] = {}
+        self.tracer = get_tracer(config)
         self.load_memory()
 
     def load_memory(self):
@@ -96,11 +102,14 @@ class Memory:
 
     def save_memory(self):
         """Save memory to file."""
-        with open(self.config["memory"]["save_path"], "w") as f:
-            json.dump({
+        with self.tracer.span("memory.save_memory") as span:
+            data = json.dumps({
                 "history": self.history,
                 "current_state": self.current_state
-            }, f, indent=2)
+            }, indent=2)
+            with open(self.config["memory"]["save_path"], "w") as f:
+                f.write(data)
+            span.count(bytes=len(data))
 
     def add_to_history(self, action: str, result: Any, status: str = "success"):
         """Add an action and its result to history."""
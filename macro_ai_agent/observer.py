@@ -1,73 +1,255 @@
 # observer.py
 # This module will contain functions to observe the environment (screen, logs, etc.)
 
-import pyautogui
-import easyocr
+import numpy
 import time
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 import subprocess
 import os
+from .vision.ocr_engine import get_configured_ocr_engine
+from .vision.frame_diff import FrameDiffer, OCRLayout
+from .capture import CaptureWorker
+from .conditions import CallableCondition, Condition, ConditionEngine
+from .terminal import TerminalSession
+from .sim.environment import get_gui, get_simulation
+from .tracing import get_tracer
+
+class ScreenRegion:
+    """A screen rectangle with its own capture interval and OCR cache."""
+
+    def __init__(self, name: str, box: Optional[Tuple[int, int, int, int]], interval: float,
+                 diff_config: Optional[Dict[str, Any]] = None, gui=None, tracer=None):
+        self.name = name
+        self.gui = gui  # pyautogui or the simulated screen; resolved on first capture when None
+        self.tracer = tracer or get_tracer()
+        self.box = box  # (left, top, width, height); None is the whole screen
+        self.interval = interval
+        diff_config = diff_config or {}
+        self.frame_diff_enabled = diff_config.get("enabled", True)
+        self.differ = FrameDiffer(diff_config)
+        self.layout = OCRLayout()
+        self.last_capture_time = 0
+        self.last_status = None
+        self.stats = {"frames": 0, "unchanged": 0, "partial": 0, "full": 0, "pixels_ocred": 0}
+
+    def due(self, now: float) -> bool:
+        """Whether the capture interval has elapsed."""
+        return now - self.last_capture_time >= self.interval
+
+    def capture(self) -> numpy.ndarray:
+        """Grab just this region of the screen."""
+        if self.gui is None:
+            self.gui = get_gui()
+        with self.tracer.span("observer.capture", region=self.name) as span:
+            if self.box:
+                frame = numpy.array(self.gui.screenshot(region=self.box))
+            else:
+                frame = numpy.array(self.gui.screenshot())
+            span.count(pixels=frame.shape[0] * frame.shape[1], bytes=frame.nbytes)
+        return frame
+
+    def text(self) -> str:
+        """Cached text from the last OCR pass."""
+        return self.layout.text()
+
+    def read(self, reader, frame: numpy.ndarray) -> str:
+        """OCR a frame, reusing cached text for everything that did not change."""
+        pixels_before = self.stats["pixels_ocred"]
+        with self.tracer.span("observer.ocr", region=self.name) as span:
+            text = self._read(reader, frame)
+            span.set(status=self.last_status).count(
+                pixels=self.stats["pixels_ocred"] - pixels_before, chars=len(text)
+            )
+        return text
+
+    def _read(self, reader, frame: numpy.ndarray) -> str:
+        self.stats["frames"] += 1
+        if not self.frame_diff_enabled:
+            self.last_status = "full"
+            self.stats["full"] += 1
+            self.stats["pixels_ocred"] += frame.shape[0] * frame.shape[1]
+            self.layout.replace(reader.readtext(frame))
+            return self.layout.text()
+
+        status, rects = self.differ.diff(frame)
+        self.last_status = status
+        self.stats[status] += 1
+        if status == "full":
+            self.layout.replace(reader.readtext(frame))
+            self.stats["pixels_ocred"] += frame.shape[0] * frame.shape[1]
+        elif status == "partial":
+            for x0, y0, x1, y1 in self.layout.expand(rects):
+                self.layout.merge((x0, y0, x1, y1), reader.readtext(frame[y0:y1, x0:x1]))
+                self.stats["pixels_ocred"] += (x1 - x0) * (y1 - y0)
+        return self.layout.text()
 
 class Observer:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        # With simulation enabled, screenshots and OCR come from the virtual desktop
+        self.simulation = get_simulation(config)
+        self.gui = get_gui(config)
+        self.tracer = get_tracer(config)
+        # Shared with VisionProcessor; models load on first OCR or on warm-up
         self.reader = None
-        if "easyocr" in config["feedback"]["sources"]:
-            self.reader = easyocr.Reader(['en'])
-        self.last_screenshot_time = 0
+        if self.simulation and self.simulation.ocr:
+            self.reader = self.simulation.ocr
+        elif config["feedback"].get("ocr_engine") == "easyocr":
+            self.reader = get_configured_ocr_engine(config)
+
+        interval = config["feedback"]["screenshot_interval"]
+        diff_config = config["feedback"].get("frame_diff", {})
+        self.screen = ScreenRegion("screen", None, interval, diff_config, self.gui, self.tracer)
+        self.regions = {
+            name: ScreenRegion(name, tuple(spec["box"]), spec.get("interval", interval), diff_config, self.gui,
+                               self.tracer)
+            for name, spec in config["feedback"].get("regions", {}).items()
+        }
+
+        # Background capture of the whole screen; observe() then reads the latest frame
+        self.capture_config = config["feedback"].get("capture", {})
+        self.capture_worker: Optional[CaptureWorker] = None
+        if self.capture_config.get("enabled", False):
+            self.start_capture()
+
+        # Commands run through here are captured directly instead of OCR'd
+        self.terminal = TerminalSession(config["feedback"].get("terminal", {}))
+
+        self.conditions = ConditionEngine(self, config.get("task", {}).get("poll", {}))
 
-    def get_screen_text(self) -> str:
+    def start_capture(self) -> CaptureWorker:
+        """Start grabbing and OCR'ing the screen on background threads."""
+        if self.capture_worker is None:
+            ocr = (lambda frame: self.screen.read(self.reader, frame)) if self.reader else None
+            self.capture_worker = CaptureWorker(self.capture_config, self.screen.capture, ocr)
+        return self.capture_worker.start()
+
+    def stop_capture(self):
+        if self.capture_worker:
+            self.capture_worker.stop()
+
+    def get_screen_text(self, fresh: bool = False) -> str:
         """Capture screen and extract text using OCR."""
+        if self.capture_worker and self.capture_worker.running:
+            return self.capture_worker.latest_text()[0]
+        return self._read_region(self.screen, fresh)
+
+    def get_region_text(self, name: str, fresh: bool = False) -> str:
+        """Capture and OCR only the named region from config["feedback"]["regions"].
+
+        fresh captures now even if the region's interval has not elapsed.
+        """
+        if name not in self.regions:
+            raise ValueError(f"Unknown screen region: {name}")
+        return self._read_region(self.regions[name], fresh)
+
+    def _read_region(self, region: ScreenRegion, fresh: bool = False) -> str:
+        """OCR a region if its interval has elapsed, otherwise return its cached text."""
         current_time = time.time()
-        if current_time - self.last_screenshot_time < self.config["feedback"]["screenshot_interval"]:
-            return ""
+        if not fresh and not region.due(current_time):
+            return region.text()
 
-        screenshot = pyautogui.screenshot()
+        region.last_capture_time = current_time
+        frame = region.capture()
         if self.reader:
-            results = self.reader.readtext(numpy.array(screenshot))
-            return " ".join([text for _, text, _ in results])
+            return region.read(self.reader, frame)
         return ""
 
+    def get_region_pixels(self, box: Tuple[int, int, int, int]) -> numpy.ndarray:
+        """Pixels of a (left, top, width, height) box, cut from the latest background frame when available."""
+        left, top, width, height = box
+        if self.capture_worker and self.capture_worker.running:
+            latest = self.capture_worker.latest_frame()
+            if latest is not None:
+                return latest[2][top:top + height, left:left + width]
+        return numpy.array(self.gui.screenshot(region=(left, top, width, height)))
+
+    def ocr_stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-region frame and OCR counters."""
+        stats = {"screen": dict(self.screen.stats)}
+        for name, region in self.regions.items():
+            stats[name] = dict(region.stats)
+        if self.capture_worker:
+            stats["capture"] = self.capture_worker.stats()
+        return stats
+
+    def run_command(self, command: str, cwd: Optional[str] = None) -> subprocess.Popen:
+        """Run a command in the observed terminal session."""
+        return self.terminal.run(command, cwd=cwd)
+
     def get_terminal_output(self) -> str:
         """Get the last few lines of terminal output."""
         try:
-            # This is a placeholder - you'll need to implement actual terminal capture
-            return ""
+            return self.terminal.output()
         except Exception as e:
             return f"Error reading terminal: {str(e)}"
 
-    def observe(self) -> Dict[str, Any]:
-        """Gather feedback from all configured sources."""
+    def observe(self, regions: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Gather feedback from all configured sources.
+
+        With regions, only those named screen regions are captured and OCR'd
+        (under "regions") instead of the whole desktop. While the capture
+        worker runs, the latest frame and its OCR text are returned without
+        waiting on a screenshot or OCR pass.
+        """
         feedback = {}
         
-        if "screen" in self.config["feedback"]["sources"]:
-            feedback["screen_text"] = self.get_screen_text()
+        if regions:
+            feedback["regions"] = {name: self.get_region_text(name) for name in regions}
+        elif "screen" in self.config["feedback"]["sources"]:
+            if self.capture_worker and self.capture_worker.running:
+                text, _, text_time = self.capture_worker.latest_text()
+                latest = self.capture_worker.latest_frame()
+                feedback["screen_text"] = text
+                feedback["screen_text_time"] = text_time
+                if latest:
+                    feedback["frame_seq"], feedback["frame_time"], feedback["frame"] = latest
+            else:
+                feedback["screen_text"] = self.get_screen_text()
         
         if "terminal" in self.config["feedback"]["sources"]:
             feedback["terminal_output"] = self.get_terminal_output()
+            feedback["terminal_exit_code"] = self.terminal.exit_code
+            feedback["terminal_errors"] = self.terminal.new_matches()
         
         return feedback
 
     def wait_for_condition(self, condition_func, timeout: int = 30, interval: float = 1.0) -> bool:
         """Wait for a condition to be met, with timeout."""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if condition_func():
-                return True
-            time.sleep(interval)
-        return False
+        return self.wait_for(CallableCondition(condition_func), timeout, interval)["met"]
+
+    def arm_conditions(self, conditions: Union[Condition, List[Condition]]):
+        """Snapshot the screen so the next wait_for() only matches what changes after now."""
+        self.conditions.arm(conditions)
+
+    def wait_for(self, conditions: Union[Condition, List[Condition]], timeout: float = 30,
+                 initial_interval: Optional[float] = None) -> Dict[str, Any]:
+        """Wait until any of the conditions holds; returns the match and its evidence."""
+        with self.tracer.span("observer.wait_for", timeout=timeout) as span:
+            result = self.conditions.wait(conditions, timeout, initial_interval)
+            span.set(met=result["met"], condition=result["condition"]).count(checks=result["checks"])
+        return result
 
     def check_for_errors(self, feedback: Dict[str, Any]) -> List[str]:
         """Check feedback for common error patterns."""
         errors = []
         
-        # Check terminal output for error patterns
-        if "terminal_output" in feedback:
-            output = feedback["terminal_output"].lower()
-            error_patterns = ["error:", "exception:", "failed:", "not found"]
-            for pattern in error_patterns:
-                if pattern in output:
-                    errors.append(f"Found error pattern: {pattern}")
+        # Check terminal output for error patterns; observe() already matched them as output arrived
+        if "terminal_errors" in feedback:
+            matches = feedback["terminal_errors"]
+        elif "terminal_output" in feedback:
+            matches = [
+                match for line in feedback["terminal_output"].splitlines()
+                for match in self.terminal.matcher.match_line(line)
+            ]
+        else:
+            matches = []
+        for pattern in dict.fromkeys(match["pattern"] for match in matches):
+            errors.append(f"Found error pattern: {pattern}")
+
+        exit_code = feedback.get("terminal_exit_code")
+        if exit_code:
+            errors.append(f"Command exited with code {exit_code}")
         
         return errors
 
@@ -7,10 +7,12 @@ from macro_ai_agent.typer import CursorTyper
 from macro_ai_agent.llm_client import LLMClient
 
 class AutonomousLLM1:
-    def __init__(self):
-        # Load configuration
-        with open("macro_ai_agent/config.json", "r") as f:
-            self.config = json.load(f)
+    def __init__(self, config: dict = None):
+        # Load configuration unless one is passed in (e.g. with simulation enabled)
+        if config is None:
+            with open("macro_ai_agent/config.json", "r") as f:
+                config = json.load(f)
+        self.config = config
         
         # Initialize components
         self.typer = CursorTyper(self.config)
@@ -139,6 +141,9 @@ def main():
             
     except Exception as e:
         print(f"❌ Error: {e}")
+    finally:
+        llm1.llm.tracer.dump_metrics()
+        llm1.llm.tracer.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,157 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .token_budget import estimate_tokens
+
+class PrefixCache:
+    """Avoid re-evaluating the shared rules/system prefix on every LLM call.
+
+    Prompts are built as a stable prefix (rules or system instructions)
+    followed by a per-call delta. Modes:
+
+    - "keep_alive" (recommended): the full prompt is sent with the prefix
+      first and the model is kept loaded, so the server reuses its KV
+      cache for the prefix. The model sees exactly the full prompt.
+    - "context": the prefix alone is evaluated once per session, the
+      returned Ollama context tokens are kept, and later calls send only
+      the delta. The model then sees the prefix and the delta as two chat
+      turns rather than one prompt, so replies can differ from the
+      full-prompt ones; LLMClient caches them separately for that reason.
+    - "off": prompts are sent unchanged.
+
+    tokens_saved counts only the shared prefix itself (estimated), not the
+    chat template or any tokens the server adds around it.
+    """
+
+    def __init__(self, llm_config: dict, send: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        self.mode = llm_config.get("prefix_cache", "off")
+        self.keep_alive = llm_config.get("keep_alive", "30m")
+        self.max_prefixes = llm_config.get("max_cached_prefixes", 8)
+        self._send = send
+        self._prefixes: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._prime_lock = threading.Lock()
+        self.calls = 0
+        self.tokens_saved = 0
+        self.last_report: Dict[str, Any] = {}
+
+    def register(self, prefix: str) -> str:
+        """Remember a prefix so prompts starting with it can reuse its evaluation."""
+        if self.mode == "off" or not prefix:
+            return prefix
+        with self._lock:
+            if prefix in self._prefixes:
+                self._prefixes.move_to_end(prefix)
+            else:
+                self._prefixes[prefix] = None
+                while len(self._prefixes) > self.max_prefixes:
+                    self._prefixes.popitem(last=False)
+        return prefix
+
+    def prepare(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Rewrite a payload for the wire; returns (payload, info for record())."""
+        if self.mode == "off":
+            return payload, {}
+        prompt = payload["prompt"]
+        prefix = self._match(prompt)
+        payload = dict(payload, keep_alive=self.keep_alive)
+        info = {"prefix": prefix, "estimated_prompt_tokens": estimate_tokens(prompt)}
+        if prefix is None or self.mode != "context":
+            return payload, info
+
+        primed = self._prime(prefix, payload)
+        if primed is None:
+            return payload, info
+        info["prefix_tokens"] = primed["tokens"]
+        payload["prompt"] = prompt[len(prefix):].lstrip("\n")
+        payload["context"] = primed["context"]
+        return payload, info
+
+    def record(self, info: Dict[str, Any], body: Dict[str, Any]):
+        """Account for prompt-eval tokens saved by a completed call."""
+        if self.mode == "off" or not info:
+            return
+        prompt_eval = body.get("prompt_eval_count")
+        if "prefix_tokens" in info:
+            saved = info["prefix_tokens"]
+        elif info.get("prefix") is not None and prompt_eval is not None:
+            # The server's count includes template tokens, so this never exceeds the prefix
+            saved = min(estimate_tokens(info["prefix"]), max(0, info["estimated_prompt_tokens"] - prompt_eval))
+        else:
+            saved = 0
+        with self._lock:
+            self.calls += 1
+            self.tokens_saved += saved
+            self.last_report = {
+                "mode": self.mode,
+                "prefix_tokens": info.get("prefix_tokens"),
+                "prompt_eval_tokens": prompt_eval,
+                "tokens_saved": saved
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals across the session plus the last per-call report."""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "calls": self.calls,
+                "tokens_saved": self.tokens_saved,
+                "avg_tokens_saved": self.tokens_saved / self.calls if self.calls else 0.0,
+                "cached_prefixes": sum(1 for primed in self._prefixes.values() if primed),
+                "last_call": dict(self.last_report)
+            }
+
+    def reset(self):
+        """Forget primed contexts, e.g. after the model or rules change."""
+        with self._lock:
+            for prefix in self._prefixes:
+                self._prefixes[prefix] = None
+
+    def _match(self, prompt: str) -> Optional[str]:
+        """Longest registered prefix the prompt starts with."""
+        with self._lock:
+            matches = [prefix for prefix in self._prefixes if prompt.startswith(prefix)]
+        return max(matches, key=len) if matches else None
+
+    def _prime(self, prefix: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Evaluate a prefix once and keep its context tokens.
+
+        The prefix is sent as it is, with no instruction of its own, and a
+        single token is generated (Ollama only returns a context for a
+        completed generation). A failed prime is remembered as {} so it
+        isn't retried on every call.
+        """
+        with self._lock:
+            primed = self._prefixes.get(prefix)
+        if primed is not None:
+            return primed or None
+
+        with self._prime_lock:
+            with self._lock:
+                primed = self._prefixes.get(prefix)
+            if primed is not None:
+                return primed or None
+            primed = {}
+            try:
+                body = self._send({
+                    "model": payload["model"],
+                    "prompt": prefix,
+                    "stream": False,
+                    "keep_alive": self.keep_alive,
+                    "options": {"temperature": 0, "num_predict": 1}
+                })
+            except Exception as e:
+                print(f"Error priming prompt prefix: {e}")
+                body = {}
+            if body.get("context"):
+                primed = {
+                    "context": body["context"],
+                    # Only the shared prefix counts as saved, not the template the server wrapped it in
+                    "tokens": estimate_tokens(prefix),
+                    "prime_eval_tokens": body.get("prompt_eval_count")
+                }
+            with self._lock:
+                if prefix in self._prefixes:
+                    self._prefixes[prefix] = primed
+            return primed or None
@@ -0,0 +1,372 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x0, y0, x1, y1 in screen pixels
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.5
+LINE_HEIGHT = 20
+PADDING = 10
+TITLE_HEIGHT = 28
+
+# Browser find-in-page colours; send_whatsapp_ai looks for the active one
+FIND_ACTIVE = (255, 192, 47)
+FIND_OTHER = (255, 255, 0)
+
+DEFAULT_WINDOWS = {
+    "editor": {"kind": "editor", "title": "Cursor - index.html", "box": [0, 0, 1280, 780],
+               "lines": ["<!DOCTYPE html>", "<html>", "  <body>", "  </body>", "</html>"]},
+    "terminal": {"kind": "editor", "title": "Terminal", "box": [0, 780, 1280, 300], "background": [24, 24, 24],
+                 "foreground": [220, 220, 220], "lines": ["$"]},
+    "cursor": {"kind": "chat", "title": "Cursor Chat", "box": [1280, 0, 640, 1080]},
+    "google": {"kind": "browser", "title": "Google", "box": [160, 90, 1100, 650], "lines": ["Google Search"]},
+    "notes": {"kind": "notes", "title": "Notes", "box": [240, 140, 900, 600]},
+    "whatsapp": {"kind": "whatsapp", "title": "WhatsApp Web", "box": [100, 60, 1100, 700]}
+}
+
+DEFAULT_SHORTCUTS = {
+    "ctrl+shift+l": "cursor",
+    "ctrl+t": "google",
+    "win+n": "notes"
+}
+
+KEY_ALIASES = {"esc": "escape", "return": "enter", "command": "ctrl", "cmd": "ctrl", "control": "ctrl"}
+MODIFIERS = ("ctrl", "shift", "alt", "win")
+
+def normalize_chord(chord: str) -> str:
+    """Lower-case chord with aliases resolved; macOS command maps to ctrl."""
+    return "+".join(KEY_ALIASES.get(part, part) for part in chord.strip().lower().replace(" ", "").split("+"))
+
+def drawable(text: str) -> str:
+    """What cv2.putText can draw: printable ASCII, anything else as '?'."""
+    return "".join(char if 32 <= ord(char) < 127 else "?" for char in text)
+
+def wrap(text: str, width_chars: int) -> List[str]:
+    """Hard-wrap text to width_chars per line, keeping explicit newlines."""
+    lines = []
+    for paragraph in text.split("\n"):
+        while len(paragraph) > width_chars:
+            cut = paragraph.rfind(" ", 0, width_chars + 1)
+            cut = cut if cut > 0 else width_chars
+            lines.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip(" ")
+        lines.append(paragraph)
+    return lines
+
+class Window:
+    """One fake application window: a title bar, scrolling lines and an input line.
+
+    kind picks what Enter does: "chat" sends the input and gets a delayed
+    reply, "browser" shows search results, "notes" starts a new line,
+    "whatsapp" opens chats by click and sends messages, "editor" ignores it.
+    """
+
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        self.kind = spec.get("kind", "editor")
+        self.title = spec.get("title", name)
+        x, y, w, h = spec["box"]
+        self.box: Box = (x, y, x + w, y + h)
+        self.background = tuple(spec.get("background", (250, 250, 250)))
+        self.foreground = tuple(spec.get("foreground", (20, 20, 20)))
+        self.lines: List[str] = list(spec.get("lines", []))
+        self.input = ""
+        self.selected = False
+        self.find_query: Optional[str] = None
+        # whatsapp: contact list, open chat and per-contact history
+        self.contacts: List[str] = []
+        self.active_chat: Optional[str] = None
+        self.history: Dict[str, List[str]] = {}
+
+    @property
+    def width_chars(self) -> int:
+        return max(8, (self.box[2] - self.box[0] - 2 * PADDING) // 10)
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.box[0] <= x < self.box[2] and self.box[1] <= y < self.box[3]
+
+    def visible_lines(self) -> List[str]:
+        if self.kind == "whatsapp":
+            if self.active_chat is None:
+                return list(self.contacts)
+            return [f"Chat with {self.active_chat}"] + self.history.get(self.active_chat, [])
+        return self.lines
+
+    def draw(self, frame: np.ndarray, items: List[Dict[str, Any]]):
+        """Paint the window and append every drawn string (text, box, window) to items."""
+        x0, y0, x1, y1 = self.box
+        frame[y0:y1, x0:x1] = self.background
+        frame[y0:y0 + TITLE_HEIGHT, x0:x1] = (45, 45, 60)
+        self._text(frame, items, self.title, x0 + PADDING, y0 + TITLE_HEIGHT - 9, (235, 235, 235))
+
+        top = y0 + TITLE_HEIGHT + PADDING
+        if self.find_query is not None:
+            frame[top - 4:top + LINE_HEIGHT - 2, x1 - 320:x1 - PADDING] = (225, 225, 225)
+            self._text(frame, items, f"Find: {self.find_query}", x1 - 312, top + 11, (20, 20, 20))
+            top += LINE_HEIGHT + 6
+
+        input_lines = wrap(f"> {self.input}", self.width_chars) if self.kind != "editor" else []
+        body = [row for line in self.visible_lines() for row in wrap(line, self.width_chars)]
+        rows = max(1, (y1 - top - PADDING - LINE_HEIGHT * len(input_lines)) // LINE_HEIGHT)
+        body = body[-rows:]
+
+        first_match = True
+        for i, line in enumerate(body):
+            baseline = top + i * LINE_HEIGHT + 14
+            if self.find_query:
+                first_match = self._highlight(frame, line, x0 + PADDING, baseline, first_match)
+            self._text(frame, items, line, x0 + PADDING, baseline, self.foreground)
+
+        if input_lines:
+            input_top = y1 - PADDING - LINE_HEIGHT * len(input_lines)
+            if self.selected:
+                frame[input_top:y1 - PADDING, x0 + PADDING:x1 - PADDING] = (180, 205, 250)
+            for i, line in enumerate(input_lines):
+                self._text(frame, items, line, x0 + PADDING, input_top + i * LINE_HEIGHT + 14, self.foreground)
+
+    def _highlight(self, frame: np.ndarray, line: str, x: int, baseline: int, first: bool) -> bool:
+        """Colour find-in-page matches in a line; the first one on screen is the active match."""
+        query = self.find_query.lower()
+        start = line.lower().find(query)
+        while start >= 0:
+            left = x + cv2.getTextSize(drawable(line[:start]), FONT, FONT_SCALE, 1)[0][0]
+            width = cv2.getTextSize(drawable(line[start:start + len(query)]), FONT, FONT_SCALE, 1)[0][0]
+            frame[baseline - 14:baseline + 5, left:left + width] = FIND_ACTIVE if first else FIND_OTHER
+            first = False
+            start = line.lower().find(query, start + len(query))
+        return first
+
+    def _text(self, frame: np.ndarray, items: List[Dict[str, Any]], text: str, x: int, baseline: int,
+              color: Sequence[int]):
+        text = drawable(text)
+        if not text.strip():
+            return
+        cv2.putText(frame, text, (x, baseline), FONT, FONT_SCALE, tuple(int(c) for c in color), 1, cv2.LINE_AA)
+        (width, height), depth = cv2.getTextSize(text, FONT, FONT_SCALE, 1)
+        box = (x, baseline - height - 2, min(x + width, self.box[2]), baseline + depth)
+        items.append({"text": text.strip(), "box": box, "window": self.name})
+
+class VirtualDesktop:
+    """An in-memory screen of fake application windows.
+
+    The fake keyboard and mouse in sim.devices drive it; render() paints
+    the current state into an RGB framebuffer (cached until something
+    changes) and text_items() lists every string drawn, which is what the
+    stand-in OCR reads back. Everything the user "submits" (chat messages,
+    searches, WhatsApp messages) is logged in submissions.
+    """
+
+    def __init__(self, desktop_config: Optional[dict] = None):
+        desktop_config = desktop_config or {}
+        self.width = desktop_config.get("width", 1920)
+        self.height = desktop_config.get("height", 1080)
+        self.background = tuple(desktop_config.get("background", (58, 110, 165)))
+        self.reply_delay = desktop_config.get("reply_delay", 1.0)
+        self.chat_reply = desktop_config.get("chat_reply", ["Updated index.html and styles.css.", "Review changes   Accept all"])
+        self.shortcuts = {normalize_chord(k): v for k, v in desktop_config.get("shortcuts", DEFAULT_SHORTCUTS).items()}
+
+        self._lock = threading.RLock()
+        specs = dict(DEFAULT_WINDOWS)
+        specs.update(desktop_config.get("windows", {}))
+        self.windows: Dict[str, Window] = {name: Window(name, spec) for name, spec in specs.items()}
+        if "whatsapp" in self.windows:
+            self.windows["whatsapp"].contacts = list(desktop_config.get("contacts", ["Alice", "Mohamed", "Sara", "Team"]))
+        # Bottom to top; the last one has focus
+        self.z_order: List[str] = list(self.windows)
+
+        self.clipboard = ""
+        self.held: List[str] = []
+        self.submissions: List[Dict[str, Any]] = []
+        self._scheduled: List[Tuple[float, str, List[str]]] = []
+        self.version = 0
+        self._frame: Optional[np.ndarray] = None
+        self._items: List[Dict[str, Any]] = []
+        self._rendered_version = -1
+        self.stats = {"keys": 0, "chars": 0, "clicks": 0, "renders": 0, "screenshots": 0}
+
+        focused = desktop_config.get("focused", "editor")
+        if focused in self.windows:
+            self.focus(focused)
+
+    @property
+    def focused(self) -> Window:
+        return self.windows[self.z_order[-1]]
+
+    def _changed(self):
+        self.version += 1
+
+    def focus(self, name: str):
+        with self._lock:
+            if name not in self.windows:
+                raise ValueError(f"Unknown window: {name}")
+            self.z_order.remove(name)
+            self.z_order.append(name)
+            self._changed()
+
+    def tick(self):
+        """Apply scheduled events (delayed chat replies) that are due."""
+        with self._lock:
+            now = time.monotonic()
+            due = [event for event in self._scheduled if event[0] <= now]
+            if not due:
+                return
+            self._scheduled = [event for event in self._scheduled if event[0] > now]
+            for _, name, lines in due:
+                self.windows[name].lines.extend(lines)
+            self._changed()
+
+    def pending_events(self) -> int:
+        with self._lock:
+            return len(self._scheduled)
+
+    def type(self, text: str):
+        """Literal text into the focused window (or its find bar)."""
+        with self._lock:
+            window = self.focused
+            self.stats["chars"] += len(text)
+            if window.find_query is not None:
+                window.find_query += text
+            elif window.kind == "editor":
+                window.lines.append(text)
+            else:
+                if window.selected:
+                    window.input, window.selected = "", False
+                window.input += text
+            self._changed()
+
+    def key(self, chord: str):
+        """A key or chord such as "enter" or "ctrl+f", after any held modifiers."""
+        if self.held:
+            parts = self.held + [part for part in normalize_chord(chord).split("+") if part not in self.held]
+            chord = "+".join(parts)
+        chord = normalize_chord(chord)
+        with self._lock:
+            self.tick()
+            self.stats["keys"] += 1
+            if chord in self.shortcuts:
+                self.focus(self.shortcuts[chord])
+                return
+            window = self.focused
+            if chord == "ctrl+f":
+                window.find_query = ""
+            elif chord == "escape":
+                window.find_query = None
+            elif chord == "ctrl+a":
+                window.selected = True
+            elif chord == "ctrl+c":
+                if window.selected:
+                    self.clipboard = window.input
+            elif chord == "ctrl+v":
+                self.type(self.clipboard)
+            elif chord in ("ctrl+end", "end", "right", "left"):
+                window.selected = False
+            elif chord == "backspace":
+                if window.find_query:
+                    window.find_query = window.find_query[:-1]
+                elif window.selected:
+                    window.input, window.selected = "", False
+                else:
+                    window.input = window.input[:-1]
+            elif chord == "ctrl+backspace":
+                # Deletes the previous word, as in real text fields
+                window.input = window.input.rstrip()
+                window.input = window.input[:len(window.input) - len(window.input.split(" ")[-1])]
+            elif chord == "enter":
+                self._enter(window)
+            elif chord == "tab" and window.kind != "editor" and window.find_query is None:
+                window.input += "    "
+            self._changed()
+
+    def _enter(self, window: Window):
+        if window.find_query is not None:
+            return
+        if window.kind == "notes":
+            window.input += "\n"
+            return
+        if window.kind == "editor" or not window.input.strip():
+            return
+        text, window.input, window.selected = window.input, "", False
+        record = {"window": window.name, "text": text, "time": time.time()}
+        if window.kind == "chat":
+            window.lines.append(f"You: {text}")
+            window.lines.append("Generating...")
+            self._scheduled.append((time.monotonic() + self.reply_delay, window.name, list(self.chat_reply)))
+        elif window.kind == "browser":
+            window.lines = [f"Search results for: {text}", f"{text} - Wikipedia", f"{text} - Official site"]
+        elif window.kind == "whatsapp":
+            if window.active_chat is None:
+                window.input = text
+                return
+            record["to"] = window.active_chat
+            window.history.setdefault(window.active_chat, []).append(f"You: {text}")
+        self.submissions.append(record)
+
+    def press(self, key: str):
+        key = normalize_chord(key)
+        if key in MODIFIERS:
+            with self._lock:
+                if key not in self.held:
+                    self.held.append(key)
+        else:
+            self.key(key)
+
+    def release(self, key: str):
+        key = normalize_chord(key)
+        with self._lock:
+            if key in self.held:
+                self.held.remove(key)
+
+    def click(self, x: int, y: int):
+        """Focus the topmost window under the point; in WhatsApp, clicking a contact opens the chat."""
+        self.render()
+        with self._lock:
+            self.stats["clicks"] += 1
+            for name in reversed(self.z_order):
+                window = self.windows[name]
+                if not window.contains(x, y):
+                    continue
+                self.focus(name)
+                if window.kind == "whatsapp" and window.active_chat is None:
+                    for item in self._items:
+                        x0, y0, x1, y1 = item["box"]
+                        if item["window"] == name and item["text"] in window.contacts and y0 <= y <= y1:
+                            window.active_chat = item["text"]
+                            self._changed()
+                            break
+                return
+
+    def render(self) -> np.ndarray:
+        """The whole screen as an HxWx3 RGB array (shared; callers must not modify it)."""
+        with self._lock:
+            self.tick()
+            if self._rendered_version != self.version:
+                frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+                frame[:] = self.background
+                items: List[Dict[str, Any]] = []
+                for name in self.z_order:
+                    window = self.windows[name]
+                    # Anything a window covers is no longer readable
+                    items = [item for item in items if not _overlaps(item["box"], window.box)]
+                    window.draw(frame, items)
+                self._frame, self._items = frame, items
+                self._rendered_version = self.version
+                self.stats["renders"] += 1
+            return self._frame
+
+    def text_items(self) -> List[Dict[str, Any]]:
+        """Every visible string from the latest render: {"text", "box", "window"}."""
+        self.render()
+        with self._lock:
+            return list(self._items)
+
+    def screen_text(self, name: Optional[str] = None) -> str:
+        """Visible text, optionally of one window, one line per drawn string."""
+        return "\n".join(item["text"] for item in self.text_items() if name is None or item["window"] == name)
+
+def _overlaps(box: Box, outer: Box) -> bool:
+    """Whether box overlaps outer (it is then at least partly hidden)."""
+    return box[0] < outer[2] and outer[0] < box[2] and box[1] < outer[3] and outer[1] < box[3]
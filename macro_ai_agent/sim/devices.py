@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .desktop import VirtualDesktop
+
+Region = Tuple[int, int, int, int]  # left, top, width, height
+
+class SimKeyboard:
+    """Stands in for the keyboard package, typing into a VirtualDesktop."""
+
+    def __init__(self, desktop: VirtualDesktop):
+        self.desktop = desktop
+
+    def write(self, text: str, delay: float = 0, **kwargs):
+        self.desktop.type(text)
+
+    def press_and_release(self, hotkey: str, **kwargs):
+        self.desktop.key(hotkey)
+
+    send = press_and_release
+
+    def press(self, hotkey: str):
+        self.desktop.press(hotkey)
+
+    def release(self, hotkey: str):
+        self.desktop.release(hotkey)
+
+    def is_pressed(self, hotkey: str) -> bool:
+        return hotkey.lower() in self.desktop.held
+
+class SimGUI:
+    """Stands in for the pyautogui calls the agent makes: screenshots and clicks."""
+
+    FAILSAFE = False
+
+    def __init__(self, desktop: VirtualDesktop):
+        self.desktop = desktop
+        self._position = (0, 0)
+        # Regions recently captured, so the OCR stand-in can tell where a frame came from
+        self.recent_regions: Deque[Region] = deque(maxlen=8)
+        self._lock = threading.Lock()
+
+    def size(self) -> Tuple[int, int]:
+        return (self.desktop.width, self.desktop.height)
+
+    def position(self) -> Tuple[int, int]:
+        return self._position
+
+    def screenshot(self, region: Optional[Region] = None, **kwargs) -> Image.Image:
+        frame = self.desktop.render()
+        region = tuple(int(v) for v in region) if region else (0, 0, self.desktop.width, self.desktop.height)
+        left, top, width, height = region
+        with self._lock:
+            if region in self.recent_regions:
+                self.recent_regions.remove(region)
+            self.recent_regions.append(region)
+        self.desktop.stats["screenshots"] += 1
+        return Image.fromarray(frame[top:top + height, left:left + width].copy())
+
+    def moveTo(self, x: int, y: int, duration: float = 0, **kwargs):
+        if duration:
+            time.sleep(duration)
+        self._position = (int(x), int(y))
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, clicks: int = 1, **kwargs):
+        if x is not None and y is not None:
+            self._position = (int(x), int(y))
+        for _ in range(clicks):
+            self.desktop.click(*self._position)
+
+class SimClipboardError(RuntimeError):
+    pass
+
+class SimClipboard:
+    """Stands in for pyperclip, backed by the desktop's clipboard."""
+
+    PyperclipException = SimClipboardError
+
+    def __init__(self, desktop: VirtualDesktop):
+        self.desktop = desktop
+
+    def copy(self, text: str):
+        self.desktop.clipboard = str(text)
+
+    def paste(self) -> str:
+        return self.desktop.clipboard
+
+class SimOCR:
+    """An OCR engine for frames of the virtual desktop.
+
+    Instead of recognising glyphs it works out where on the desktop a frame
+    was taken from (a recently captured region, else by exact template
+    match) and returns the strings the desktop drew there, in easyocr's
+    readtext() format. Frames it cannot place yield no text.
+    """
+
+    def __init__(self, desktop: VirtualDesktop, gui: SimGUI, ocr_config: Optional[dict] = None):
+        ocr_config = ocr_config or {}
+        self.desktop = desktop
+        self.gui = gui
+        self.confidence = ocr_config.get("confidence", 0.99)
+        self.latency = ocr_config.get("latency_ms", 0) / 1000
+        self.loaded = True
+        self.load_seconds = 0.0
+        self.memory_mb = None
+        self.calls = 0
+        self.unplaced = 0
+        self.ocr_seconds = 0.0
+
+    def warm_up(self, background: bool = True):
+        return None
+
+    def readtext(self, image, **kwargs) -> List[Tuple[List[List[int]], str, float]]:
+        start = time.perf_counter()
+        image = np.asarray(image)
+        frame = self.desktop.render()
+        offset = self._place(image, frame)
+        results = []
+        if offset is None:
+            self.unplaced += 1
+        else:
+            left, top = offset
+            height, width = image.shape[:2]
+            for item in self.desktop.text_items():
+                x0, y0, x1, y1 = item["box"]
+                cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+                if not (left <= cx < left + width and top <= cy < top + height):
+                    continue
+                x0, x1 = max(x0, left) - left, min(x1, left + width) - left
+                y0, y1 = max(y0, top) - top, min(y1, top + height) - top
+                results.append(([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], item["text"], self.confidence))
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+        self.ocr_seconds += time.perf_counter() - start
+        return results
+
+    def _place(self, image: np.ndarray, frame: np.ndarray) -> Optional[Tuple[int, int]]:
+        """Top-left corner of image on the current desktop frame, if it can be found."""
+        if image.ndim != 3 or image.shape[2] < 3:
+            return None
+        image = np.ascontiguousarray(image[..., :3])
+        height, width = image.shape[:2]
+        regions = list(self.gui.recent_regions) or [(0, 0, self.desktop.width, self.desktop.height)]
+        # Whole captured regions: compare a sparse grid of pixels
+        for left, top, region_width, region_height in reversed(regions):
+            if (region_width, region_height) == (width, height) and np.array_equal(
+                    image[::7, ::7], frame[top:top + height:7, left:left + width:7]):
+                return (left, top)
+        # Crops of a region (frame-diff tiles): exact template match inside it
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        # Squared differences are summed in float32, so an exact hit is only zero up to rounding
+        tolerance = max(1.0, 1e-5 * float(np.square(gray, dtype=np.float64).sum()))
+        for left, top, region_width, region_height in reversed(regions):
+            if width > region_width or height > region_height:
+                continue
+            area = cv2.cvtColor(np.ascontiguousarray(frame[top:top + region_height, left:left + region_width]),
+                                cv2.COLOR_RGB2GRAY)
+            scores = cv2.matchTemplate(area, gray, cv2.TM_SQDIFF)
+            best, _, (x, y), _ = cv2.minMaxLoc(scores)
+            if best <= tolerance:
+                return (left + x, top + y)
+        return None
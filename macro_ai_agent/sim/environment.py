@@ -0,0 +1,105 @@
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+class Simulation:
+    """A headless stand-in for the desktop the agent drives.
+
+    Bundles a VirtualDesktop with a fake keyboard, mouse/screenshot API,
+    clipboard and OCR engine, plus (unless simulation.ollama.enabled is
+    false) a stub Ollama server. Components ask get_simulation(config)
+    for it and fall back to the real pyautogui/keyboard/pyperclip/easyocr
+    when simulation is disabled.
+    """
+
+    def __init__(self, sim_config: Dict[str, Any]):
+        from .desktop import VirtualDesktop
+        from .devices import SimClipboard, SimGUI, SimKeyboard, SimOCR
+
+        self.config = sim_config
+        self.desktop = VirtualDesktop(sim_config.get("desktop", {}))
+        self.keyboard = SimKeyboard(self.desktop)
+        self.gui = SimGUI(self.desktop)
+        self.clipboard = SimClipboard(self.desktop)
+        ocr_config = sim_config.get("ocr", {})
+        self.ocr = SimOCR(self.desktop, self.gui, ocr_config) if ocr_config.get("enabled", True) else None
+
+        self.ollama = None
+        ollama_config = sim_config.get("ollama", {})
+        if ollama_config.get("enabled", True):
+            from .ollama_stub import StubOllamaServer
+            self.ollama = StubOllamaServer(ollama_config).start()
+        logging.getLogger('Simulation').info(
+            f"Simulated desktop {self.desktop.width}x{self.desktop.height}"
+            + (f", stub Ollama at {self.ollama.api_url}" if self.ollama else "")
+        )
+
+    @property
+    def api_url(self) -> Optional[str]:
+        return self.ollama.api_url if self.ollama else None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"desktop": dict(self.desktop.stats), "submissions": len(self.desktop.submissions)}
+        if self.ocr:
+            stats["ocr"] = {"calls": self.ocr.calls, "unplaced": self.ocr.unplaced, "seconds": self.ocr.ocr_seconds}
+        if self.ollama:
+            stats["ollama"] = self.ollama.stats()
+        return stats
+
+    def stop(self):
+        if self.ollama:
+            self.ollama.stop()
+
+_simulations: Dict[str, Simulation] = {}
+_simulations_lock = threading.Lock()
+
+def get_simulation(config: Optional[dict]) -> Optional[Simulation]:
+    """The process-wide Simulation for config["simulation"], or None when it is disabled.
+
+    Every component built from the same settings shares one desktop and
+    one stub server, so what the typer types is what the observer sees.
+    """
+    sim_config = (config or {}).get("simulation", {})
+    if not sim_config.get("enabled", False):
+        return None
+    key = json.dumps(sim_config, sort_keys=True)
+    with _simulations_lock:
+        simulation = _simulations.get(key)
+        if simulation is None:
+            simulation = Simulation(sim_config)
+            _simulations[key] = simulation
+        return simulation
+
+def reset_simulations():
+    """Stop and forget every Simulation, so the next get_simulation() starts fresh."""
+    with _simulations_lock:
+        for simulation in _simulations.values():
+            simulation.stop()
+        _simulations.clear()
+
+# pyautogui, keyboard and pyperclip need a display (or root) to import, so they are only loaded when used
+
+def get_gui(config: Optional[dict] = None):
+    """pyautogui, or the simulated screen and mouse."""
+    simulation = get_simulation(config)
+    if simulation:
+        return simulation.gui
+    import pyautogui
+    return pyautogui
+
+def get_keyboard(config: Optional[dict] = None):
+    """The keyboard package, or the simulated keyboard."""
+    simulation = get_simulation(config)
+    if simulation:
+        return simulation.keyboard
+    import keyboard
+    return keyboard
+
+def get_clipboard(config: Optional[dict] = None):
+    """pyperclip, or the simulated clipboard."""
+    simulation = get_simulation(config)
+    if simulation:
+        return simulation.clipboard
+    import pyperclip
+    return pyperclip
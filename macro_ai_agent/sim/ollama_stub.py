@@ -0,0 +1,262 @@
+import argparse
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Answers for the prompts MacroAgent and the task runner send; config responses are tried first
+DEFAULT_SCRIPT = [
+    {
+        "match": r"analyze this image and goal",
+        "response": json.dumps({
+            "visual_elements": ["navigation bar", "hero section", "call-to-action button"],
+            "technical_requirements": ["HTML5", "CSS flexbox layout"],
+            "implementation_steps": ["Create the page skeleton", "Style the hero", "Add the button"],
+            "challenges": ["Matching the spacing of the design"]
+        })
+    },
+    {
+        "match": r"help me implement this design",
+        "response": "Create index.html with a header, a hero section and a button. "
+                    "Use flexbox to center the hero content. "
+                    "Style the button with the primary colour from the design."
+    },
+    {
+        "match": r"help me improve the code",
+        "response": "Increase the hero padding to 64px. Align the button with the heading."
+    },
+    {
+        "match": r"Evaluate this implementation",
+        "response": json.dumps({
+            "visual_match_score": 92,
+            "technical_score": 90,
+            "rule_compliance_score": 95,
+            "overall_score": 92,
+            "success": True,
+            "feedback": "The page matches the design.",
+            "improvements_needed": []
+        })
+    },
+    {
+        "match": r"break down tasks",
+        "response": "1. Open the editor\n2. Write the code\n3. Run the tests"
+    }
+]
+
+TOKEN = re.compile(r"\S+\s*|\s+")
+
+def estimate_prompt_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+class StubOllamaServer:
+    """A local HTTP server that answers like Ollama's /api/generate.
+
+    Replies are scripted: each rule's "match" regex is searched in the
+    prompt and the first hit answers (a rule with "responses" cycles
+    through them, repeating the last). Latency is simulated from the
+    latency block: a one-off load_ms, prompt_ms_per_1k_tokens for the
+    prompt (a passed-back context is not re-evaluated, as in Ollama),
+    first_token_ms and token_ms per generated token. Streaming replies
+    are NDJSON over chunked HTTP/1.1, as Ollama sends them.
+    """
+
+    def __init__(self, ollama_config: Optional[dict] = None):
+        ollama_config = ollama_config or {}
+        self.logger = logging.getLogger('StubOllama')
+        self.host = ollama_config.get("host", "127.0.0.1")
+        self.port = ollama_config.get("port", 0)
+        self.model = ollama_config.get("model", "stub")
+        self.script: List[Dict[str, Any]] = list(ollama_config.get("responses", [])) + DEFAULT_SCRIPT
+        self.default_response = ollama_config.get("default_response", "OK.")
+        latency = ollama_config.get("latency", {})
+        self.load_ms = latency.get("load_ms", 0)
+        self.prompt_ms_per_1k_tokens = latency.get("prompt_ms_per_1k_tokens", 0)
+        self.first_token_ms = latency.get("first_token_ms", 0)
+        self.token_ms = latency.get("token_ms", 0)
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._rule_hits: Dict[int, int] = {}
+        self._loaded = False
+        self.requests: List[Dict[str, Any]] = []
+        self.cancelled = 0
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Stub Ollama server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/api/generate"
+
+    def start(self) -> "StubOllamaServer":
+        if self._server is None:
+            self._server = _QuietServer((self.host, self.port), _handler_for(self))
+            self._server.daemon_threads = True
+            self._thread = threading.Thread(target=self._server.serve_forever, name="stub-ollama", daemon=True)
+            self._thread.start()
+            self.logger.info(f"Stub Ollama listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def respond(self, prompt: str) -> str:
+        """The scripted reply for a prompt."""
+        for i, rule in enumerate(self.script):
+            if re.search(rule["match"], prompt, re.IGNORECASE | re.DOTALL):
+                responses = rule.get("responses") or [rule.get("response", self.default_response)]
+                with self._lock:
+                    hit = self._rule_hits.get(i, 0)
+                    self._rule_hits[i] = hit + 1
+                reply = responses[min(hit, len(responses) - 1)]
+                return reply if isinstance(reply, str) else json.dumps(reply)
+        return self.default_response
+
+    def _prompt_delay(self, payload: Dict[str, Any]) -> float:
+        """Seconds before the first token: model load (once) plus prompt evaluation."""
+        with self._lock:
+            load = 0 if self._loaded else self.load_ms
+            self._loaded = True
+        tokens = estimate_prompt_tokens(payload.get("prompt", ""))
+        return (load + self.prompt_ms_per_1k_tokens * tokens / 1000 + self.first_token_ms) / 1000
+
+    def generate(self, payload: Dict[str, Any]):
+        """Yield (token, final) pairs for a generate request, sleeping to simulate latency."""
+        start = time.perf_counter()
+        prompt = payload.get("prompt", "")
+        reply = self.respond(prompt)
+        tokens = TOKEN.findall(reply)
+        limit = (payload.get("options") or {}).get("num_predict")
+        if limit and limit > 0:
+            tokens = tokens[:limit]
+        prompt_tokens = estimate_prompt_tokens(prompt)
+        context_tokens = len(payload.get("context") or [])
+        with self._lock:
+            self.requests.append({"prompt": prompt, "stream": payload.get("stream", True), "time": time.time()})
+
+        time.sleep(self._prompt_delay(payload))
+        prompt_done = time.perf_counter()
+        for i, token in enumerate(tokens):
+            if i and self.token_ms:
+                time.sleep(self.token_ms / 1000)
+            yield token, None
+        eval_ns = int((time.perf_counter() - prompt_done) * 1e9) or 1
+        total = context_tokens + prompt_tokens + len(tokens)
+        yield "", {
+            "model": payload.get("model", self.model),
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((time.perf_counter() - start) * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(tokens),
+            "eval_duration": eval_ns,
+            # Token ids stand-in; only its length matters to the prefix cache
+            "context": list(range(total))
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": len(self.requests), "cancelled": self.cancelled}
+
+class _QuietServer(ThreadingHTTPServer):
+    """Clients drop keep-alive sockets mid-stream on purpose; that is not worth a traceback."""
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+def _handler_for(server: StubOllamaServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes; without this Nagle holds the body for a delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            server.logger.debug(format % args)
+
+        def _json(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._json(200, {"models": [{"name": server.model, "model": server.model}]})
+            elif self.path == "/api/version":
+                self._json(200, {"version": "0.0.0-stub"})
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._json(400, {"error": "invalid JSON"})
+                return
+            if self.path != "/api/generate":
+                self._json(404, {"error": f"{self.path} is not simulated"})
+                return
+            model = payload.get("model", server.model)
+            if not payload.get("stream", True):
+                text, final = "", {}
+                for token, done in server.generate(payload):
+                    text += token
+                    final = done or final
+                self._json(200, dict(final, response=text))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for token, final in server.generate(payload):
+                    line = final if final else {"model": model, "response": token, "done": False}
+                    data = json.dumps(line).encode("utf-8") + b"\n"
+                    self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client closed the stream early, as LLMClient does on cancel
+                with server._lock:
+                    server.cancelled += 1
+                self.close_connection = True
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve scripted Ollama-style completions for offline runs')
+    parser.add_argument('--config', default='macro_ai_agent/config.json')
+    parser.add_argument('--port', type=int, default=11434)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    ollama_config = dict(config.get("simulation", {}).get("ollama", {}), port=args.port)
+    server = StubOllamaServer(ollama_config).start()
+    print(f"Stub Ollama serving {server.api_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
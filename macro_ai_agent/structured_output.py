@@ -0,0 +1,152 @@
+import json
+from typing import Any, Dict, List, Optional
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "visual_elements": {"type": "array", "items": {"type": "string"}},
+        "technical_requirements": {"type": "array", "items": {"type": "string"}},
+        "implementation_steps": {"type": "array", "items": {"type": "string"}},
+        "challenges": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["visual_elements", "technical_requirements", "implementation_steps", "challenges"]
+}
+
+EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "visual_match_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "technical_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "rule_compliance_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "overall_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "success": {"type": "boolean"},
+        "feedback": {"type": "string"},
+        "improvements_needed": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": [
+        "visual_match_score",
+        "technical_score",
+        "rule_compliance_score",
+        "overall_score",
+        "success",
+        "feedback",
+        "improvements_needed"
+    ]
+}
+
+FEEDBACK_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdicts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer"},
+                    "success": {"type": "boolean"},
+                    "analysis": {"type": "string"},
+                    "suggestions": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["index", "success", "analysis", "suggestions"]
+            }
+        }
+    },
+    "required": ["verdicts"]
+}
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float)
+}
+
+class JSONObjectExtractor:
+    """Incrementally pull the first balanced JSON object out of mixed text.
+
+    Feed chunks as they stream in; feed() returns the parsed object as soon
+    as its closing brace arrives, so generation can be stopped right there.
+    Braces inside strings are ignored, and a balanced span that turns out not
+    to be JSON (e.g. "{key}" in prose) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.result: Optional[Dict[str, Any]] = None
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Consume a chunk; return the object once complete, else None."""
+        if self.result is not None:
+            return self.result
+        self.buffer += chunk
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+            self._pos += 1
+            if self._start < 0:
+                if char == '{':
+                    self._start = self._pos - 1
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = self.buffer[self._start:self._pos]
+                    try:
+                        parsed = json.loads(candidate)
+                    except ValueError:
+                        parsed = None
+                    if isinstance(parsed, dict):
+                        self.result = parsed
+                        return parsed
+                    # Not JSON after all; rescan from just past the opening brace
+                    self._pos = self._start + 1
+                    self._start = -1
+                    self._in_string = False
+                    self._escaped = False
+        return None
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """First balanced JSON object in text, or None."""
+    return JSONObjectExtractor().feed(text)
+
+def missing_fields(obj: Dict[str, Any], schema: Dict[str, Any]) -> List[str]:
+    """Required fields that are absent or have the wrong JSON type."""
+    missing = []
+    properties = schema.get("properties", {})
+    for field in schema.get("required", []):
+        if field not in obj:
+            missing.append(field)
+            continue
+        expected = _JSON_TYPES.get(properties.get(field, {}).get("type"))
+        value = obj[field]
+        # bool is an int subclass; don't let true pass as a score
+        if expected and (not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool)):
+            missing.append(field)
+    return missing
+
+def subschema(schema: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Schema restricted to the given fields."""
+    return {
+        "type": "object",
+        "properties": {field: schema["properties"][field] for field in fields if field in schema["properties"]},
+        "required": list(fields)
+    }
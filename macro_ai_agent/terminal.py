@@ -0,0 +1,263 @@
+import codecs
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+DEFAULT_ERROR_PATTERNS = [
+    "error:",
+    "exception:",
+    "failed:",
+    "not found",
+    r"Traceback \(most recent call last\)"
+]
+
+# CSI/OSC escape sequences that colour or move the cursor in pty output
+ANSI_ESCAPE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+
+def clean_line(line: str) -> str:
+    """Drop escape codes and keep only what a carriage return left visible."""
+    line = ANSI_ESCAPE.sub("", line)
+    if "\r" in line:
+        line = line.rstrip("\r").rsplit("\r", 1)[-1]
+    return line
+
+class PatternMatcher:
+    """All error patterns compiled into one case-insensitive alternation.
+
+    Text is fed in arbitrary chunks and matched one completed line at a
+    time, so each byte is scanned once no matter how large the buffer
+    grows, and matches spanning a chunk boundary are still found.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        self._groups = {f"p{i}": pattern for i, pattern in enumerate(self.patterns)}
+        alternation = "|".join(f"(?P<{name}>{pattern})" for name, pattern in self._groups.items())
+        self.regex = re.compile(alternation, re.IGNORECASE) if self.patterns else None
+
+    def match_line(self, line: str) -> List[Dict[str, str]]:
+        """Every distinct pattern that occurs in a line."""
+        if self.regex is None:
+            return []
+        matches = []
+        seen = set()
+        for match in self.regex.finditer(line):
+            name = match.lastgroup
+            if name not in seen:
+                seen.add(name)
+                matches.append({"pattern": self._groups[name], "match": match.group(0), "line": line})
+        return matches
+
+class RollingBuffer:
+    """The last max_chars characters of output, kept as whole lines.
+
+    The pending (unterminated) line is bounded too: it keeps only what its
+    last carriage return left visible, so progress bars redrawn with \r do
+    not grow it, and it is cut into max_chars lines if it still overflows.
+    """
+
+    def __init__(self, max_chars: int = 65536):
+        self.max_chars = max_chars
+        self.lines: Deque[str] = deque()
+        self.partial = ""
+        self.chars = 0
+        self.total_chars = 0
+
+    def feed(self, text: str) -> List[str]:
+        """Add raw output to the pending line; returns the raw lines it completed."""
+        pieces = text.split("\n")
+        pieces[0] = self.partial + pieces[0]
+        partial = pieces.pop()
+        visible = partial.rstrip("\r")
+        if "\r" in visible:
+            partial = partial[visible.rfind("\r") + 1:]
+        while len(partial) > self.max_chars:
+            pieces.append(partial[:self.max_chars])
+            partial = partial[self.max_chars:]
+        self.partial = partial
+        return pieces
+
+    def append_line(self, line: str):
+        self.lines.append(line)
+        self.chars += len(line) + 1
+        self.total_chars += len(line) + 1
+        while self.chars > self.max_chars and len(self.lines) > 1:
+            self.chars -= len(self.lines.popleft()) + 1
+
+    def tail(self, lines: Optional[int] = None) -> str:
+        selected = list(self.lines)
+        if self.partial:
+            selected.append(clean_line(self.partial))
+        if lines is not None:
+            selected = selected[-lines:]
+        return "\n".join(selected)
+
+class TerminalSession:
+    """Runs commands under a pseudo-terminal and streams their output.
+
+    Output goes into a RollingBuffer and through a PatternMatcher as it
+    arrives, so error patterns are known without OCR and without rescans.
+    Where pty is unavailable (Windows) the command runs on plain pipes.
+    """
+
+    def __init__(self, terminal_config: Optional[dict] = None):
+        terminal_config = terminal_config or {}
+        self.logger = logging.getLogger('TerminalSession')
+        self.shell = terminal_config.get("shell")
+        self.tail_lines = terminal_config.get("tail_lines", 50)
+        self.use_pty = terminal_config.get("use_pty", True) and os.name == "posix"
+        self.buffer = RollingBuffer(terminal_config.get("buffer_chars", 65536))
+        self.matcher = PatternMatcher(terminal_config.get("error_patterns", DEFAULT_ERROR_PATTERNS))
+        # Only the newest max_matches are kept; _match_total counts every match ever found
+        self.matches: Deque[Dict[str, Any]] = deque(maxlen=terminal_config.get("max_matches", 1000))
+        self._match_total = 0
+        self.history: List[Dict[str, Any]] = []
+        self.process: Optional[subprocess.Popen] = None
+        self.command: Optional[str] = None
+        self._reader: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._output_event = threading.Condition(self._lock)
+        self._match_cursor = 0
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def exit_code(self) -> Optional[int]:
+        """Exit code of the current/last command, None while it runs or if none ran."""
+        if self.process is None:
+            return None
+        return self.process.poll()
+
+    def run(self, command: str, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+        """Start a shell command; output is captured in the background."""
+        if self.running:
+            raise RuntimeError(f"A command is already running: {self.command}")
+        self._finish_reader()
+        kwargs = {"cwd": cwd, "env": env, "shell": True}
+        if self.shell:
+            kwargs["executable"] = self.shell
+
+        if self.use_pty:
+            import pty
+            master, slave = pty.openpty()
+            try:
+                process = subprocess.Popen(command, stdin=slave, stdout=slave, stderr=slave,
+                                           close_fds=True, start_new_session=True, **kwargs)
+            finally:
+                os.close(slave)
+            read = lambda: os.read(master, 4096)
+            close = lambda: os.close(master)
+        else:
+            process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT, **kwargs)
+            read = lambda: process.stdout.read1(4096) if hasattr(process.stdout, "read1") else process.stdout.read(4096)
+            close = process.stdout.close
+
+        self.process = process
+        self.command = command
+        self.history.append({"command": command, "started": time.time(), "exit_code": None})
+        self._reader = threading.Thread(target=self._read_loop, args=(read, close), name="terminal-reader", daemon=True)
+        self._reader.start()
+        return process
+
+    def _read_loop(self, read, close):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while True:
+                try:
+                    data = read()
+                except OSError:
+                    # EIO on the pty master once the child side is closed
+                    break
+                if not data:
+                    break
+                self.feed(decoder.decode(data))
+            self.feed(decoder.decode(b"", final=True))
+        finally:
+            close()
+            self._flush_partial()
+            code = self.process.wait()
+            with self._output_event:
+                self.history[-1]["exit_code"] = code
+                self.history[-1]["finished"] = time.time()
+                self._output_event.notify_all()
+
+    def feed(self, text: str):
+        """Add decoded output; completed lines are cleaned, buffered and matched."""
+        if not text:
+            return
+        with self._output_event:
+            for raw in self.buffer.feed(text):
+                self._add_line(clean_line(raw))
+            self._output_event.notify_all()
+
+    def _flush_partial(self):
+        with self._output_event:
+            if self.buffer.partial:
+                self._add_line(clean_line(self.buffer.partial))
+                self.buffer.partial = ""
+
+    def _add_line(self, line: str):
+        # Caller holds the lock
+        self.buffer.append_line(line)
+        for match in self.matcher.match_line(line):
+            match["command"] = self.command
+            self.matches.append(match)
+            self._match_total += 1
+
+    def _finish_reader(self):
+        if self._reader is not None:
+            self._reader.join(5)
+            self._reader = None
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Wait for the command to exit and its output to drain; returns the exit code."""
+        if self.process is None:
+            return None
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return None
+        self._finish_reader()
+        return self.process.returncode
+
+    def wait_for_output(self, timeout: Optional[float] = None) -> bool:
+        """Block until new output arrives or the command exits."""
+        with self._output_event:
+            return self._output_event.wait(timeout)
+
+    def terminate(self):
+        if self.running:
+            self.process.terminate()
+        self._finish_reader()
+
+    def output(self, lines: Optional[int] = None) -> str:
+        """The last lines of output (tail_lines by default)."""
+        with self._lock:
+            return self.buffer.tail(self.tail_lines if lines is None else lines)
+
+    def new_matches(self) -> List[Dict[str, Any]]:
+        """Error-pattern matches since the previous call (at most max_matches of them)."""
+        with self._lock:
+            count = min(self._match_total - self._match_cursor, len(self.matches))
+            self._match_cursor = self._match_total
+            return list(self.matches)[len(self.matches) - count:]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pty": self.use_pty,
+                "running": self.running,
+                "exit_code": self.exit_code,
+                "buffered_chars": self.buffer.chars,
+                "total_chars": self.buffer.total_chars,
+                "matches": self._match_total,
+                "commands": len(self.history)
+            }
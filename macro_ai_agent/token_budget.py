@@ -0,0 +1,113 @@
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+TRUNCATION_MARKER = " ...[truncated]"
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+def _drop_empty(value: Any) -> Any:
+    if isinstance(value, dict):
+        cleaned = {key: _drop_empty(item) for key, item in value.items()}
+        return {key: item for key, item in cleaned.items() if not _is_empty(item)}
+    if isinstance(value, list):
+        cleaned = [_drop_empty(item) for item in value]
+        return [item for item in cleaned if not _is_empty(item)]
+    return value
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation or empty fields, for embedding in prompts."""
+    return json.dumps(_drop_empty(value), separators=(",", ":"), ensure_ascii=False)
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut text to roughly the given number of tokens, marking the cut."""
+    if estimate_tokens(text) <= tokens:
+        return text
+    keep = max(0, tokens * 4 - len(TRUNCATION_MARKER))
+    return text[:keep].rstrip() + TRUNCATION_MARKER
+
+class TokenBudget:
+    """Keeps prompts inside a per-call token budget.
+
+    fit() renders a prompt from named text fields. While it is over budget
+    it first summarizes, then drops, the oldest history entries, and then
+    truncates the shrinkable fields in the given order.
+    """
+
+    def __init__(self, llm_config: dict):
+        context_window = llm_config.get("context_window", 8192)
+        max_tokens = llm_config.get("max_tokens", 1000)
+        self.budget = llm_config.get("prompt_token_budget", context_window - max_tokens)
+        self.history_summary_tokens = llm_config.get("history_summary_tokens", 40)
+        self.min_field_tokens = llm_config.get("min_field_tokens", 64)
+        self._local = threading.local()
+
+    @property
+    def last_report(self) -> Dict[str, Any]:
+        """Report of the last fit() on the calling thread, so concurrent calls keep their own."""
+        return getattr(self._local, "report", {})
+
+    @last_report.setter
+    def last_report(self, report: Dict[str, Any]):
+        self._local.report = report
+
+    def fit(self, render: Callable[[Dict[str, str]], str], fields: Dict[str, str],
+            shrink_order: Sequence[str] = (), history: Optional[List[str]] = None,
+            history_field: str = "history") -> Tuple[str, Dict[str, str]]:
+        """Render a prompt that fits the budget.
+
+        Returns the prompt and the (possibly shortened) fields it was rendered
+        from; the budget report lands in last_report.
+        """
+        fields = dict(fields)
+        history = list(history or [])
+        summarized = 0
+        dropped = 0
+        truncated = []
+
+        def build() -> str:
+            if history_field:
+                fields[history_field] = "\n".join(history)
+            return render(fields)
+
+        prompt = build()
+        original = estimate_tokens(prompt)
+
+        # Oldest history goes first: summarize each entry, then drop them
+        while estimate_tokens(prompt) > self.budget and summarized < len(history):
+            history[summarized] = truncate_to_tokens(history[summarized], self.history_summary_tokens)
+            summarized += 1
+            prompt = build()
+        while estimate_tokens(prompt) > self.budget and history:
+            history.pop(0)
+            dropped += 1
+            prompt = build()
+
+        for name in shrink_order:
+            overflow = estimate_tokens(prompt) - self.budget
+            if overflow <= 0:
+                break
+            # one token of slack absorbs rounding between per-field and whole-prompt estimates
+            allowed = max(self.min_field_tokens, estimate_tokens(fields[name]) - overflow - 1)
+            shortened = truncate_to_tokens(fields[name], allowed)
+            if shortened != fields[name]:
+                fields[name] = shortened
+                truncated.append(name)
+                prompt = build()
+
+        final = estimate_tokens(prompt)
+        self.last_report = {
+            "budget": self.budget,
+            "original_tokens": original,
+            "estimated_tokens": final,
+            "history_summarized": summarized,
+            "history_dropped": dropped,
+            "truncated": truncated,
+            "within_budget": final <= self.budget
+        }
+        return prompt, fields
@@ -0,0 +1,358 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Upper bounds for histogram buckets; durations are in milliseconds
+DEFAULT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+class Histogram:
+    """Bucketed distribution with exact count, sum, min and max."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last bucket is +inf
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0-1), interpolated inside its bucket and clamped to min/max."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.bounds[i - 1] if i else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else self.max
+                value = low + (high - low) * (rank - seen) / count
+                return min(max(value, self.min), self.max)
+            seen += count
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.bounds, self.counts) if count},
+                **({"inf": self.counts[-1]} if self.counts[-1] else {})
+            }
+        }
+
+class MetricsRegistry:
+    """In-process counters and histograms, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {name: self.histograms[name].snapshot() for name in sorted(self.histograms)}
+            }
+
+    def dump(self, path: str) -> Dict[str, Any]:
+        """Write snapshot() as JSON and return it."""
+        snapshot = self.snapshot()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        return snapshot
+
+    def summary(self) -> str:
+        """One line per span: calls, total and p50/p95 time, with its counters."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, histogram in snapshot["histograms"].items():
+            if not name.endswith(".ms"):
+                continue
+            span = name[:-3]
+            counters = ", ".join(
+                f"{key[len(span) + 1:]}={value:.0f}" if float(value).is_integer() else
+                f"{key[len(span) + 1:]}={value:.2f}"
+                for key, value in snapshot["counters"].items()
+                if key.startswith(span + ".") and key[len(span) + 1:] != "calls"
+            )
+            lines.append(
+                f"{span:32} {histogram['count']:6d} calls {histogram['sum'] / 1000:9.2f}s "
+                f"p50 {histogram['p50']:8.1f}ms p95 {histogram['p95']:8.1f}ms"
+                + (f"  {counters}" if counters else "")
+            )
+        return "\n".join(lines)
+
+class JSONLExporter:
+    """Appends each finished span to a file as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+class Span:
+    """One timed operation. Use as a context manager or call end().
+
+    set() adds attributes to the trace record only; count() also adds the
+    value to the "<span>.<key>" counter in the metrics registry (tokens,
+    bytes, characters, seconds slept).
+    """
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = tracer._next_id()
+        self.attributes = attributes
+        self.counts: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def count(self, **values):
+        for key, value in values.items():
+            if value is not None:
+                self.counts[key] = self.counts.get(key, 0) + value
+        return self
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer._finish(self)
+
+    def __enter__(self):
+        self.tracer._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._pop(self)
+        self.end(exc)
+        return False
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.wall_start,
+            "duration_ms": round(self.duration_ms, 3),
+            "thread": threading.current_thread().name,
+            "status": "error" if self.error else "ok",
+            **({"error": self.error} if self.error else {}),
+            "attributes": self.attributes,
+            "counts": self.counts
+        }
+
+class _NullSpan:
+    """What a disabled tracer hands out; every method does nothing."""
+
+    span_id = None
+    trace_id = None
+
+    def set(self, **attributes):
+        return self
+
+    def count(self, **values):
+        return self
+
+    def end(self, error: Optional[BaseException] = None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Tracer:
+    """Spans around agent operations, exported to a JSONL file and a MetricsRegistry.
+
+    Spans opened with `with tracer.span(...)` nest per thread, so an LLM
+    call made inside "agent.attempt" is recorded as its child. Every
+    finished span adds its duration to the "<name>.ms" histogram and
+    bumps "<name>.calls" (and "<name>.errors"). When disabled, span()
+    returns a shared no-op span and nothing is recorded.
+    """
+
+    def __init__(self, tracing_config: Optional[dict] = None):
+        tracing_config = tracing_config or {}
+        self.enabled = tracing_config.get("enabled", False)
+        self.trace_file = tracing_config.get("trace_file", "output/traces/trace.jsonl")
+        self.metrics_file = tracing_config.get("metrics_file", "output/traces/metrics.json")
+        self.metrics = MetricsRegistry()
+        self.exporter = JSONLExporter(self.trace_file) if self.enabled and self.trace_file else None
+        self.logger = logging.getLogger('Tracer')
+        self._local = threading.local()
+        self._ids = 0
+        self._ids_lock = threading.Lock()
+
+    def _next_id(self) -> int:
+        with self._ids_lock:
+            self._ids += 1
+            return self._ids
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _push(self, span: Span):
+        self._stack().append(span)
+
+    def _pop(self, span: Span):
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        elif span in stack:
+            stack.remove(span)
+
+    def current(self):
+        """Innermost open span on this thread (NULL_SPAN if none)."""
+        stack = self._stack() if self.enabled else None
+        return stack[-1] if stack else NULL_SPAN
+
+    def span(self, name: str, **attributes):
+        """A span to use in a with block; it becomes the parent of spans opened inside it."""
+        if not self.enabled:
+            return NULL_SPAN
+        stack = self._stack()
+        return Span(self, name, stack[-1] if stack else None, attributes)
+
+    def start_span(self, name: str, **attributes):
+        """A span that is not made current, for work that outlives the caller's frame
+        (e.g. a generator); call end() on it when the work is done."""
+        return self.span(name, **attributes)
+
+    def _finish(self, span: Span):
+        self.metrics.observe(f"{span.name}.ms", span.duration_ms)
+        self.metrics.increment(f"{span.name}.calls")
+        if span.error:
+            self.metrics.increment(f"{span.name}.errors")
+        for key, value in span.counts.items():
+            self.metrics.increment(f"{span.name}.{key}", value)
+        if self.exporter:
+            try:
+                self.exporter.export(span.record())
+            except OSError as e:
+                self.logger.warning(f"Could not write trace record: {e}")
+
+    def sleep(self, seconds: float, name: str = "sleep"):
+        """time.sleep that is counted as "<name>.seconds" and on the current span as sleep_s."""
+        if seconds <= 0:
+            return
+        time.sleep(seconds)
+        if self.enabled:
+            self.metrics.increment(f"{name}.seconds", seconds)
+            self.current().count(sleep_s=seconds)
+
+    def dump_metrics(self, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Write the metrics snapshot to path (default metrics_file) and log the per-span summary."""
+        if not self.enabled:
+            return None
+        path = path or self.metrics_file
+        snapshot = self.metrics.dump(path) if path else self.metrics.snapshot()
+        summary = self.metrics.summary()
+        if summary:
+            self.logger.info("Span summary:\n" + summary)
+        return snapshot
+
+    def close(self):
+        if self.exporter:
+            self.exporter.close()
+
+def traced(name: str):
+    """Method decorator: run the method inside a span on self.tracer."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            tracer = getattr(self, "tracer", None)
+            if tracer is None or not tracer.enabled:
+                return func(self, *args, **kwargs)
+            with tracer.span(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+_tracers: Dict[str, Tracer] = {}
+_tracers_lock = threading.Lock()
+
+def get_tracer(config: Optional[dict] = None) -> Tracer:
+    """The process-wide Tracer for config["tracing"], so every component writes to one trace and one registry."""
+    tracing_config = (config or {}).get("tracing", {})
+    key = json.dumps(tracing_config, sort_keys=True)
+    with _tracers_lock:
+        tracer = _tracers.get(key)
+        if tracer is None:
+            tracer = _tracers[key] = Tracer(tracing_config)
+        return tracer
+
+def reset_tracers():
+    """Close and forget every Tracer, e.g. between benchmark runs."""
+    with _tracers_lock:
+        for tracer in _tracers.values():
+            tracer.close()
+        _tracers.clear()
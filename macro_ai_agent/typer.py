@@ -1,8 +1,15 @@
-import keyboard
-import pyautogui
+import logging
+import sys
 import time
 import random
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional, Union
+from .keyplan import KeyPlan, KeyPlanCompiler, build_backend
+from .sim.environment import get_clipboard, get_gui, get_simulation
+from .tracing import get_tracer, traced
+
+PASTE_KEY = "command+v" if sys.platform == "darwin" else "ctrl+v"
+COPY_KEY = "command+c" if sys.platform == "darwin" else "ctrl+c"
+SELECT_ALL_KEY = "command+a" if sys.platform == "darwin" else "ctrl+a"
 
 class CursorTyper:
     def __init__(self, config: dict):
@@ -14,44 +21,235 @@ class CursorTyper:
             "google": "ctrl+t",  # Open new tab
             "notes": "win+n"     # Windows Notes
         }
+        self._locator = None
+        self._gui = None
+        self.tracer = get_tracer(config)
+        self.logger = logging.getLogger('CursorTyper')
+
+        # Bulk input: "type" (keystrokes), "paste" (clipboard) or "auto" (paste long text)
+        input_config = config["macro_driver"].get("input", {})
+        self.input_mode = input_config.get("mode", "type")
+        self.app_input_modes = input_config.get("app_modes", {})
+        self.paste_threshold = input_config.get("paste_threshold", 200)
+        self.paste_chunk_chars = input_config.get("paste_chunk_chars", 4000)
+        self.paste_delay = input_config.get("paste_delay", 0.05)
+        self.verify_paste = input_config.get("verify_paste", True)
+        self.last_input_report: Optional[Dict[str, Any]] = None
+
+        # Markup is compiled once into a cached plan; every key goes through the backend
+        self.compiler = KeyPlanCompiler(input_config)
+        simulation = get_simulation(config)
+        self.backend = build_backend(input_config, simulation.keyboard if simulation else None, self.tracer)
+
+    @property
+    def gui(self):
+        """pyautogui (or the simulated mouse), imported on first click."""
+        if self._gui is None:
+            self._gui = get_gui(self.config)
+        return self._gui
 
+    @property
+    def locator(self):
+        """Template locator for on-screen targets; OpenCV is only loaded when first needed."""
+        if self._locator is None:
+            from .vision.locator import ElementLocator
+            self._locator = ElementLocator(self.config)
+        return self._locator
+
+    def _wait(self, seconds: float):
+        """Fixed wait for the UI to catch up, counted as "typer.wait" when tracing."""
+        self.tracer.sleep(seconds, "typer.wait")
+
+    @traced("typer.focus_application")
     def focus_application(self, app: str):
-        """Focus the specified application using its shortcut."""
+        """Focus the specified application, clicking its reference image if one exists, else using its shortcut."""
+        if self.locator.has_template(app):
+            match = self.locator.locate(app)
+            if match["found"]:
+                self.gui.click(*match["center"])
+                self._wait(0.2)  # Wait for app to focus
+                return
         if app in self.app_shortcuts:
-            keyboard.press_and_release(self.app_shortcuts[app])
-            time.sleep(0.5)  # Wait for app to focus
+            self.backend.send(self.app_shortcuts[app])
+            self._wait(0.5)  # Wait for app to focus
 
     def type_text(self, text: str, human_like: bool = True):
-        """Type text with optional human-like behavior."""
-        # Handle special key combinations
-        if '{' in text and '}' in text:
-            parts = text.split('{')
-            for part in parts:
-                if '}' in part:
-                    key, rest = part.split('}', 1)
-                    # Handle special keys
-                    if key == 'ctrl+f':
-                        keyboard.press_and_release('ctrl+f')
-                        time.sleep(0.5)
-                    elif key == 'enter':
-                        keyboard.press('enter')
-                        time.sleep(0.5)
-                    # Type the rest of the text
-                    if rest:
-                        if human_like:
-                            self._type_human_like(rest)
-                        else:
-                            keyboard.write(rest)
-                else:
-                    if human_like:
-                        self._type_human_like(part)
-                    else:
-                        keyboard.write(part)
-        else:
-            if human_like:
-                self._type_human_like(text)
+        """Type text with optional human-like behavior.
+
+        {key} markup ({enter}, {ctrl+f}, {sleep:0.5}, ...) is compiled into
+        a cached KeyPlan; see keyplan.KeyPlanCompiler.
+        """
+        self.run_plan(self.compiler.compile(text), human_like)
+
+    def run_plan(self, plan: KeyPlan, human_like: bool = True):
+        """Replay a compiled plan; literal runs are typed human-like or sent in one backend call."""
+        with self.tracer.span("typer.run_plan", backend=self.backend.name, human_like=human_like) as span:
+            span.count(chars=plan.literal_chars, chords=sum(1 for kind, _ in plan.actions if kind == "chord"))
+            if not human_like:
+                self.backend.run(plan)
+                return
+            for kind, value in plan.actions:
+                if kind == "text":
+                    self._type_human_like(value)
+                elif kind == "chord":
+                    self.backend.send(value)
+                elif kind == "delay":
+                    self.backend.sleep(value)
+
+    def resolve_input_mode(self, text: str, mode: Optional[str] = None, app: Optional[str] = None) -> str:
+        """Input mode for this call: explicit mode, else the app's mode, else the default."""
+        mode = mode or self.app_input_modes.get(app) or self.input_mode
+        if mode == "auto":
+            return "paste" if len(text) >= self.paste_threshold else "type"
+        return mode
+
+    def enter_text(self, text: str, human_like: bool = True, mode: Optional[str] = None,
+                   app: Optional[str] = None) -> Dict[str, Any]:
+        """Type or paste text into the focused field and report how long it took."""
+        resolved = self.resolve_input_mode(text, mode, app)
+        start = time.perf_counter()
+        report = {"mode": resolved, "app": app, "chars": len(text)}
+        with self.tracer.span("typer.enter_text", mode=resolved, app=app) as span:
+            span.count(chars=len(text))
+            if resolved == "paste":
+                report.update(self.paste_text(text))
             else:
-                keyboard.write(text)
+                self.type_text(text, human_like)
+        report["seconds"] = time.perf_counter() - start
+        self.last_input_report = report
+        self.logger.info(f"Entered {len(text)} chars by {resolved} in {report['seconds']:.2f}s")
+        return report
+
+    @traced("typer.paste_text")
+    def paste_text(self, text: str) -> Dict[str, Any]:
+        """Enter text through the clipboard in chunks, then put the old clipboard back.
+
+        {key} markup is still sent as key presses between pasted parts.
+        With verify_paste, the field is copied back and checked for the
+        last pasted part; the result is reported as "verified".
+        """
+        pyperclip = get_clipboard(self.config)
+
+        try:
+            previous = pyperclip.paste()
+        except pyperclip.PyperclipException:
+            previous = None
+        chunks = 0
+        literal = []
+        try:
+            for kind, value in self.compiler.compile(text).actions:
+                if kind == "chord":
+                    self.backend.send(value)
+                    continue
+                if kind == "delay":
+                    self.backend.sleep(value)
+                    continue
+                literal.append(value)
+                for i in range(0, len(value), self.paste_chunk_chars):
+                    chunk = value[i:i + self.paste_chunk_chars]
+                    pyperclip.copy(chunk)
+                    if pyperclip.paste() != chunk:
+                        # Clipboard managers can lag; give it one more try
+                        self._wait(self.paste_delay)
+                        pyperclip.copy(chunk)
+                    self.backend.send(PASTE_KEY)
+                    self.backend.sleep(self.paste_delay)
+                    chunks += 1
+
+            self.tracer.current().count(
+                paste_chunks=chunks, paste_bytes=sum(len(value.encode("utf-8")) for value in literal)
+            )
+            verified = None
+            if self.verify_paste and literal:
+                verified = self._verify_field(literal[-1])
+                if not verified:
+                    self.logger.warning("Pasted text was not found in the focused field")
+        finally:
+            if previous is not None:
+                try:
+                    pyperclip.copy(previous)
+                except pyperclip.PyperclipException:
+                    pass
+        return {"chunks": chunks, "verified": verified}
+
+    def _verify_field(self, expected: str) -> bool:
+        """Copy the focused field's contents and check the last pasted part is there."""
+        pyperclip = get_clipboard(self.config)
+
+        marker = f"__verify_{time.time_ns()}__"
+        pyperclip.copy(marker)
+        self.backend.send(SELECT_ALL_KEY)
+        self.backend.sleep(self.paste_delay)
+        self.backend.send(COPY_KEY)
+        self.backend.sleep(self.paste_delay)
+        content = pyperclip.paste()
+        self.backend.send('ctrl+end')  # Drop the selection, caret back at the end
+        if content == marker:
+            # Nothing was copied (e.g. the field does not allow it); do not count that as a failure
+            return True
+        normalize = lambda value: value.replace('\r\n', '\n').strip()
+        return normalize(expected) in normalize(content)
+
+    @traced("typer.type_stream")
+    def type_stream(self, chunks: Iterable[str], human_like: bool = True, mode: Optional[str] = None,
+                    app: Optional[str] = None) -> str:
+        """Type streamed text sentence by sentence as chunks arrive.
+
+        Returns the full text that was typed. Stopping early (e.g. Ctrl+C)
+        closes the stream so the LLM stops generating. With mode/app set to
+        paste, each sentence is pasted instead of typed.
+        """
+        typed = []
+        buffer = ""
+        start = time.perf_counter()
+        stream_mode = mode or self.app_input_modes.get(app) or self.input_mode
+        # "auto" decides per sentence, which would mix modes; streamed sentences are short, so type them
+        if stream_mode == "auto":
+            stream_mode = "type"
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                cut = self._sentence_boundary(buffer)
+                if cut:
+                    self.enter_text(buffer[:cut], human_like, stream_mode, app)
+                    typed.append(buffer[:cut])
+                    buffer = buffer[cut:]
+            if buffer:
+                self.enter_text(buffer, human_like, stream_mode, app)
+                typed.append(buffer)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+        text = "".join(typed)
+        self.last_input_report = {
+            "mode": stream_mode,
+            "app": app,
+            "chars": len(text),
+            "streamed": True,
+            "seconds": time.perf_counter() - start
+        }
+        return text
+
+    def _sentence_boundary(self, text: str) -> int:
+        """Index just past the last complete sentence and the whitespace after it, or 0 if there is none.
+
+        The whitespace stays with the sentence it follows, so the next
+        sentence does not start with it. Never cuts inside an unclosed
+        {key} so markup reaches type_text whole.
+        """
+        cut = 0
+        depth = 0
+        for i, char in enumerate(text):
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth = max(0, depth - 1)
+            elif depth == 0 and (char == '\n' or (char in '.!?' and i + 1 < len(text) and text[i + 1].isspace())):
+                cut = i + 1
+                while cut < len(text) and text[cut].isspace():
+                    cut += 1
+        return cut
 
     def _type_human_like(self, text: str):
         """Simulate human-like typing with random delays and occasional mistakes."""
@@ -59,30 +257,34 @@ class CursorTyper:
         words = text.split()
         
         for i, word in enumerate(words):
-            # Add space between words
-            if i > 0:
-                keyboard.write(" ")
-                time.sleep(random.uniform(0.1, 0.3))  # Natural pause between words
+            # Add space between words, and before the first one if the text starts with whitespace
+            if i > 0 or text[:1].isspace():
+                self.backend.write(" ")
+                self.backend.sleep(random.uniform(0.1, 0.3))  # Natural pause between words
             
             # Type each character in the word
             for char in word:
                 # Random delay between keystrokes
                 delay = random.uniform(0.05, 0.2)
-                time.sleep(delay)
+                self.backend.sleep(delay)
                 
                 # Occasionally make a typo and correct it
                 if random.random() < 0.05:  # 5% chance of typo
                     wrong_char = self._get_adjacent_key(char)
-                    keyboard.write(wrong_char)
-                    time.sleep(0.1)
-                    keyboard.press('backspace')
-                    time.sleep(0.1)
+                    self.backend.write(wrong_char)
+                    self.backend.sleep(0.1)
+                    self.backend.send('backspace')
+                    self.backend.sleep(0.1)
                 
-                keyboard.write(char)
+                self.backend.write(char)
             
             # Occasionally pause at the end of words
             if random.random() < 0.1:  # 10% chance of pause
-                time.sleep(random.uniform(0.2, 0.5))
+                self.backend.sleep(random.uniform(0.2, 0.5))
+
+        # Keep trailing whitespace so the next streamed sentence is not glued on
+        if words and text[-1:].isspace():
+            self.backend.write(" ")
 
     def _get_adjacent_key(self, char: str) -> str:
         """Get a random adjacent key on the keyboard for realistic typos."""
@@ -132,52 +334,68 @@ class CursorTyper:
 
     def accept_suggestion(self):
         """Accept the current suggestion."""
-        keyboard.press('tab')
-        time.sleep(0.1)
+        self.backend.send('tab')
+        self._wait(0.1)
 
     def reject_suggestion(self):
         """Reject the current suggestion."""
-        keyboard.press('escape')
-        time.sleep(0.1)
+        self.backend.send('escape')
+        self._wait(0.1)
 
+    @traced("typer.send_message")
     def send_message(self):
         """Send the message or submit the form."""
-        keyboard.press('enter')
-        time.sleep(0.5)  # Wait for message to send
+        self.backend.send('enter')
+        self._wait(0.5)  # Wait for message to send
 
+    @traced("typer.clear_text")
     def clear_text(self):
         """Clear the current text input."""
-        keyboard.press('ctrl+a')
-        time.sleep(0.1)
-        keyboard.press('backspace')
-        time.sleep(0.1)
+        self.backend.send(SELECT_ALL_KEY)
+        self._wait(0.1)
+        self.backend.send('backspace')
+        self._wait(0.1)
+
+    @traced("typer.type_to_cursor")
+    def type_to_cursor(self, text: Union[str, Iterable[str]], human_like: bool = True,
+                       mode: Optional[str] = None) -> str:
+        """Complete workflow to type to Cursor chat.
 
-    def type_to_cursor(self, text: str, human_like: bool = True):
-        """Complete workflow to type to Cursor chat."""
+        Accepts either a string or a stream of chunks (e.g. from
+        LLMClient.stream_cursor_prompt) and returns the text that was typed.
+        mode overrides the input mode ("type", "paste" or "auto") for this
+        call; timing is left in last_input_report.
+        """
         self.focus_application("cursor")
-        time.sleep(0.5)
+        self._wait(0.5)
         self.clear_text()
-        self.type_text(text, human_like)
+        if isinstance(text, str):
+            self.enter_text(text, human_like, mode, app="cursor")
+        else:
+            text = self.type_stream(text, human_like, mode, app="cursor")
         self.send_message()
+        return text
 
-    def type_to_google(self, text: str, human_like: bool = True):
+    @traced("typer.type_to_google")
+    def type_to_google(self, text: str, human_like: bool = True, mode: Optional[str] = None):
         """Complete workflow to type into Google search."""
         self.focus_application("google")
-        time.sleep(0.5)
+        self._wait(0.5)
         self.clear_text()
         # Press CTRL before typing
-        keyboard.press('ctrl')
-        time.sleep(0.1)
-        self.type_text(text, human_like)
-        keyboard.release('ctrl')
+        self.backend.press('ctrl')
+        self._wait(0.1)
+        self.enter_text(text, human_like, mode, app="google")
+        self.backend.release('ctrl')
         self.send_message()
 
-    def type_to_notes(self, text: str, human_like: bool = True):
+    @traced("typer.type_to_notes")
+    def type_to_notes(self, text: str, human_like: bool = True, mode: Optional[str] = None):
         """Complete workflow to type into Notes."""
         self.focus_application("notes")
-        time.sleep(0.5)
+        self._wait(0.5)
         self.clear_text()
-        self.type_text(text, human_like)
+        self.enter_text(text, human_like, mode, app="notes")
 
 if __name__ == "__main__":
     # Example usage
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Region = Tuple[int, int, int, int]  # left, top, width, height
+
+def to_rgb_array(image) -> np.ndarray:
+    """A PIL image or array as an HxWx3 uint8 RGB array (no copy when already one)."""
+    frame = np.asarray(image)
+    if frame.ndim == 2:
+        frame = np.stack([frame] * 3, axis=-1)
+    elif frame.shape[2] == 4:
+        frame = frame[..., :3]
+    if frame.dtype != np.uint8:
+        frame = frame.astype(np.uint8)
+    return frame
+
+def color_mask(frame: np.ndarray, target_rgb: Sequence[int], tolerance: int = 20,
+               metric: str = "channel") -> np.ndarray:
+    """uint8 mask (255 = match) of pixels close to target_rgb.
+
+    "channel" keeps the old getpixel rule (every channel differs by less
+    than tolerance) and runs as one cv2.inRange pass; "euclidean" compares
+    the RGB distance to tolerance instead.
+    """
+    if metric == "channel":
+        target = np.array(target_rgb[:3], dtype=np.int16)
+        lower = np.clip(target - tolerance + 1, 0, 255).astype(np.uint8)
+        upper = np.clip(target + tolerance - 1, 0, 255).astype(np.uint8)
+        return cv2.inRange(np.ascontiguousarray(frame[..., :3]), lower, upper)
+    if metric == "euclidean":
+        delta = frame[..., :3].astype(np.int32) - np.array(target_rgb[:3], dtype=np.int32)
+        distance = np.einsum("ijk,ijk->ij", delta, delta)
+        return np.where(distance < tolerance * tolerance, 255, 0).astype(np.uint8)
+    raise ValueError(f"Unknown color metric: {metric}")
+
+def find_color_blobs(image, target_rgb: Sequence[int], tolerance: int = 20, region: Optional[Region] = None,
+                     min_area: int = 1, metric: str = "channel", max_blobs: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Connected areas of the target color, largest first.
+
+    Each blob has "centroid" (x, y), "bbox" (x0, y0, x1, y1) and "area" in
+    pixels. Coordinates are relative to the full image even when a search
+    region is given, so they can be clicked directly.
+    """
+    frame = to_rgb_array(image)
+    left = top = 0
+    if region is not None:
+        left, top, width, height = region
+        frame = frame[top:top + height, left:left + width]
+    if frame.size == 0:
+        return []
+
+    mask = color_mask(frame, target_rgb, tolerance, metric)
+    # Label only the box around the matches; labelling the whole screen dominates otherwise
+    x0, y0, w, h = cv2.boundingRect(mask)
+    if w == 0 or h == 0:
+        return []
+    left, top = left + x0, top + y0
+    count, _, stats, centroids = cv2.connectedComponentsWithStats(mask[y0:y0 + h, x0:x0 + w], connectivity=8)
+
+    blobs = []
+    for label in range(1, count):
+        x, y, w, h, area = (int(value) for value in stats[label])
+        if area < min_area:
+            continue
+        cx, cy = centroids[label]
+        blobs.append({
+            "centroid": (int(round(cx)) + left, int(round(cy)) + top),
+            "bbox": (x + left, y + top, x + w + left, y + h + top),
+            "area": area
+        })
+    blobs.sort(key=lambda blob: blob["area"], reverse=True)
+    return blobs[:max_blobs] if max_blobs else blobs
+
+def find_color(image, target_rgb: Sequence[int], tolerance: int = 20, region: Optional[Region] = None,
+               min_area: int = 1, metric: str = "channel") -> Optional[Tuple[int, int]]:
+    """Centroid of the largest blob of the target color, or None."""
+    blobs = find_color_blobs(image, target_rgb, tolerance, region, min_area, metric, max_blobs=1)
+    return blobs[0]["centroid"] if blobs else None
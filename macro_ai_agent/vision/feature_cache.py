@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+def perceptual_hash(image: np.ndarray) -> int:
+    """64-bit DCT perceptual hash; near-identical images differ in only a few bits."""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view(">u8")[0])
+
+def verification_thumbnail(image: np.ndarray, max_side: int = 1024) -> np.ndarray:
+    """Grayscale copy no larger than max_side, kept to confirm a perceptual-hash match pixel by pixel."""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, max_side / max(gray.shape[:2]))
+    if scale < 1.0:
+        size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    return gray
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _json_default(value):
+    # easyocr and numpy hand back numpy scalars/arrays inside the features
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+class FeatureCache:
+    """Persistent cache of VisionProcessor features.
+
+    Entries are keyed on the SHA-256 of the image file plus the processor
+    version, so changing the extraction code invalidates old results.
+    Each entry is one compressed .npz whose name also carries the image's
+    perceptual hash; that lets near-identical screenshots find earlier
+    OCR results without reading any files. A hash match is only a
+    candidate: the OCR is reused only when a grayscale thumbnail stored
+    with the entry matches the new image pixel for pixel (no more than
+    reuse_max_changed_pixels differ by over reuse_pixel_tolerance), since
+    screenshots of different code can hash a few bits apart and a
+    one-character edit changes only a handful of pixels. The
+    store is trimmed least-recently-used first once it grows past max_disk_mb.
+    """
+
+    def __init__(self, cache_config: Optional[dict], version: str):
+        cache_config = cache_config or {}
+        self.enabled = cache_config.get("enabled", True)
+        self.directory = cache_config.get("directory", "output/cache/vision")
+        self.max_disk_bytes = int(cache_config.get("max_disk_mb", 256) * 1024 * 1024)
+        self.max_memory_entries = cache_config.get("max_memory_entries", 32)
+        self.phash_max_distance = cache_config.get("phash_max_distance", 6)
+        self.reuse_pixel_tolerance = cache_config.get("reuse_pixel_tolerance", 24)
+        self.reuse_max_changed_pixels = cache_config.get("reuse_max_changed_pixels", 0)
+        self.version = str(version)
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # content key -> [size, last access, phash, filename]
+        self._disk_index: Optional[Dict[str, list]] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('FeatureCache')
+        self.hits = 0
+        self.misses = 0
+        self.ocr_reuses = 0
+        self.ocr_reuse_rejections = 0
+        self.evictions = 0
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def make_key(self, data: bytes) -> str:
+        """Cache key for raw image file bytes."""
+        return hashlib.sha256(data).hexdigest()
+
+    def _filename(self, key: str, phash: int) -> str:
+        return f"{key}-v{self.version}-{phash:016x}.npz"
+
+    def _load_index(self) -> Dict[str, list]:
+        """Scan the store once (file names only). Caller holds the lock."""
+        if self._disk_index is None:
+            self._disk_index = {}
+            if os.path.isdir(self.directory):
+                suffix = f"-v{self.version}-"
+                for filename in os.listdir(self.directory):
+                    if not filename.endswith(".npz") or suffix not in filename:
+                        continue
+                    key, rest = filename[:-4].split(suffix, 1)
+                    stat = os.stat(os.path.join(self.directory, filename))
+                    self._disk_index[key] = [stat.st_size, stat.st_mtime, int(rest, 16), filename]
+        return self._disk_index
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached features for this image content, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            record = self._load_index().get(key)
+        features = self._read(record) if record else None
+        with self._lock:
+            if features is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, features)
+        return features
+
+    def put(self, key: str, features: Dict[str, Any], phash: int, thumbnail: Optional[np.ndarray] = None):
+        """Store features for an image, with its verification_thumbnail() if OCR may be reused from it."""
+        if not self.enabled:
+            return
+        payload = json.dumps(features, default=_json_default, separators=(",", ":")).encode("utf-8")
+        filename = self._filename(key, phash)
+        path = os.path.join(self.directory, filename)
+        arrays = {"features": np.frombuffer(payload, dtype=np.uint8)}
+        if thumbnail is not None:
+            arrays["thumbnail"] = thumbnail
+        try:
+            self._write_disk(path, arrays)
+            size = os.path.getsize(path)
+        except OSError as e:
+            # The features are already computed; only the disk copy is lost
+            self.logger.warning(f"Could not write feature cache entry {key[:12]}: {e}")
+            size = None
+
+        with self._lock:
+            self._remember(key, json.loads(payload))
+            if size is not None:
+                index = self._load_index()
+                index[key] = [size, time.time(), phash, filename]
+                self._trim(index)
+
+    def _write_disk(self, path: str, arrays: Dict[str, np.ndarray]):
+        # A unique temp file per write: concurrent puts of the same key must not share one
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile("wb", dir=self.directory, prefix=f"{os.path.basename(path)}.",
+                                             suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, path)
+        except OSError:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def find_similar_ocr(self, phash: int, thumbnail: np.ndarray) -> Optional[List[Dict[str, Any]]]:
+        """OCR text of the closest cached image within phash_max_distance bits whose pixels match, if any."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            candidates = sorted(
+                (hamming(phash, record[2]), key, record) for key, record in self._load_index().items()
+            )
+        for distance, key, record in candidates:
+            if distance > self.phash_max_distance:
+                break
+            features, stored = self._read(record, with_thumbnail=True)
+            if features is None or "text" not in features:
+                continue
+            if not self._same_pixels(stored, thumbnail):
+                with self._lock:
+                    self.ocr_reuse_rejections += 1
+                continue
+            with self._lock:
+                self.ocr_reuses += 1
+            return features["text"]
+        return None
+
+    def _same_pixels(self, stored: Optional[np.ndarray], thumbnail: np.ndarray) -> bool:
+        """Whether two verification thumbnails show the same picture; entries without one never match."""
+        if stored is None or stored.shape != thumbnail.shape:
+            return False
+        changed = np.abs(stored.astype(np.int16) - thumbnail.astype(np.int16)) > self.reuse_pixel_tolerance
+        return int(changed.sum()) <= self.reuse_max_changed_pixels
+
+    def _read(self, record: list, with_thumbnail: bool = False):
+        """Features of a stored entry (None if unreadable); with_thumbnail returns (features, thumbnail)."""
+        path = os.path.join(self.directory, record[3])
+        thumbnail = None
+        try:
+            with np.load(path) as data:
+                features = json.loads(data["features"].tobytes().decode("utf-8"))
+                if with_thumbnail and "thumbnail" in data.files:
+                    thumbnail = data["thumbnail"]
+        except (OSError, ValueError, KeyError):
+            return (None, None) if with_thumbnail else None
+        # mtime doubles as the last-access time for LRU trimming
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        record[1] = now
+        return (features, thumbnail) if with_thumbnail else features
+
+    def _remember(self, key: str, features: Dict[str, Any]):
+        """Insert into the in-memory LRU. Caller holds the lock."""
+        self._memory[key] = features
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _trim(self, index: Dict[str, list]):
+        """Evict least-recently-used entries until under max_disk_bytes. Caller holds the lock."""
+        total = sum(record[0] for record in index.values())
+        if total <= self.max_disk_bytes:
+            return
+        for key in sorted(index, key=lambda k: index[k][1]):
+            if total <= self.max_disk_bytes:
+                break
+            total -= index[key][0]
+            try:
+                os.remove(os.path.join(self.directory, index[key][3]))
+            except OSError:
+                pass
+            del index[key]
+            self._memory.pop(key, None)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "ocr_reuses": self.ocr_reuses,
+                "ocr_reuse_rejections": self.ocr_reuse_rejections,
+                "evictions": self.evictions,
+                "entries": len(index),
+                "disk_bytes": sum(record[0] for record in index.values())
+            }
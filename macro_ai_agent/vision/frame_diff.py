@@ -0,0 +1,145 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Rect = Tuple[int, int, int, int]  # x0, y0, x1, y1 in full-frame pixels
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def _union(a: Rect, b: Rect) -> Rect:
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+class FrameDiffer:
+    """Finds what changed between consecutive screen frames.
+
+    Frames are downsampled to grayscale and hashed; identical hashes mean
+    nothing changed. Otherwise the frame is split into tiles and the tiles
+    whose maximum difference exceeds pixel_threshold are grouped into dirty
+    rectangles.
+    """
+
+    def __init__(self, diff_config: Optional[dict] = None):
+        diff_config = diff_config or {}
+        self.downsample = max(1, diff_config.get("downsample", 4))
+        self.tile_size = max(self.downsample, diff_config.get("tile_size", 64))
+        self.pixel_threshold = diff_config.get("pixel_threshold", 12)
+        self.full_ocr_ratio = diff_config.get("full_ocr_ratio", 0.5)
+        self._previous: Optional[np.ndarray] = None
+        self._previous_hash: Optional[bytes] = None
+        self._shape: Optional[Tuple[int, ...]] = None
+
+    def reset(self):
+        """Forget the previous frame so the next one counts as fully changed."""
+        self._previous = None
+        self._previous_hash = None
+        self._shape = None
+
+    def diff(self, frame: np.ndarray) -> Tuple[str, List[Rect]]:
+        """Compare with the previous frame: ("unchanged" | "partial" | "full", dirty rects)."""
+        height, width = frame.shape[:2]
+        small = frame[::self.downsample, ::self.downsample]
+        if small.ndim == 3:
+            small = small.mean(axis=2, dtype=np.float32).astype(np.uint8)
+        frame_hash = hashlib.blake2b(small.tobytes(), digest_size=16).digest()
+
+        previous, previous_hash = self._previous, self._previous_hash
+        same_shape = self._shape == frame.shape
+        self._previous, self._previous_hash, self._shape = small, frame_hash, frame.shape
+
+        if previous is None or not same_shape:
+            return "full", [(0, 0, width, height)]
+        if frame_hash == previous_hash:
+            return "unchanged", []
+
+        tile = self.tile_size // self.downsample
+        rows = -(-small.shape[0] // tile)
+        cols = -(-small.shape[1] // tile)
+        delta = cv2.absdiff(small, previous)
+        padded = np.zeros((rows * tile, cols * tile), dtype=np.uint8)
+        padded[:delta.shape[0], :delta.shape[1]] = delta
+        tile_max = padded.reshape(rows, tile, cols, tile).max(axis=(1, 3))
+        dirty = (tile_max > self.pixel_threshold).astype(np.uint8)
+
+        if not dirty.any():
+            return "unchanged", []
+        if dirty.mean() > self.full_ocr_ratio:
+            return "full", [(0, 0, width, height)]
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(dirty, connectivity=8)
+        rects = []
+        for x, y, w, h, _ in stats[1:count]:
+            rects.append((
+                int(x) * self.tile_size,
+                int(y) * self.tile_size,
+                min(width, int(x + w) * self.tile_size),
+                min(height, int(y + h) * self.tile_size)
+            ))
+        return "partial", rects
+
+class OCRLayout:
+    """Cached OCR results for a frame, patched region by region."""
+
+    def __init__(self):
+        self.entries: List[Dict[str, Any]] = []
+
+    def replace(self, results: Sequence) -> None:
+        """Replace the whole layout with full-frame readtext results."""
+        self.entries = [self._entry(bbox, text, prob, 0, 0) for bbox, text, prob in results]
+
+    def expand(self, rects: List[Rect]) -> List[Rect]:
+        """Grow dirty rects to cover any cached text they cut through, so words are re-read whole."""
+        expanded = []
+        for rect in rects:
+            changed = True
+            while changed:
+                changed = False
+                for entry in self.entries:
+                    box = entry["box"]
+                    if _intersects(rect, box) and _union(rect, box) != rect:
+                        rect = _union(rect, box)
+                        changed = True
+            expanded.append(rect)
+
+        # Rects that now overlap are read once as their union
+        merged: List[Rect] = []
+        for rect in expanded:
+            for i, other in enumerate(merged):
+                if _intersects(rect, other):
+                    merged[i] = _union(rect, other)
+                    break
+            else:
+                merged.append(rect)
+        if len(merged) < len(expanded):
+            return self.expand(merged)
+        return merged
+
+    def merge(self, rect: Rect, results: Sequence) -> None:
+        """Drop cached text inside rect and add readtext results for the crop at rect."""
+        self.entries = [entry for entry in self.entries if not _intersects(entry["box"], rect)]
+        self.entries.extend(self._entry(bbox, text, prob, rect[0], rect[1]) for bbox, text, prob in results)
+
+    def results(self) -> List[Tuple[List[List[int]], str, float]]:
+        """Entries in readtext form, in reading order."""
+        return [(entry["bbox"], entry["text"], entry["confidence"]) for entry in self._ordered()]
+
+    def text(self) -> str:
+        """Cached text in reading order (top to bottom, then left to right)."""
+        return " ".join(entry["text"] for entry in self._ordered())
+
+    def _ordered(self) -> List[Dict[str, Any]]:
+        # Bucket by line so words on the same row read left to right
+        return sorted(self.entries, key=lambda entry: (entry["box"][1] // 16, entry["box"][0]))
+
+    def _entry(self, bbox, text: str, prob: float, dx: int, dy: int) -> Dict[str, Any]:
+        points = [[int(x) + dx, int(y) + dy] for x, y in bbox]
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        return {
+            "bbox": points,
+            "box": (min(xs), min(ys), max(xs), max(ys)),
+            "text": text,
+            "confidence": prob
+        }
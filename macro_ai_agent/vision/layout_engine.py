@@ -0,0 +1,306 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x0, y0, x1, y1
+
+def mirror_scores(mask: np.ndarray) -> Dict[str, float]:
+    """How well a binary mask matches its own mirror image, 0..1 per axis.
+
+    horizontal_symmetry compares left with right (mirror across the
+    vertical centre line); vertical_symmetry compares top with bottom.
+    """
+    mask = mask.astype(bool)
+    total = int(mask.sum())
+    if total == 0:
+        return {"horizontal_symmetry": 0.0, "vertical_symmetry": 0.0}
+    return {
+        "horizontal_symmetry": float(np.logical_and(mask, mask[:, ::-1]).sum()) / total,
+        "vertical_symmetry": float(np.logical_and(mask, mask[::-1, :]).sum()) / total
+    }
+
+def profile_segments(profile: np.ndarray, min_gap: int, min_size: int) -> List[Tuple[int, int]]:
+    """(start, end) runs where a projection profile is occupied, merging gaps shorter than min_gap."""
+    occupied = np.concatenate(([False], profile > 0, [False]))
+    edges = np.flatnonzero(occupied[1:] != occupied[:-1])
+    runs = list(zip(edges[::2], edges[1::2]))
+    merged: List[Tuple[int, int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return [(int(start), int(end)) for start, end in merged if end - start >= min_size]
+
+def edge_density(gray: np.ndarray, step: int = 16, threshold: int = 40) -> float:
+    """Share of neighbouring pixels, on every step-th row, that differ by more than threshold grey levels.
+
+    A cheap stand-in for Canny edge density, to pick the analysis scale
+    before paying for Canny.
+    """
+    rows = gray[::step]
+    if rows.shape[1] < 2:
+        return 0.0
+    steps = cv2.absdiff(rows[:, 1:], rows[:, :-1])
+    return np.count_nonzero(steps > threshold) / steps.size
+
+class LayoutEngine:
+    """Components, grid and symmetry from the Canny/findContours pass.
+
+    The image is analysed at no more than max_side pixels on its longest
+    side (boxes are reported in original pixels), and at half that again
+    when edge_density() is over max_edge_density (noise, photos, dense
+    text), since Canny and contour tracing cost grows with the edges.
+    Stages run in order of value: contours, classification, text
+    attachment, grid, symmetry; once budget_ms is spent the remaining
+    stages are skipped and listed under "skipped", so the engine can run
+    inside the observe loop. Only the max_contours longest contours are
+    kept.
+    """
+
+    def __init__(self, layout_config: Optional[dict] = None):
+        layout_config = layout_config or {}
+        self.budget_ms = layout_config.get("budget_ms", 40)
+        self.max_side = layout_config.get("max_side", 1280)
+        self.min_area_ratio = layout_config.get("min_area_ratio", 0.0002)
+        self.max_components = layout_config.get("max_components", 300)
+        self.max_contours = layout_config.get("max_contours", 1500)
+        self.max_edge_density = layout_config.get("max_edge_density", 0.15)
+        self.grid_min_gap = layout_config.get("grid_min_gap", 8)
+
+    def analyze(self, image: np.ndarray, text_elements: Optional[Sequence[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Layout of a BGR (or grayscale) image, with optional OCR results to attach."""
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000
+        timings: Dict[str, float] = {}
+        skipped: List[str] = []
+
+        def lap(stage: str, since: float) -> float:
+            now = time.perf_counter()
+            timings[stage] = (now - since) * 1000
+            return now
+
+        height, width = image.shape[:2]
+        scale = min(1.0, self.max_side / max(height, width))
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if edge_density(gray) > self.max_edge_density:
+            scale /= 2
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # A contrasting 2px frame gives bars touching the screen edge a closed outline
+        frame_value = 0 if np.median(gray[::8, ::8]) > 127 else 255
+        padded = cv2.copyMakeBorder(gray, 2, 2, 2, 2, cv2.BORDER_CONSTANT, value=frame_value)
+        edges = cv2.Canny(padded, 50, 150)
+        clock = lap("edges", start)
+
+        boxes, fills = np.zeros((0, 4), dtype=np.int32), np.zeros(0)
+        if time.perf_counter() < deadline:
+            edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+            if len(contours) > self.max_contours:
+                lengths = np.fromiter(map(len, contours), dtype=np.int64, count=len(contours))
+                contours = [contours[i] for i in np.argpartition(-lengths, self.max_contours)[:self.max_contours]]
+            boxes, fills = self._boxes(contours, gray.shape)
+            clock = lap("contours", clock)
+        else:
+            skipped.append("contours")
+        edges = edges[2:-2, 2:-2]
+
+        components: List[Dict[str, Any]] = []
+        if time.perf_counter() < deadline:
+            components = self._classify(gray, edges, boxes, fills, scale, (width, height))
+            clock = lap("classify", clock)
+        else:
+            skipped.append("classify")
+
+        if text_elements and components:
+            if time.perf_counter() < deadline:
+                self.attach_text(components, text_elements)
+                clock = lap("text", clock)
+            else:
+                skipped.append("text")
+
+        grid = {"type": "unknown", "columns": 0, "rows": 0}
+        if time.perf_counter() < deadline:
+            grid = self.grid([c["box"] for c in components if c["type"] not in ("navbar", "container", "text")],
+                             (width, height))
+            clock = lap("grid", clock)
+        else:
+            skipped.append("grid")
+
+        symmetry = {"horizontal_symmetry": 0.0, "vertical_symmetry": 0.0}
+        if time.perf_counter() < deadline:
+            symmetry = mirror_scores(edges)
+            clock = lap("symmetry", clock)
+        else:
+            skipped.append("symmetry")
+
+        sections = sorted(
+            (c for c in components if c["type"] in ("navbar", "container")),
+            key=lambda c: (c["box"][1], c["box"][0])
+        )
+        return {
+            "components": components,
+            "sections": [{"type": c["type"], "box": c["box"]} for c in sections],
+            "grid_structure": grid,
+            "symmetry": symmetry,
+            "timings_ms": timings,
+            "elapsed_ms": (time.perf_counter() - start) * 1000,
+            "skipped": skipped
+        }
+
+    def _boxes(self, contours: Sequence[np.ndarray], shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Bounding boxes of rectangular-enough contours (deduplicated), with how much of each box the contour fills."""
+        height, width = shape
+        min_area = self.min_area_ratio * height * width
+        rects = []
+        fills = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            area = w * h
+            # Contours are in padded coordinates; the outline of the whole frame is not a component
+            if area < min_area or w < 6 or h < 6 or area >= 0.9 * height * width:
+                continue
+            x0, y0 = max(0, x - 2), max(0, y - 2)
+            rects.append((x0, y0, min(width, x - 2 + w), min(height, y - 2 + h)))
+            fills.append(cv2.contourArea(contour) / area)
+        if not rects:
+            return np.zeros((0, 4), dtype=np.int32), np.zeros(0)
+
+        rects = np.array(rects, dtype=np.int32)
+        fills = np.array(fills)
+        # Largest first; drop near-duplicates (a border's inner and outer contour)
+        order = np.argsort(-(rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1]))
+        rects, fills = rects[order], fills[order]
+        keep = []
+        for i, rect in enumerate(rects):
+            if keep:
+                kept = rects[keep]
+                close = np.abs(kept - rect).max(axis=1) <= 4
+                if close.any():
+                    continue
+            keep.append(i)
+            if len(keep) >= self.max_components:
+                break
+        return rects[keep], fills[keep]
+
+    def _classify(self, gray: np.ndarray, edges: np.ndarray, boxes: np.ndarray, fills: np.ndarray,
+                  scale: float, size: Tuple[int, int]) -> List[Dict[str, Any]]:
+        width, height = size
+        if len(boxes) == 0:
+            return []
+        # Integral images give every box's mean, variance and edge density in O(1)
+        sums, squares = cv2.integral2(gray, sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+        edge_sums = cv2.integral(edges, sdepth=cv2.CV_32S)
+
+        def box_sum(table, b):
+            return table[b[:, 3], b[:, 2]] - table[b[:, 1], b[:, 2]] - table[b[:, 3], b[:, 0]] + table[b[:, 1], b[:, 0]]
+
+        # Interior: shrink by 3px so the border itself is excluded
+        inner = boxes + np.array([3, 3, -3, -3])
+        inner[:, 2] = np.maximum(inner[:, 2], inner[:, 0] + 1)
+        inner[:, 3] = np.maximum(inner[:, 3], inner[:, 1] + 1)
+        area = ((inner[:, 2] - inner[:, 0]) * (inner[:, 3] - inner[:, 1])).astype(np.float64)
+        mean = box_sum(sums, inner) / area
+        std = np.sqrt(np.maximum(0, box_sum(squares, inner) / area - mean ** 2))
+        edge_density = box_sum(edge_sums, inner) / 255 / area
+
+        full = (boxes / scale).round().astype(int)
+        components = []
+        for i, (x0, y0, x1, y1) in enumerate(full.tolist()):
+            w, h = x1 - x0, y1 - y0
+            aspect = w / max(1, h)
+            if w >= 0.8 * width and h <= 0.15 * height and (y0 <= 0.05 * height or y1 >= 0.95 * height):
+                kind = "navbar"
+            elif edge_density[i] > 0.25 and std[i] > 40 and w * h > 0.01 * width * height:
+                kind = "image"
+            elif 16 <= h <= 72 and aspect >= 4 and std[i] < 25 and edge_density[i] < 0.08:
+                kind = "input"
+            elif h <= 72 and fills[i] < 0.85:
+                kind = "text"
+            elif 16 <= h <= 72 and 1.2 <= aspect <= 8 and w <= 0.4 * width:
+                kind = "button"
+            elif fills[i] >= 0.85:
+                kind = "rectangle"
+            else:
+                kind = "region"
+            components.append({
+                "type": kind,
+                "box": (x0, y0, x1, y1),
+                "fill": round(float(fills[i]), 3),
+                "contrast": round(float(std[i]), 1),
+                "text": []
+            })
+
+        # Anything that contains two or more other components is a container
+        contained = ((full[:, None, 0] - 2 <= full[None, :, 0]) & (full[:, None, 1] - 2 <= full[None, :, 1])
+                     & (full[None, :, 2] <= full[:, None, 2] + 2) & (full[None, :, 3] <= full[:, None, 3] + 2))
+        np.fill_diagonal(contained, False)
+        for component, inside in zip(components, contained.sum(axis=1)):
+            if inside >= 2 and component["type"] not in ("navbar", "image", "text"):
+                component["type"] = "container"
+        return components
+
+    def attach_text(self, components: List[Dict[str, Any]], text_elements: Sequence[Dict[str, Any]]):
+        """Add each OCR result to the smallest non-text component containing its centre."""
+        components = [c for c in components if c["type"] != "text"]
+        if not components:
+            return
+        boxes = np.array([c["box"] for c in components], dtype=np.float64)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        for element in text_elements:
+            points = np.asarray(element["position"], dtype=np.float64)
+            cx, cy = points[:, 0].mean(), points[:, 1].mean()
+            inside = (boxes[:, 0] <= cx) & (cx <= boxes[:, 2]) & (boxes[:, 1] <= cy) & (cy <= boxes[:, 3])
+            if not inside.any():
+                continue
+            index = int(np.flatnonzero(inside)[np.argmin(areas[inside])])
+            component = components[index]
+            component["text"].append(element["text"])
+            # A plain rectangle with a short label in it is a button
+            if component["type"] in ("rectangle", "region") and len(element["text"]) <= 24 \
+                    and component["box"][3] - component["box"][1] <= 72:
+                component["type"] = "button"
+
+    def grid(self, boxes: Sequence[Sequence[int]], size: Tuple[int, int]) -> Dict[str, Any]:
+        """Columns and rows from projection profiles of the component boxes."""
+        width, height = size
+        if not len(boxes):
+            return {"type": "unknown", "columns": 0, "rows": 0}
+        boxes = np.asarray(boxes, dtype=np.int64)
+        x_profile = np.zeros(width + 1, dtype=np.int32)
+        y_profile = np.zeros(height + 1, dtype=np.int32)
+        # Difference arrays: +1 at each start, -1 at each end, then a running sum
+        np.add.at(x_profile, np.clip(boxes[:, 0], 0, width), 1)
+        np.add.at(x_profile, np.clip(boxes[:, 2], 0, width), -1)
+        np.add.at(y_profile, np.clip(boxes[:, 1], 0, height), 1)
+        np.add.at(y_profile, np.clip(boxes[:, 3], 0, height), -1)
+        columns = profile_segments(np.cumsum(x_profile)[:-1], self.grid_min_gap, 8)
+        rows = profile_segments(np.cumsum(y_profile)[:-1], self.grid_min_gap, 8)
+
+        if len(columns) > 1 and len(rows) > 1:
+            kind = "grid"
+        elif len(columns) > 1:
+            kind = "columns"
+        elif len(rows) > 1:
+            kind = "rows"
+        else:
+            kind = "single"
+        return {
+            "type": kind,
+            "columns": len(columns),
+            "rows": len(rows),
+            "column_spans": columns,
+            "row_spans": rows
+        }
+
+    def box_symmetry(self, boxes: Sequence[Sequence[int]], size: Tuple[int, int]) -> Dict[str, float]:
+        """mirror_scores of the component outlines drawn on a small canvas."""
+        width, height = size
+        factor = min(1.0, 256 / max(width, height, 1))
+        canvas = np.zeros((max(1, int(height * factor)), max(1, int(width * factor))), dtype=np.uint8)
+        for x0, y0, x1, y1 in boxes:
+            cv2.rectangle(canvas, (int(x0 * factor), int(y0 * factor)), (int(x1 * factor), int(y1 * factor)), 1, 2)
+        return mirror_scores(canvas)
@@ -0,0 +1,185 @@
+import glob
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x0, y0, x1, y1
+
+def to_gray(image) -> np.ndarray:
+    """A PIL image, RGB(A) array or grayscale array as a uint8 grayscale array."""
+    frame = np.asarray(image)
+    if frame.ndim == 2:
+        return frame if frame.dtype == np.uint8 else frame.astype(np.uint8)
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(np.ascontiguousarray(frame), cv2.COLOR_RGB2GRAY)
+
+class ElementLocator:
+    """Finds UI elements on screen from reference crops.
+
+    Templates are matched with normalized cross-correlation at several
+    scales. A full search runs on a downsampled frame first and is then
+    refined at full resolution around the best hit. The last position and
+    scale of each template are cached, so the next lookup only searches a
+    small window around it and falls back to a full search when the
+    element has moved.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        driver = config.get("macro_driver", {})
+        locator_config = driver.get("locator", {})
+        self.logger = logging.getLogger('ElementLocator')
+        self.confidence_threshold = driver.get("confidence_threshold", 0.8)
+        self.templates_dir = driver.get("templates_dir", "input/templates")
+        self.scales = locator_config.get("scales", [1.0, 0.9, 1.1, 0.8, 1.25])
+        self.coarse_factor = locator_config.get("coarse_factor", 0.5)
+        self.search_margin = locator_config.get("search_margin", 48)
+        self.templates: Dict[str, np.ndarray] = {}
+        self.last_seen: Dict[str, Dict[str, Any]] = {}
+        self.stats_counters = {"lookups": 0, "cache_hits": 0, "full_searches": 0, "misses": 0}
+
+    def template_path(self, name: str) -> Optional[str]:
+        """Reference image for name in templates_dir (any common image extension)."""
+        for path in glob.glob(os.path.join(self.templates_dir, f"{glob.escape(name)}.*")):
+            if path.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")):
+                return path
+        return None
+
+    def has_template(self, name: str) -> bool:
+        return name in self.templates or self.template_path(name) is not None
+
+    def add_template(self, name: str, image) -> None:
+        """Register a reference crop directly instead of loading it from templates_dir."""
+        self.templates[name] = to_gray(image)
+        self.last_seen.pop(name, None)
+
+    def _template(self, name: str) -> np.ndarray:
+        if name not in self.templates:
+            path = self.template_path(name)
+            if path is None:
+                raise FileNotFoundError(f"No template for '{name}' in {self.templates_dir}")
+            template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                raise ValueError(f"Could not read template image: {path}")
+            self.templates[name] = template
+        return self.templates[name]
+
+    def _match(self, gray: np.ndarray, template: np.ndarray, scale: float,
+               offset: Tuple[int, int] = (0, 0)) -> Optional[Dict[str, Any]]:
+        """Best match of template (resized by scale) in gray; None if it does not fit."""
+        if scale != 1.0:
+            template = cv2.resize(template, None, fx=scale, fy=scale,
+                                  interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        th, tw = template.shape[:2]
+        if th < 4 or tw < 4 or th > gray.shape[0] or tw > gray.shape[1]:
+            return None
+        scores = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+        _, confidence, _, (x, y) = cv2.minMaxLoc(scores)
+        x0, y0 = x + offset[0], y + offset[1]
+        return {"confidence": float(confidence), "box": (x0, y0, x0 + tw, y0 + th), "scale": scale}
+
+    def _search_window(self, gray: np.ndarray, template: np.ndarray, box: Box, scale: float) -> Optional[Dict[str, Any]]:
+        margin = self.search_margin
+        x0 = max(0, box[0] - margin)
+        y0 = max(0, box[1] - margin)
+        x1 = min(gray.shape[1], box[2] + margin)
+        y1 = min(gray.shape[0], box[3] + margin)
+        return self._match(gray[y0:y1, x0:x1], template, scale, (x0, y0))
+
+    def _full_search(self, gray: np.ndarray, template: np.ndarray) -> Optional[Dict[str, Any]]:
+        # Coarse pass over all scales on a downsampled frame
+        factor = self.coarse_factor
+        coarse_ok = factor < 1 and min(template.shape[:2]) * factor * min(self.scales) >= 8
+        if coarse_ok:
+            small = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+            small_template = cv2.resize(template, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        else:
+            small, small_template, factor = gray, template, 1.0
+
+        best = None
+        for scale in self.scales:
+            match = self._match(small, small_template, scale)
+            if match and (best is None or match["confidence"] > best["confidence"]):
+                best = match
+        if best is None or factor == 1.0:
+            return best
+
+        # Refine at full resolution around the coarse hit
+        box = tuple(int(round(value / factor)) for value in best["box"])
+        refined = self._search_window(gray, template, box, best["scale"])
+        return refined or best
+
+    def locate(self, name: str, frame=None, region: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, Any]:
+        """Find a template on screen (or in frame).
+
+        Returns {"name", "found", "confidence", "center", "box", "scale",
+        "source", "ms"}; "found" compares confidence with
+        macro_driver.confidence_threshold. region is (left, top, width,
+        height) and coordinates are always in full-screen pixels.
+        """
+        start = time.perf_counter()
+        self.stats_counters["lookups"] += 1
+        template = self._template(name)
+        if frame is None:
+            from ..sim.environment import get_gui
+            gui = get_gui(self.config)
+            frame = gui.screenshot(region=region) if region else gui.screenshot()
+            region_offset = (region[0], region[1]) if region else (0, 0)
+        elif region:
+            left, top, width, height = region
+            frame = np.asarray(frame)[top:top + height, left:left + width]
+            region_offset = (left, top)
+        else:
+            region_offset = (0, 0)
+        gray = to_gray(frame)
+
+        match, source = None, "full"
+        last = self.last_seen.get(name)
+        if last and last["region_offset"] == region_offset:
+            match = self._search_window(gray, template, last["local_box"], last["scale"])
+            if match and match["confidence"] >= self.confidence_threshold:
+                source = "cache"
+                self.stats_counters["cache_hits"] += 1
+            else:
+                match = None
+        if match is None:
+            self.stats_counters["full_searches"] += 1
+            match = self._full_search(gray, template)
+
+        found = match is not None and match["confidence"] >= self.confidence_threshold
+        if not found:
+            self.stats_counters["misses"] += 1
+            self.last_seen.pop(name, None)
+            return {
+                "name": name, "found": False,
+                "confidence": match["confidence"] if match else 0.0,
+                "center": None, "box": None, "scale": match["scale"] if match else None,
+                "source": source, "ms": (time.perf_counter() - start) * 1000
+            }
+
+        self.last_seen[name] = {"local_box": match["box"], "scale": match["scale"], "region_offset": region_offset}
+        dx, dy = region_offset
+        x0, y0, x1, y1 = match["box"]
+        box = (x0 + dx, y0 + dy, x1 + dx, y1 + dy)
+        return {
+            "name": name, "found": True,
+            "confidence": match["confidence"],
+            "center": ((box[0] + box[2]) // 2, (box[1] + box[3]) // 2),
+            "box": box, "scale": match["scale"],
+            "source": source, "ms": (time.perf_counter() - start) * 1000
+        }
+
+    def forget(self, name: Optional[str] = None):
+        """Drop cached positions (all of them, or one template's)."""
+        if name is None:
+            self.last_seen.clear()
+        else:
+            self.last_seen.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.stats_counters)
@@ -0,0 +1,132 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size in MB, if the platform exposes it."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a peak, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+    except (ImportError, AttributeError):
+        return None
+
+class OCREngine:
+    """An easyocr.Reader that is only built on first use (or on warm_up)."""
+
+    def __init__(self, languages: Sequence[str] = ("en",), gpu: Optional[bool] = None):
+        self.logger = logging.getLogger('OCREngine')
+        self.languages = list(languages)
+        self.gpu = gpu
+        self._reader = None
+        self._lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self.load_seconds: Optional[float] = None
+        self.memory_mb: Optional[float] = None
+        self.calls = 0
+        self.ocr_seconds = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._reader is not None
+
+    @property
+    def reader(self):
+        """The underlying easyocr.Reader, loading the models on first access."""
+        if self._reader is None:
+            with self._lock:
+                if self._reader is None:
+                    self._reader = self._load()
+        return self._reader
+
+    def _load(self):
+        # easyocr pulls in torch; importing it here keeps startup fast
+        import easyocr
+
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        kwargs = {} if self.gpu is None else {"gpu": self.gpu}
+        reader = easyocr.Reader(self.languages, **kwargs)
+        self.load_seconds = time.perf_counter() - start
+        rss_after = _rss_mb()
+        if rss_before is not None and rss_after is not None:
+            self.memory_mb = rss_after - rss_before
+        self.logger.info(
+            f"Loaded OCR models {self.languages} in {self.load_seconds:.2f}s"
+            + (f" (+{self.memory_mb:.0f} MB)" if self.memory_mb is not None else "")
+        )
+        return reader
+
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """Load the models now, optionally on a daemon thread."""
+        if self.loaded:
+            return None
+        if not background:
+            self.reader
+            return None
+        with self._lock:
+            if self._warmup_thread is None:
+                self._warmup_thread = threading.Thread(
+                    target=lambda: self.reader, name="ocr-warmup", daemon=True
+                )
+                self._warmup_thread.start()
+        return self._warmup_thread
+
+    def readtext(self, image, **kwargs) -> List:
+        """easyocr readtext on the shared reader."""
+        reader = self.reader
+        start = time.perf_counter()
+        results = reader.readtext(image, **kwargs)
+        with self._lock:
+            self.calls += 1
+            self.ocr_seconds += time.perf_counter() - start
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Startup cost and usage counters."""
+        return {
+            "languages": self.languages,
+            "loaded": self.loaded,
+            "load_seconds": self.load_seconds,
+            "memory_mb": self.memory_mb,
+            "calls": self.calls,
+            "ocr_seconds": self.ocr_seconds
+        }
+
+_engines: Dict[tuple, OCREngine] = {}
+_engines_lock = threading.Lock()
+
+def get_ocr_engine(languages: Sequence[str] = ("en",), gpu: Optional[bool] = None) -> OCREngine:
+    """Return the process-wide OCR engine for these languages."""
+    key = (tuple(languages), gpu)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = OCREngine(languages, gpu)
+            _engines[key] = engine
+        return engine
+
+def get_configured_ocr_engine(config: Optional[dict] = None) -> OCREngine:
+    """Shared OCR engine for config["feedback"], starting a warm-up if configured."""
+    feedback = (config or {}).get("feedback", {})
+    engine = get_ocr_engine(feedback.get("ocr_languages", ["en"]), feedback.get("ocr_gpu"))
+    warmup = feedback.get("ocr_warmup", "lazy")
+    if warmup == "background":
+        engine.warm_up(background=True)
+    elif warmup == "eager":
+        engine.warm_up(background=False)
+    return engine
+
+def ocr_stats() -> List[Dict[str, Any]]:
+    """Stats for every engine created in this process."""
+    with _engines_lock:
+        return [engine.stats() for engine in _engines.values()]
@@ -0,0 +1,106 @@
+import colorsys
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+def sample_pixels(rgb: np.ndarray, pixel_budget: int = 50000) -> np.ndarray:
+    """At most about pixel_budget pixels as an Nx3 array, taken on a regular grid."""
+    height, width = rgb.shape[:2]
+    step = max(1, math.ceil(math.sqrt(height * width / max(1, pixel_budget))))
+    return rgb[::step, ::step, :3].reshape(-1, 3)
+
+def quantize(pixels: np.ndarray, bits: int = 5):
+    """Coarse colour histogram: (mean colour of each non-empty bin, pixel count per bin)."""
+    shift = 8 - bits
+    q = (pixels >> shift).astype(np.int32)
+    bins = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+    occupied, inverse, counts = np.unique(bins, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    sums = np.stack([np.bincount(inverse, weights=pixels[:, c], minlength=len(occupied)) for c in range(3)], axis=1)
+    return sums / counts[:, None], counts
+
+def extract_palette(rgb: np.ndarray, n_colors: int = 5, pixel_budget: int = 50000,
+                    histogram_bits: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """Dominant colours of an RGB image.
+
+    The image is subsampled to pixel_budget pixels and reduced to a coarse
+    colour histogram; MiniBatchKMeans then clusters the occupied bins,
+    weighted by their pixel counts. Cost depends on the budget and the
+    number of bins, not on the image size. Colours are returned most
+    common first, with the share of pixels each one covers.
+    """
+    pixels = sample_pixels(rgb, pixel_budget)
+    centers, counts = quantize(pixels, histogram_bits)
+
+    if len(centers) <= n_colors:
+        colors, weights = centers, counts.astype(np.float64)
+    else:
+        from sklearn.cluster import MiniBatchKMeans
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_colors,
+            random_state=seed,
+            batch_size=min(len(centers), 4096),
+            n_init=3
+        )
+        labels = kmeans.fit_predict(centers, sample_weight=counts)
+        colors = kmeans.cluster_centers_
+        weights = np.bincount(labels, weights=counts, minlength=n_colors)
+
+    order = np.argsort(-weights)
+    colors = np.clip(np.rint(colors[order]), 0, 255).astype(int)
+    weights = weights[order] / weights.sum()
+    return {
+        "colors": colors,
+        "proportions": weights,
+        "sampled_pixels": int(len(pixels)),
+        "histogram_bins": int(len(centers))
+    }
+
+def _hue_gap(a: float, b: float) -> float:
+    gap = abs(a - b) % 360
+    return min(gap, 360 - gap)
+
+def classify_scheme(colors: Sequence[Sequence[int]], proportions: Optional[Sequence[float]] = None,
+                    min_saturation: float = 0.2, min_share: float = 0.01) -> str:
+    """Name the colour harmony of a palette.
+
+    Near-grey colours (and colours covering less than min_share of the
+    image) are ignored. The chromatic hues that remain are classified as
+    "monochrome" (none), "monochromatic" (one hue), "analogous" (within
+    60 degrees), "complementary" (two groups about 180 degrees apart),
+    "triadic" (three groups about 120 degrees apart) or "polychromatic".
+    """
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    if proportions is None:
+        proportions = np.full(len(colors), 1.0 / max(1, len(colors)))
+
+    hues = []
+    for (r, g, b), share in zip(colors, proportions):
+        h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+        if share >= min_share and s >= min_saturation and v >= 0.15:
+            hues.append(h * 360)
+    if not hues:
+        return "monochrome"
+
+    # Group hues that lie within 30 degrees of each other
+    groups: List[float] = []
+    for hue in sorted(hues):
+        if groups and _hue_gap(hue, groups[-1]) <= 30:
+            continue
+        groups.append(hue)
+    if len(groups) > 1 and _hue_gap(groups[0], groups[-1]) <= 30:
+        groups.pop()
+
+    spread = max(_hue_gap(a, b) for a in hues for b in hues)
+    if len(groups) == 1:
+        return "monochromatic" if spread <= 30 else "analogous"
+    if spread <= 60:
+        return "analogous"
+    if len(groups) == 2 and _hue_gap(groups[0], groups[1]) >= 150:
+        return "complementary"
+    if len(groups) == 3 and all(
+        abs(_hue_gap(groups[i], groups[(i + 1) % 3]) - 120) <= 30 for i in range(3)
+    ):
+        return "triadic"
+    return "polychromatic"
@@ -1,76 +1,169 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import cv2
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple
-import easyocr
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
+from .ocr_engine import get_configured_ocr_engine
+from .palette import classify_scheme, extract_palette
+from .feature_cache import FeatureCache, perceptual_hash, verification_thumbnail
+from .layout_engine import LayoutEngine
+
+# Bump when feature extraction changes so cached features are recomputed
+PROCESSOR_VERSION = "3"
 
 class VisionProcessor:
-    def __init__(self):
+    def __init__(self, config: Optional[dict] = None):
         self.logger = logging.getLogger('VisionProcessor')
-        self.reader = easyocr.Reader(['en'])
+        self.config = config or {}
+        # Shared with Observer; models load on first OCR or on warm-up
+        self.reader = get_configured_ocr_engine(self.config)
+        self.palette_config = self.config.get("vision", {}).get("palette", {})
+        self.layout_engine = LayoutEngine(self.config.get("vision", {}).get("layout", {}))
+        self.feature_cache = FeatureCache(self.config.get("vision", {}).get("feature_cache", {}), PROCESSOR_VERSION)
         
     def process_image(self, image_path: Path) -> Dict:
         """Process an image and extract visual requirements"""
         try:
-            # Read image
-            image = cv2.imread(str(image_path))
-            if image is None:
-                raise ValueError(f"Could not read image: {image_path}")
-
-            # Extract features
-            features = {
-                "layout": self.analyze_layout(image),
-                "colors": self.extract_colors(image),
-                "text": self.extract_text(image),
-                "components": self.detect_components(image)
-            }
-
-            return features
-
+            return self._process_timed(image_path)[0]
         except Exception as e:
             self.logger.error(f"Error processing image: {str(e)}")
             raise
 
+    def _process_timed(self, image_path: Path) -> Tuple[Dict, Dict[str, float]]:
+        """process_image plus seconds spent in each stage: read, decode, text, layout
+        (which also yields the components), colors and cache_write."""
+        timings = {}
+        clock = time.perf_counter()
+
+        def lap(stage: str):
+            nonlocal clock
+            now = time.perf_counter()
+            timings[stage] = now - clock
+            clock = now
+
+        # Read image; identical content (by hash) reuses cached features
+        with open(image_path, "rb") as f:
+            data = f.read()
+        key = self.feature_cache.make_key(data)
+        cached = self.feature_cache.get(key)
+        lap("read")
+        if cached is not None:
+            return cached, timings
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not read image: {image_path}")
+        lap("decode")
+
+        # Near-identical screenshots reuse earlier OCR, the slowest stage, once their pixels are confirmed to match
+        phash = perceptual_hash(image)
+        thumbnail = verification_thumbnail(image)
+        text = self.feature_cache.find_similar_ocr(phash, thumbnail)
+        if text is None:
+            text = self.extract_text(image)
+        lap("text")
+
+        # Extract features; one layout pass yields both the layout and the components
+        layout = self.layout_engine.analyze(image, text)
+        features = {
+            "layout": {key: layout[key] for key in ("sections", "grid_structure", "symmetry")},
+            "components": layout["components"],
+            "text": text
+        }
+        lap("layout")
+        features["colors"] = self.extract_colors(image)
+        lap("colors")
+
+        self.feature_cache.put(key, features, phash, thumbnail)
+        lap("cache_write")
+        return features, timings
+
+    def process_images(self, paths: Iterable[Path], workers: Optional[int] = None) -> Iterator[Dict]:
+        """Process many images on a process pool, yielding results as each finishes.
+
+        Each result is {"path", "features", "timings", "seconds", "worker", "error"};
+        worker is the pid that processed the image, or None if it died.
+        Every worker builds its own VisionProcessor (and loads the OCR
+        models) once, then handles many images.
+        """
+        # Cached images are answered here so workers (and their OCR models) only start when needed
+        paths = [str(path) for path in paths]
+        pending = []
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                with open(path, "rb") as f:
+                    cached = self.feature_cache.get(self.feature_cache.make_key(f.read()))
+            except OSError:
+                cached = None
+            if cached is None:
+                pending.append(path)
+            else:
+                seconds = time.perf_counter() - start
+                yield {"path": path, "features": cached, "timings": {"read": seconds}, "seconds": seconds,
+                       "worker": os.getpid(), "error": None}
+        paths = pending
+        if not paths:
+            return
+
+        vision_config = self.config.get("vision", {})
+        workers = workers or vision_config.get("workers") or min(4, os.cpu_count() or 1)
+        workers = max(1, min(workers, len(paths)))
+        if workers == 1:
+            for path in paths:
+                yield _process_one(self, path)
+            return
+
+        # spawn: forked children would inherit the parent's threads and loaded models
+        context = multiprocessing.get_context("spawn")
+        threads = vision_config.get("threads_per_worker") or max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(self.config, threads)) as pool:
+            futures = {pool.submit(_worker_process, path): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. out of memory)
+                    yield {"path": futures[future], "features": None, "timings": {}, "seconds": 0.0, "worker": None,
+                           "error": str(e)}
+
     def analyze_layout(self, image: np.ndarray) -> Dict:
         """Analyze the layout structure of the image"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Edge detection
-        edges = cv2.Canny(gray, 50, 150)
+        # Canny + contours, component classification, grid and symmetry in one budgeted pass
+        layout = self.layout_engine.analyze(image)
         
-        # Find contours
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Analyze layout structure
-        layout = {
-            "sections": [],
-            "grid_structure": self.detect_grid(contours),
-            "symmetry": self.analyze_symmetry(contours)
+        return {
+            "sections": layout["sections"],
+            "grid_structure": layout["grid_structure"],
+            "symmetry": layout["symmetry"]
         }
-        
-        return layout
 
     def extract_colors(self, image: np.ndarray) -> Dict:
         """Extract dominant colors and color scheme"""
-        # Convert to RGB
-        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        # Reshape image
-        pixels = rgb.reshape(-1, 3)
-        
-        # Use K-means to find dominant colors
-        from sklearn.cluster import KMeans
-        kmeans = KMeans(n_clusters=5)
-        kmeans.fit(pixels)
+        # BGR -> RGB as a view; sampling happens before any copy
+        rgb = image[..., ::-1]
         
-        # Get color palette
-        colors = kmeans.cluster_centers_.astype(int)
+        # Subsample to the pixel budget, then cluster a coarse colour histogram
+        palette = extract_palette(
+            rgb,
+            n_colors=self.palette_config.get("colors", 5),
+            pixel_budget=self.palette_config.get("pixel_budget", 50000),
+            histogram_bits=self.palette_config.get("histogram_bits", 5),
+            seed=self.palette_config.get("seed", 0)
+        )
+        colors = palette["colors"]
         
         return {
             "dominant_colors": colors.tolist(),
-            "color_scheme": self.classify_color_scheme(colors)
+            "proportions": [round(float(share), 4) for share in palette["proportions"]],
+            "color_scheme": self.classify_color_scheme(colors, palette["proportions"])
         }
 
     def extract_text(self, image: np.ndarray) -> List[Dict]:
@@ -90,35 +183,103 @@ class VisionProcessor:
         
         return text_elements
 
-    def detect_components(self, image: np.ndarray) -> List[Dict]:
-        """Detect UI components in the image"""
-        # TODO: Implement component detection using computer vision
-        # This could include:
-        # - Buttons
-        # - Input fields
-        # - Navigation bars
-        # - Cards
-        # - Images
-        return []
-
-    def detect_grid(self, contours: List) -> Dict:
-        """Detect grid structure in the layout"""
-        # TODO: Implement grid detection
-        return {
-            "type": "unknown",
-            "columns": 0,
-            "rows": 0
-        }
+    def detect_components(self, image: np.ndarray, text_elements: Optional[List[Dict]] = None) -> List[Dict]:
+        """Detect UI components (navbar, container, button, input, image, rectangle, region) in the image"""
+        return self.layout_engine.analyze(image, text_elements)["components"]
 
-    def analyze_symmetry(self, contours: List) -> Dict:
-        """Analyze symmetry in the layout"""
-        # TODO: Implement symmetry analysis
-        return {
-            "horizontal_symmetry": 0.0,
-            "vertical_symmetry": 0.0
-        }
+    def detect_grid(self, contours: List, size: Optional[Tuple[int, int]] = None) -> Dict:
+        """Detect grid structure from contours; size is (width, height) of the image"""
+        boxes = [(x, y, x + w, y + h) for x, y, w, h in map(cv2.boundingRect, contours)]
+        return self.layout_engine.grid(boxes, size or self._extent(boxes))
+
+    def analyze_symmetry(self, contours: List, size: Optional[Tuple[int, int]] = None) -> Dict:
+        """Analyze mirror symmetry of the contours; size is (width, height) of the image"""
+        boxes = [(x, y, x + w, y + h) for x, y, w, h in map(cv2.boundingRect, contours)]
+        return self.layout_engine.box_symmetry(boxes, size or self._extent(boxes))
 
-    def classify_color_scheme(self, colors: np.ndarray) -> str:
+    @staticmethod
+    def _extent(boxes: List[Tuple[int, int, int, int]]) -> Tuple[int, int]:
+        if not boxes:
+            return (1, 1)
+        return (max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+    def classify_color_scheme(self, colors: np.ndarray, proportions: Optional[np.ndarray] = None) -> str:
         """Classify the color scheme of the image"""
-        # TODO: Implement color scheme classification
-        return "unknown" 
\ No newline at end of file
+        return classify_scheme(colors, proportions) 
+
+_worker_processor: Optional[VisionProcessor] = None
+
+def _init_worker(config: dict, threads: int):
+    """Pool initializer: cap per-process threads and load the OCR models once."""
+    global _worker_processor
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    cv2.setNumThreads(threads)
+    _worker_processor = VisionProcessor(config)
+    try:
+        _worker_processor.reader.warm_up(background=False)
+    except ImportError:
+        # No easyocr: the text stage will raise per image instead
+        pass
+
+def _worker_process(path: str) -> Dict:
+    return _process_one(_worker_processor, path)
+
+def _process_one(processor: VisionProcessor, path: str) -> Dict:
+    start = time.perf_counter()
+    try:
+        features, timings = processor._process_timed(path)
+        error = None
+    except Exception as e:
+        features, timings, error = None, {}, str(e)
+    return {
+        "path": path,
+        "features": features,
+        "timings": timings,
+        "seconds": time.perf_counter() - start,
+        "worker": os.getpid(),
+        "error": error
+    }
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")
+
+def find_images(root: str) -> List[str]:
+    """Every image file under root, sorted."""
+    found = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                found.append(os.path.join(directory, filename))
+    return sorted(found)
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-process every image under a directory into the feature cache')
+    parser.add_argument('root', nargs='?', default='input')
+    parser.add_argument('--config', default='macro_ai_agent/config.json')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: config vision.workers or min(4, CPUs))')
+    parser.add_argument('--output', help='Also write each image\'s features as JSON into this directory')
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    paths = find_images(args.root)
+    if not paths:
+        print(f"No images found under {args.root}")
+        return
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    processor = VisionProcessor(config)
+    start = time.perf_counter()
+    failures = 0
+    for result in processor.process_images(paths, workers=args.workers):
+        if result["error"]:
+            failures += 1
+        elif args.output:
+            name = os.path.relpath(result["path"], args.root).replace(os.sep, "__")
+            with open(os.path.join(args.output, f"{name}.json"), "w") as f:
+                json.dump(result["features"], f, indent=2, default=str)
+        print(json.dumps({key: result[key] for key in ("path", "seconds", "timings", "error")}))
+    print(f"Processed {len(paths)} images ({failures} failed) in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()